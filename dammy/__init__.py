@@ -3,8 +3,8 @@ dammy generates fake data, either to populate your databases with dummy data or
 Datasets of any size can be easily generated and exported to SQL or as a dictionary.
 """
 
-__all__ = ('stdlib', 'db', 'exceptions', 'functions')
+__all__ = ('stdlib', 'db', 'exceptions', 'functions', 'checkpoint', 'partition', 'sinks', 'cli', 'sampling', 'metrics', 'shared', 'cdc', 'emitter', 'estimate', 'snapshot')
 
-from .core import seed
+from .core import seed, get_random, GenerationSession
 from .core import BaseGenerator, EntityGenerator, FunctionResult, AttributeGetter, MethodCaller, OperationResult
 from .iterator import Iterator
\ No newline at end of file
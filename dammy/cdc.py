@@ -0,0 +1,458 @@
+"""
+This module generates streams of changes (inserts, updates and deletes) over an already generated dataset, as
+captured by change data capture tools, to test replication and CDC pipelines. Changes keep the integrity of the
+dataset: every row is identified by its primary key and foreign keys only reference rows that have not been deleted.
+"""
+import bisect
+import itertools
+import json
+import random
+
+from .core import DatasetGenerator, ForeignKey, PrimaryKey, Unique, BaseGenerator
+from .sinks import sink_for
+
+OPERATIONS = ('insert', 'update', 'delete')
+
+# Number of rows tried before giving up on deleting a row of a table when all of them are referenced
+DELETE_RETRIES = 10
+
+class ChangeStream:
+    """
+    Generates changes over the rows of a dataset which has already been generated. Each change is a dict containing:
+
+    - op: The operation, either 'insert', 'update' or 'delete'
+    - table: The name of the table
+    - key: The primary key of the row
+    - before: The row before the change, or None for inserts
+    - after: The row after the change, or None for deletes
+    - columns: The columns changed by updates
+
+    Inserted rows are generated by the entity of the table, so sequences and unique fields go on from the dataset.
+    Updated columns get a new value from their generator, and updated foreign keys reference another row. Only tables
+    with a primary key are updated or deleted. Rows referenced by other rows are never deleted unless on_delete is set
+    to 'cascade', in which case the rows referencing them are deleted first. When every row tried is referenced, a
+    row is inserted instead. The last rows of a table referenced by other tables are never deleted, so rows referencing
+    it can still be inserted and updated. The dataset itself is not modified. Foreign keys with a fan-out do not apply it to the
+    inserted and updated rows, which may exceed it and raise a :class:`dammy.exceptions.IntegrityException`.
+
+    :param dataset: The generated dataset
+    :param mix: The weight of each operation. By default, {'insert': 0.5, 'update': 0.4, 'delete': 0.1}
+    :param update_columns: The attributes updated in each table. By default, every attribute which is not a key
+    :param on_delete: Either 'restrict' to never delete referenced rows or 'cascade' to delete the rows referencing them
+    :param weights: The weight of each table when choosing the table of a change. By default, the number of rows of each table in the dataset
+    :param localization: The localization used to generate the new values
+    :type dataset: :class:`dammy.db.DatasetGenerator`
+    :type mix: dict
+    :type update_columns: dict
+    :type on_delete: str
+    :type weights: dict
+    :type localization: str
+    :raises: ValueError
+
+    Example::
+
+        dataset = DatasetGenerator((Customer, 10000), (Order, 100000)).generate()
+        stream = dataset.changes(mix={'insert': 0.2, 'update': 0.7, 'delete': 0.1}, update_columns={'Order': ['status']})
+        stream.export('changes.sql', 1000000)
+    """
+    def __init__(self, dataset, mix=None, update_columns=None, on_delete='restrict', weights=None, localization=None):
+        if on_delete not in ('restrict', 'cascade'):
+            raise ValueError('on_delete must be either restrict or cascade, got {}'.format(on_delete))
+
+        if mix is None:
+            mix = {'insert': 0.5, 'update': 0.4, 'delete': 0.1}
+
+        unknown = [op for op in mix if op not in OPERATIONS]
+        if unknown:
+            raise ValueError('Unknown operations: {}'.format(', '.join(unknown)))
+
+        if weights is None:
+            weights = dataset._fixed_counters
+
+        self.dataset = dataset
+        self.on_delete = on_delete
+        self.localization = localization
+
+        self._entities = dict((name, c()) for name, c in dataset._name_class_map.items())
+        table_order, self._sql_tables = dataset._get_sql_tables()
+
+        self._keys = {}
+        self._foreign_keys = dict((name, []) for name in self._entities)
+        self._referencing = dict((name, []) for name in self._entities)
+        self._update_columns = {}
+        self._sql_columns = {}
+
+        for name, entity in self._entities.items():
+            self._keys[name] = None
+            self._sql_columns[name] = {}
+            updatable = []
+
+            for attr in entity.attrs:
+                attr_obj = getattr(entity, attr)
+
+                if isinstance(attr_obj, ForeignKey):
+                    self._foreign_keys[name].append((attr, attr_obj, tuple(attr_obj._columns.values())))
+                    # Rows of external tables are never deleted
+                    if attr_obj.external is None:
+                        self._referencing[attr_obj.referenced_table].append((name, attr, tuple(attr_obj._columns.keys())))
+                    self._sql_columns[name].update((c, '{}_{}'.format(attr, f)) for f, c in attr_obj._columns.items())
+
+                elif isinstance(attr_obj, Unique):
+                    if isinstance(attr_obj, PrimaryKey):
+                        self._keys[name] = tuple(attr_obj.fields.keys())
+                    self._sql_columns[name].update((f, f) for f in attr_obj.fields.keys())
+
+                else:
+                    self._sql_columns[name][attr] = attr
+                    if isinstance(attr_obj, BaseGenerator):
+                        updatable.append(attr)
+
+            columns = (update_columns or {}).get(name, updatable)
+            for attr in columns:
+                if attr not in entity.attrs:
+                    raise ValueError('{} has no attribute {}'.format(name, attr))
+                if isinstance(getattr(entity, attr), Unique) or not isinstance(getattr(entity, attr), BaseGenerator):
+                    raise ValueError('{}.{} cannot be updated'.format(name, attr))
+
+            self._update_columns[name] = list(columns)
+
+        # Live rows of each table, the position of each one by key and the rows referencing each row
+        self._rows = {}
+        self._positions = {}
+        self._references = {}
+        self._tokens = itertools.count()
+
+        for name in self._entities:
+            for attr, _, _ in self._foreign_keys[name]:
+                self._references[(name, attr)] = {}
+
+        for name in table_order:
+            self._rows[name] = []
+            self._positions[name] = {} if self._keys[name] is not None else None
+            for row in dataset[name]:
+                self._add(name, row)
+
+        # The tables where each operation can be done, along with their cumulative weights
+        self._ops = []
+        self._op_weights = []
+        self._op_tables = {}
+        for op in OPERATIONS:
+            tables = [
+                t for t in table_order
+                if weights.get(t, 0) > 0 and (op == 'insert' or self._keys[t] is not None) and (op != 'update' or self._update_columns[t])
+            ]
+            if tables and mix.get(op, 0) > 0:
+                self._ops.append(op)
+                self._op_weights.append(mix[op] + (self._op_weights[-1] if self._op_weights else 0))
+                self._op_tables[op] = (tables, list(itertools.accumulate(weights[t] for t in tables)))
+
+        if not self._ops:
+            raise ValueError('No operation can be done on any table')
+
+    def _key(self, table, row):
+        """
+        Get the key identifying a row. Rows of tables without a primary key get a new token each time
+
+        :returns: tuple containing the values of the primary key
+        """
+        fields = self._keys[table]
+        if fields is None:
+            return ('token', next(self._tokens))
+        return tuple(row[f] for f in fields)
+
+    def _add(self, table, row):
+        """
+        Start tracking a live row and the rows it references
+
+        :returns: The key of the row
+        """
+        key = self._key(table, row)
+        if self._positions[table] is not None:
+            self._positions[table][key] = len(self._rows[table])
+        self._rows[table].append(row)
+
+        for attr, _, fields in self._foreign_keys[table]:
+            self._references[(table, attr)].setdefault(tuple(row[f] for f in fields), set()).add(key)
+
+        return key
+
+    def _remove(self, table, key):
+        """
+        Stop tracking a live row and the rows it references
+
+        :returns: The removed row
+        """
+        rows = self._rows[table]
+        positions = self._positions[table]
+
+        # Move the last row to the position of the removed one
+        position = positions.pop(key)
+        row = rows[position]
+        last = rows.pop()
+        if position < len(rows):
+            rows[position] = last
+            positions[self._key(table, last)] = position
+
+        for attr, _, fields in self._foreign_keys[table]:
+            referenced = tuple(row[f] for f in fields)
+            children = self._references[(table, attr)][referenced]
+            children.discard(key)
+            if not children:
+                del self._references[(table, attr)][referenced]
+
+        return row
+
+    def _children(self, table, row):
+        """
+        Get the rows referencing a row
+
+        :returns: list of tuples containing the table and the key of every referencing row
+        """
+        children = []
+        for child_table, attr, fields in self._referencing[table]:
+            referenced = tuple(row[f] for f in fields)
+            children.extend((child_table, key) for key in self._references[(child_table, attr)].get(referenced, ()))
+        return children
+
+    def _choose(self, op):
+        """
+        Choose the table of an operation according to the weights of the tables
+
+        :returns: str containing the name of the table
+        """
+        tables, cumulative = self._op_tables[op]
+        return tables[bisect.bisect_right(cumulative, random.random() * cumulative[-1])]
+
+    def _insert(self, table):
+        row = self._entities[table].generate(self._rows, self.localization)
+        key = self._add(table, row)
+        return [{'op': 'insert', 'table': table, 'key': self._event_key(table, key), 'before': None, 'after': row}]
+
+    def _update(self, table):
+        rows = self._rows[table]
+        before = rows[random.randrange(len(rows))]
+        after = dict(before)
+        key = self._key(table, before)
+
+        columns = []
+        for attr in self._update_columns[table]:
+            attr_obj = getattr(self._entities[table], attr)
+            if isinstance(attr_obj, ForeignKey):
+                value = attr_obj.generate(self._rows, self.localization)
+                after.update(value)
+                columns.extend(value.keys())
+            else:
+                after[attr] = attr_obj.generate(self._rows, self.localization)
+                columns.append(attr)
+
+        self._remove(table, key)
+        self._add(table, after)
+
+        return [{'op': 'update', 'table': table, 'key': self._event_key(table, key), 'before': before, 'after': after, 'columns': columns}]
+
+    def _delete(self, table, row):
+        """
+        Delete a row, deleting the rows referencing it first
+
+        :returns: list containing the changes
+        """
+        changes = []
+        for child_table, child_key in self._children(table, row):
+            if child_key in self._positions[child_table]:
+                changes.extend(self._delete(child_table, self._rows[child_table][self._positions[child_table][child_key]]))
+
+        key = self._key(table, row)
+        self._remove(table, key)
+        changes.append({'op': 'delete', 'table': table, 'key': self._event_key(table, key), 'before': row, 'after': None})
+
+        return changes
+
+    def _deletable(self, table, row):
+        """
+        Check wether a row can be deleted. In cascade mode, every row referencing it must be deletable too. Rows are
+        not deleted if a table referenced by other tables would be left without rows, so new references can still be made
+
+        :returns: True if the row can be deleted, False otherwise
+        """
+        deleted = {}
+        if not self._collect_deleted(table, row, deleted):
+            return False
+
+        return all(len(self._rows[t]) > len(keys) for t, keys in deleted.items() if self._referencing[t])
+
+    def _collect_deleted(self, table, row, deleted):
+        """
+        Collect the keys of the rows deleted along with a row, by table
+
+        :param deleted: The keys of the rows of each table deleted so far
+        :type deleted: dict
+        :returns: True if every row can be deleted, False otherwise
+        """
+        key = self._key(table, row)
+        if key in deleted.setdefault(table, set()):
+            return True
+        deleted[table].add(key)
+
+        children = self._children(table, row)
+        if self.on_delete == 'restrict':
+            return not children
+
+        for child_table, child_key in children:
+            positions = self._positions[child_table]
+            if positions is None or child_key not in positions:
+                return False
+            if not self._collect_deleted(child_table, self._rows[child_table][positions[child_key]], deleted):
+                return False
+
+        return True
+
+    def _event_key(self, table, key):
+        """
+        Get the key of a row as included in the changes
+
+        :returns: dict containing the primary key, or None if the table has no primary key
+        """
+        fields = self._keys[table]
+        return dict(zip(fields, key)) if fields is not None else None
+
+    def generate(self, n):
+        """
+        Generate changes one by one, without keeping them
+
+        :param n: The number of changes. Deletes cascaded to referencing rows count as a single change
+        :type n: int
+        :returns: Python generator yielding the changes
+        """
+        for _ in range(n):
+            op = self._ops[bisect.bisect_right(self._op_weights, random.random() * self._op_weights[-1])]
+            table = self._choose(op)
+
+            changes = None
+            if op == 'update' and self._rows[table]:
+                changes = self._update(table)
+
+            elif op == 'delete':
+                rows = self._rows[table]
+                for _ in range(min(DELETE_RETRIES, len(rows))):
+                    row = rows[random.randrange(len(rows))]
+                    if self._deletable(table, row):
+                        changes = self._delete(table, row)
+                        break
+
+            if changes is None:
+                changes = self._insert(table)
+
+            yield from changes
+
+    def _sql(self, change):
+        """
+        Get the SQL statement applying a change
+
+        :param change: The change
+        :type change: dict
+        :returns: str containing the statement
+        """
+        table = change['table']
+        if change['op'] == 'insert':
+            return DatasetGenerator._sql_insert(table, self._sql_tables[table]['columns'], change['after'])
+
+        columns = self._sql_columns[table]
+        where = ' AND '.join('{} = {}'.format(columns[k], DatasetGenerator._sql_literal(v)) for k, v in change['key'].items())
+
+        if change['op'] == 'update':
+            return 'UPDATE {} SET {} WHERE {};'.format(
+                table,
+                ', '.join('{} = {}'.format(columns[c], DatasetGenerator._sql_literal(change['after'][c])) for c in change['columns']),
+                where
+            )
+
+        return 'DELETE FROM {} WHERE {};'.format(table, where)
+
+    def _json(self, change):
+        """
+        Get a change as a JSON object
+
+        :param change: The change
+        :type change: dict
+        :returns: str containing the JSON object
+        """
+        return json.dumps(change)
+
+    def export(self, save_to, n, output_format='sql', compression=None, threaded=True):
+        """
+        Generate changes writing each one to a file or a sink as soon as it is generated, either as a SQL statement
+        or as a JSON object per line
+
+        :param save_to: The path or the sink where the changes will be saved
+        :param n: The number of changes
+        :param output_format: Either 'sql' or 'jsonl'
+        :param compression: The compression of the file when save_to is a path. Either None, 'gzip', 'bz2', 'lzma' or 'zstd'
+        :param threaded: If set to true and save_to is a path, the file is written by a background thread
+        :type save_to: str or :class:`dammy.sinks.BaseSink`
+        :type n: int
+        :type output_format: str
+        :type compression: str
+        :type threaded: bool
+        :raises: ValueError
+        """
+        if output_format == 'sql':
+            encode = self._sql
+        elif output_format == 'jsonl':
+            encode = self._json
+        else:
+            raise ValueError('Unknown output format {}'.format(output_format))
+
+        with sink_for(save_to, compression, threaded) as sink:
+            for change in self.generate(n):
+                sink.write(encode(change) + '\n')
+
+    def apply(self, connection, n, batch_size=10000):
+        """
+        Generate changes applying each one to a SQLite database, committing every batch_size changes.
+        The tables must already contain the rows of the dataset, for instance after executing
+        :meth:`dammy.db.DatasetGenerator.to_sql`.
+
+        :param connection: The connection to the database
+        :param n: The number of changes
+        :param batch_size: The number of changes between two commits
+        :type connection: sqlite3.Connection
+        :type n: int
+        :type batch_size: int
+        """
+        statements = {}
+        pending = 0
+
+        for change in self.generate(n):
+            table = change['table']
+            columns = self._sql_columns[table]
+
+            if change['op'] == 'insert':
+                parameters = list(change['after'].values())
+                statement_key = ('insert', table)
+            elif change['op'] == 'update':
+                parameters = [change['after'][c] for c in change['columns']] + list(change['key'].values())
+                statement_key = ('update', table, tuple(change['columns']))
+            else:
+                parameters = list(change['key'].values())
+                statement_key = ('delete', table)
+
+            statement = statements.get(statement_key)
+            if statement is None:
+                where = ' AND '.join('{} = ?'.format(columns[k]) for k in self._keys[table] or ())
+                if change['op'] == 'insert':
+                    sql_columns = self._sql_tables[table]['columns']
+                    statement = 'INSERT INTO {} ({}) VALUES ({})'.format(table, ', '.join(sql_columns), ', '.join('?' * len(sql_columns)))
+                elif change['op'] == 'update':
+                    statement = 'UPDATE {} SET {} WHERE {}'.format(table, ', '.join('{} = ?'.format(columns[c]) for c in change['columns']), where)
+                else:
+                    statement = 'DELETE FROM {} WHERE {}'.format(table, where)
+                statements[statement_key] = statement
+
+            connection.execute(statement, parameters)
+
+            pending += 1
+            if pending >= batch_size:
+                connection.commit()
+                pending = 0
+
+        connection.commit()
@@ -0,0 +1,146 @@
+"""
+This module allows saving the state of a dataset generation run to disk, so long runs can be
+resumed after a crash instead of being started from scratch.
+"""
+import os
+import pickle
+
+from .exceptions import CheckpointException
+
+CHECKPOINT_VERSION = 2
+
+class Checkpoint:
+    """
+    A file where the state of a generation run is periodically saved. Checkpoints are written
+    atomically, so a crash while saving never leaves a corrupted checkpoint behind.
+
+    The data growing with the number of generated rows, such as the referenced keys and the values of unique
+    fields, is not saved in the checkpoint but appended to a journal next to it (the path followed by .journal),
+    so each checkpoint only writes what was generated since the previous one. The checkpoint records the size
+    of the journal when it was saved, and anything appended afterwards is discarded when it is loaded.
+
+    :param path: The path of the checkpoint file
+    :type path: str
+
+    Example::
+
+        from dammy.checkpoint import Checkpoint
+
+        dataset = DatasetGenerator((Car, 1000000), (Person, 500000))
+        dataset.export('dataset.sql', checkpoint=Checkpoint('dataset.ckpt'), resume=True)
+    """
+    def __init__(self, path):
+        self.path = path
+        self.journal_path = '{}.journal'.format(path)
+        self._journal = None
+        self._journal_size = 0
+
+    def exists(self):
+        """
+        Check wether the checkpoint has been saved or not
+
+        :returns: True if the checkpoint file exists, False otherwise
+        """
+        return os.path.exists(self.path)
+
+    def append(self, key, value):
+        """
+        Append a record to the journal. It becomes part of the checkpoint the next time it is saved
+
+        :param key: Identifies what the record belongs to
+        :param value: The record. It must be picklable
+        :type key: tuple
+        """
+        if self._journal is None:
+            self._journal = open(self.journal_path, 'ab')
+        pickle.dump((key, value), self._journal, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def save(self, state):
+        """
+        Save the given state, replacing the previous one, along with the records appended to the journal so far
+
+        :param state: The state to save. It must be picklable
+        :type state: dict
+        """
+        if self._journal is not None:
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+            self._journal_size = self._journal.tell()
+
+        tmp_path = '{}.tmp'.format(self.path)
+        with open(tmp_path, 'wb') as f:
+            saved = {'version': CHECKPOINT_VERSION, 'state': state, 'journal_size': self._journal_size}
+            pickle.dump(saved, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(tmp_path, self.path)
+
+    def load(self):
+        """
+        Load the last saved state
+
+        :returns: The saved state
+        :raises: :class:`dammy.exceptions.CheckpointException`
+        """
+        try:
+            with open(self.path, 'rb') as f:
+                saved = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError) as e:
+            raise CheckpointException('Cannot load checkpoint {}: {}'.format(self.path, e))
+
+        if not isinstance(saved, dict) or saved.get('version') != CHECKPOINT_VERSION:
+            raise CheckpointException('{} is not a valid checkpoint'.format(self.path))
+
+        self.close()
+        self._journal_size = saved['journal_size']
+        if self._journal_size > 0:
+            if not os.path.exists(self.journal_path) or os.path.getsize(self.journal_path) < self._journal_size:
+                raise CheckpointException('The journal of checkpoint {} is incomplete'.format(self.path))
+
+            # Discard the records appended after the checkpoint was saved
+            with open(self.journal_path, 'r+b') as f:
+                f.truncate(self._journal_size)
+        elif os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+
+        return saved['state']
+
+    def records(self):
+        """
+        Read the records of the journal saved with the last loaded checkpoint
+
+        :returns: dict containing the list of records of each key, in the order they were appended
+        :raises: :class:`dammy.exceptions.CheckpointException`
+        """
+        records = {}
+        if self._journal_size == 0:
+            return records
+
+        try:
+            with open(self.journal_path, 'rb') as f:
+                while f.tell() < self._journal_size:
+                    key, value = pickle.load(f)
+                    records.setdefault(key, []).append(value)
+        except (OSError, pickle.UnpicklingError, EOFError) as e:
+            raise CheckpointException('Cannot read the journal of checkpoint {}: {}'.format(self.path, e))
+
+        return records
+
+    def close(self):
+        """
+        Close the journal. Records can still be appended, which opens it again
+        """
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    def remove(self):
+        """
+        Delete the checkpoint file and its journal if they exist
+        """
+        self.close()
+        self._journal_size = 0
+        for path in (self.path, self.journal_path):
+            if os.path.exists(path):
+                os.remove(path)
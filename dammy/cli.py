@@ -0,0 +1,455 @@
+"""
+This module contains the ``dammy`` command, which generates datasets defined in a Python module without
+writing any code. Each table is written into shard files along with a manifest, as done by
+:meth:`dammy.db.DatasetGenerator.export_partitioned`.
+
+Example::
+
+    dammy generate entities.py --rows Person=100000000 --rows Car=50000000 --seed 42 \\
+        --format csv --output-dir dataset --workers 8 --batch-size 1000000 --compression gzip
+
+With several workers, rows are generated by index, so the output for a seed differs from the one of a single worker.
+"""
+import argparse
+import concurrent.futures
+import importlib
+import importlib.util
+import inspect
+import os
+import random
+import sys
+import time
+
+from .core import EntityGenerator, DatasetGenerator, seed as set_seed
+from .exceptions import DammyException
+from .metrics import Metrics
+from .partition import ShardedTableWriter, write_manifest
+from .sinks import COMPRESSION_EXTENSIONS
+from .stdlib.vocabulary import Vocabulary
+
+SIZE_UNITS = {
+    '': 1,
+    'K': 1024,
+    'M': 1024 ** 2,
+    'G': 1024 ** 3,
+    'T': 1024 ** 4
+}
+
+# The dataset generated by each worker process
+_worker_dataset = None
+
+def _parse_size(text):
+    """
+    Parse a size in bytes with an optional K, M, G or T suffix, such as 512M
+
+    :param text: The size
+    :type text: str
+    :returns: int containing the size in bytes
+    :raises: argparse.ArgumentTypeError
+    """
+    text = text.strip().upper()
+    if text.endswith('B'):
+        text = text[:-1]
+
+    unit = text[-1:] if text[-1:] in SIZE_UNITS else ''
+    try:
+        return int(float(text[:len(text) - len(unit)]) * SIZE_UNITS[unit])
+    except ValueError:
+        raise argparse.ArgumentTypeError('Invalid size {}'.format(text))
+
+def _parse_rows(text):
+    """
+    Parse the number of rows of a table, given as TABLE=ROWS
+
+    :param text: The table and its number of rows
+    :type text: str
+    :returns: tuple containing the name of the table and the number of rows
+    :raises: argparse.ArgumentTypeError
+    """
+    table, _, rows = text.partition('=')
+    try:
+        rows = int(rows)
+    except ValueError:
+        raise argparse.ArgumentTypeError('Expected TABLE=ROWS, got {}'.format(text))
+
+    if rows < 0:
+        raise argparse.ArgumentTypeError('The number of rows of {} cannot be negative'.format(table))
+
+    return table, rows
+
+def load_entities(module):
+    """
+    Import a module and get the entities defined in it
+
+    :param module: The path of a Python file or the name of an importable module
+    :type module: str
+    :returns: dict containing every :class:`dammy.EntityGenerator` subclass defined in the module, by name
+    """
+    if module.endswith('.py') or os.path.sep in module:
+        name = os.path.splitext(os.path.basename(module))[0]
+        spec = importlib.util.spec_from_file_location(name, module)
+        loaded = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(loaded)
+    else:
+        loaded = importlib.import_module(module)
+
+    return dict(
+        (name, obj) for name, obj in vars(loaded).items()
+        if inspect.isclass(obj) and issubclass(obj, EntityGenerator) and obj.__module__ == loaded.__name__
+    )
+
+def _build_dataset(module, rows):
+    """
+    Build the dataset containing the given number of rows of each table
+
+    :param module: The path of a Python file or the name of an importable module defining the entities
+    :param rows: list of tuples containing the name of each table and its number of rows
+    :type module: str
+    :type rows: list
+    :returns: :class:`dammy.db.DatasetGenerator`
+    :raises: ValueError
+    """
+    entities = load_entities(module)
+    for table, _ in rows:
+        if table not in entities:
+            raise ValueError('{} does not define the entity {}. Found: {}'.format(module, table, ', '.join(sorted(entities)) or 'none'))
+
+    return DatasetGenerator(*[(entities[table], n) for table, n in rows])
+
+def _init_worker(module, rows):
+    """
+    Load the dataset in a worker process
+
+    :param module: The path of a Python file or the name of an importable module defining the entities
+    :param rows: list of tuples containing the name of each table and its number of rows
+    :type module: str
+    :type rows: list
+    """
+    global _worker_dataset
+    _worker_dataset = _build_dataset(module, rows)
+
+def _generate_shard(table, shard, start, stop, seed, output_format, compression, directory, localization):
+    """
+    Generate the rows of a table from start to stop into a single shard. Runs in the worker processes.
+
+    :returns: dict containing the path, row count, size and checksum of the shard
+    """
+    dataset = _worker_dataset
+    _, tables = dataset._get_sql_tables()
+    encode = dataset._get_partition_encoder(output_format, tables)
+
+    header = None
+    if output_format == 'csv':
+        header = encode(table, dict((c, c) for c in tables[table]['columns']))
+
+    writer = ShardedTableWriter(directory, table, output_format, compression=compression, header=header, first_shard=shard)
+    for i in range(start, stop):
+        writer.write(encode(table, dataset._generate_row_at(table, i, seed, localization)))
+
+    return writer.close()[0]
+
+class Progress:
+    """
+    Prints the progress of a run to the standard error, at most once per interval
+
+    :param totals: dict containing the number of rows of each table
+    :param interval: The minimum number of seconds between two updates
+    :param quiet: If set to True, nothing is printed
+    :type totals: dict
+    :type interval: float
+    :type quiet: bool
+    """
+    def __init__(self, totals, interval=1.0, quiet=False):
+        self.totals = totals
+        self.interval = interval
+        self.quiet = quiet
+        self.rows = dict((table, 0) for table in totals)
+        self.start = time.monotonic()
+        self._last_print = self.start
+
+    def update(self, table, rows=1):
+        """
+        Count the generated rows of a table
+
+        :param table: The name of the table
+        :param rows: The number of rows generated
+        :type table: str
+        :type rows: int
+        """
+        self.rows[table] += rows
+        now = time.monotonic()
+        if now - self._last_print >= self.interval:
+            self._last_print = now
+            self._print('{}: {}/{} rows ({:.1f}%), {:.0f} rows/s overall'.format(
+                table,
+                self.rows[table],
+                self.totals[table],
+                100.0 * self.rows[table] / max(1, self.totals[table]),
+                sum(self.rows.values()) / max(now - self.start, 1e-9)
+            ))
+
+    def summary(self, size):
+        """
+        Print the totals of the run
+
+        :param size: The number of bytes written
+        :type size: int
+        """
+        elapsed = max(time.monotonic() - self.start, 1e-9)
+        rows = sum(self.rows.values())
+        self._print('Generated {} rows ({:.1f} MiB) in {:.2f} s: {:.0f} rows/s, {:.2f} MiB/s'.format(
+            rows,
+            size / 1024 ** 2,
+            elapsed,
+            rows / elapsed,
+            size / 1024 ** 2 / elapsed
+        ))
+
+    def _print(self, message):
+        if not self.quiet:
+            print(message, file=sys.stderr, flush=True)
+
+def generate(module, rows, output_dir, output_format='csv', seed=None, workers=1, batch_size=1000000, memory_limit=None, compression=None, create_tables=True, localization=None, quiet=False, metrics_file=None):
+    """
+    Generate a dataset into a directory, one shard every batch_size rows of each table.
+
+    With a single worker, the dataset is generated as done by :meth:`dammy.db.DatasetGenerator.export_partitioned`.
+    With more workers, every batch is generated by index in a separate process (see :meth:`dammy.db.DatasetGenerator.generate_range`),
+    the memory limit is not needed because generated rows are not kept, and a random seed is chosen and printed if none is given.
+
+    The output depends on the number of workers: with a given seed, a single worker generates a different dataset than
+    several workers, although the output is the same for any number of workers greater than one. Only sequences are kept
+    unique when generating by index, so tables with other unique fields can only be generated by a single worker.
+
+    :param module: The path of a Python file or the name of an importable module defining the entities
+    :param rows: list of tuples containing the name of each table and its number of rows
+    :param output_dir: The directory where the shards and the manifest will be saved
+    :param output_format: The format of the shards. Either 'sql', 'csv' or 'jsonl'
+    :param seed: The seed of the random number generator
+    :param workers: The number of processes generating the data
+    :param batch_size: The number of rows of each shard
+    :param memory_limit: The memory in bytes used by the process from which only the referenced columns are kept
+    :param compression: The compression used on each shard. Either None, 'gzip', 'bz2', 'lzma' or 'zstd'
+    :param create_tables: If set to true and the format is SQL, the instructions to create the tables are saved
+    :param localization: The localization used to generate the entities
+    :param quiet: If set to True, the progress is not printed
+    :param metrics_file: The path of the file where the metrics are saved in the Prometheus text format (single worker only)
+    :type module: str
+    :type rows: list
+    :type output_dir: str
+    :type output_format: str
+    :type seed: int
+    :type workers: int
+    :type batch_size: int
+    :type memory_limit: int
+    :type compression: str
+    :type create_tables: bool
+    :type localization: str
+    :type quiet: bool
+    :type metrics_file: str
+    :returns: dict containing the manifest
+    :raises: ValueError
+    """
+    if workers < 1 or batch_size < 1:
+        raise ValueError('The number of workers and the batch size must be positive')
+
+    dataset = _build_dataset(module, rows)
+    progress = Progress(dict(rows), quiet=quiet)
+
+    if workers == 1:
+        if seed is not None:
+            set_seed(seed)
+
+        manifest = dataset.export_partitioned(
+            output_dir,
+            output_format,
+            rows_per_shard=batch_size,
+            compression=compression,
+            create_tables=create_tables,
+            memory_limit=memory_limit,
+            threaded=True,
+            progress=progress.update,
+            metrics=Metrics(prometheus_file=metrics_file) if metrics_file is not None else None,
+            localization=localization
+        )
+
+    else:
+        if seed is None:
+            seed = random.getrandbits(63)
+            progress._print('Using seed {}'.format(seed))
+
+        manifest = _generate_parallel(dataset, module, rows, output_dir, output_format, seed, workers, batch_size, compression, create_tables, localization, progress)
+
+    progress.summary(sum(shard['bytes'] for table in manifest['tables'].values() for shard in table['shards']))
+
+    return manifest
+
+def _generate_parallel(dataset, module, rows, output_dir, output_format, seed, workers, batch_size, compression, create_tables, localization, progress):
+    """
+    Generate every batch of every table by index using a pool of processes. See generate()
+
+    :returns: dict containing the manifest
+    """
+    if compression not in COMPRESSION_EXTENSIONS:
+        raise ValueError('Unknown compression {}'.format(compression))
+
+    table_order, tables = dataset._get_sql_tables()
+
+    # Rows generated by index are only kept unique by sequences
+    unindexed = ['{}.{}'.format(table, attr) for table in table_order for attr in dataset._get_unindexed_unique(table)]
+    if unindexed:
+        raise ValueError('{} cannot be kept unique by several workers, only sequences can. Use a single worker'.format(', '.join(unindexed)))
+
+    # Fail before starting the workers if the format is unknown
+    dataset._get_partition_encoder(output_format, tables)
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    manifest = {
+        'format': output_format,
+        'compression': compression,
+        'schema': None,
+        'tables': {}
+    }
+
+    if output_format == 'sql' and create_tables:
+        manifest['schema'] = 'schema.sql'
+        with open(os.path.join(output_dir, 'schema.sql'), 'w') as f:
+            f.write(dataset._sql_create_tables())
+
+    counts = dict(rows)
+    with concurrent.futures.ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(module, rows)) as executor:
+        futures = {}
+        for table in table_order:
+            for shard, start in enumerate(range(0, counts[table], batch_size)):
+                stop = min(start + batch_size, counts[table])
+                future = executor.submit(_generate_shard, table, shard, start, stop, seed, output_format, compression, output_dir, localization)
+                futures[future] = (table, shard)
+
+        shards = dict((table, {}) for table in table_order)
+        for future in concurrent.futures.as_completed(futures):
+            table, shard = futures[future]
+            shards[table][shard] = future.result()
+            progress.update(table, shards[table][shard]['rows'])
+
+    for table in table_order:
+        table_shards = [shards[table][i] for i in sorted(shards[table])]
+        manifest['tables'][table] = {
+            'columns': tables[table]['columns'],
+            'rows': sum(shard['rows'] for shard in table_shards),
+            'shards': table_shards
+        }
+
+    write_manifest(output_dir, manifest)
+
+    return manifest
+
+def pack(source, output, column=None, delimiter=',', encoding='utf-8', quiet=False):
+    """
+    Build a vocabulary pack, to be used by :class:`dammy.stdlib.Vocabulary`, from a text file with one string per line
+    or from a column of a CSV file
+
+    :param source: The path of the text or CSV file
+    :param output: The path where the pack will be saved
+    :param column: The name of the CSV column containing the strings. If None, the source is read as a text file
+    :param delimiter: The delimiter of the CSV file
+    :param encoding: The encoding of the source
+    :param quiet: If set to True, the summary is not printed
+    :type source: str
+    :type output: str
+    :type column: str
+    :type delimiter: str
+    :type encoding: str
+    :type quiet: bool
+    :returns: int containing the number of strings
+    :raises: ValueError, OSError
+    """
+    start = time.perf_counter()
+    if column is None:
+        vocabulary = Vocabulary.from_text(source, output, encoding=encoding)
+    else:
+        vocabulary = Vocabulary.from_csv(source, column, output, delimiter=delimiter, encoding=encoding)
+
+    count = len(vocabulary)
+    vocabulary.close()
+
+    if not quiet:
+        print('Packed {} strings into {} in {:.2f} s'.format(count, output, time.perf_counter() - start), file=sys.stderr, flush=True)
+
+    return count
+
+def _get_parser():
+    """
+    Build the parser of the command line arguments
+
+    :returns: argparse.ArgumentParser
+    """
+    parser = argparse.ArgumentParser(prog='dammy', description='Generate fake data for any purpose')
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    gen = commands.add_parser('generate', help='Generate a dataset defined in a Python module')
+    gen.add_argument('module', help='Path of a Python file or name of a module defining the entities')
+    gen.add_argument('-r', '--rows', type=_parse_rows, action='append', required=True, metavar='TABLE=ROWS',
+                     help='Number of rows of a table. Repeat for every table of the dataset')
+    gen.add_argument('-o', '--output-dir', required=True, help='Directory where the shards and the manifest will be saved')
+    gen.add_argument('-f', '--format', dest='output_format', choices=('csv', 'sql', 'jsonl'), default='csv', help='Format of the shards (default: csv)')
+    gen.add_argument('-s', '--seed', type=int, help='Seed of the random number generator')
+    gen.add_argument('-w', '--workers', type=int, default=1, help='Number of processes generating the data (default: 1). The output differs from the one of a single worker, '
+                     'and tables with unique fields which are not sequences need a single worker')
+    gen.add_argument('-b', '--batch-size', type=int, default=1000000, help='Number of rows of each shard (default: 1000000)')
+    gen.add_argument('-m', '--memory-limit', type=_parse_size, help='Memory used from which only referenced columns are kept, such as 4G (single worker only)')
+    gen.add_argument('-c', '--compression', choices=[c for c in COMPRESSION_EXTENSIONS if c is not None], help='Compression of the shards')
+    gen.add_argument('-l', '--localization', help='Localization used to generate the entities')
+    gen.add_argument('--no-create-tables', dest='create_tables', action='store_false', help='Do not save the CREATE TABLE statements of SQL output')
+    gen.add_argument('-q', '--quiet', action='store_true', help='Do not print the progress')
+    gen.add_argument('--metrics-file', help='File where the metrics are saved in the Prometheus text format (single worker only)')
+
+    pck = commands.add_parser('pack', help='Build a vocabulary pack from a text file or a CSV column')
+    pck.add_argument('source', help='Path of a text file with one string per line, or of a CSV file')
+    pck.add_argument('output', help='Path where the pack will be saved')
+    pck.add_argument('--column', help='Name of the CSV column containing the strings. If not given, the source is read as a text file')
+    pck.add_argument('--delimiter', default=',', help='Delimiter of the CSV file (default: ,)')
+    pck.add_argument('--encoding', default='utf-8', help='Encoding of the source (default: utf-8)')
+    pck.add_argument('-q', '--quiet', action='store_true', help='Do not print the summary')
+
+    return parser
+
+def main(argv=None):
+    """
+    Run the dammy command
+
+    :param argv: The command line arguments. If None, the arguments of the process are used
+    :type argv: list
+    :returns: int containing the exit status
+    """
+    parser = _get_parser()
+    args = parser.parse_args(argv)
+
+    if args.command == 'generate':
+        try:
+            generate(
+                args.module,
+                args.rows,
+                args.output_dir,
+                output_format=args.output_format,
+                seed=args.seed,
+                workers=args.workers,
+                batch_size=args.batch_size,
+                memory_limit=args.memory_limit,
+                compression=args.compression,
+                create_tables=args.create_tables,
+                localization=args.localization,
+                quiet=args.quiet,
+                metrics_file=args.metrics_file
+            )
+        except (ValueError, ImportError, OSError, DammyException) as e:
+            parser.error(str(e))
+
+    elif args.command == 'pack':
+        try:
+            pack(args.source, args.output, column=args.column, delimiter=args.delimiter, encoding=args.encoding, quiet=args.quiet)
+        except (ValueError, OSError, DammyException) as e:
+            parser.error(str(e))
+
+    return 0
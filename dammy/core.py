@@ -4,16 +4,30 @@ in 2 modules (core, db, dataset_generator) but the dependencies between them mak
 impossible without causing circular imports
 """
 
+import io
 import json
 import csv
+import os
+import array
+import hashlib
+import mmap
+import pickle
 import random
+import threading
+import weakref
 from enum import Enum
 
 from .iterator import Iterator
-from .exceptions import DatasetRequiredException, MaximumRetriesExceededException, InvalidReferenceException, EmptyKeyException
+from .partition import ShardedTableWriter, write_manifest
+from .sampling import AliasTable, zipf_weights, fan_out_assignment
+from .sinks import DEFAULT_BUFFER_SIZE, BaseSink, sink_for
+from .exceptions import DatasetRequiredException, MaximumRetriesExceededException, InvalidReferenceException, EmptyKeyException, CheckpointException, CircularReferenceException, IntegrityException
 
 LOCALIZATION = 'default'
 
+# Number of entities generated between two checks of the memory usage
+MEMORY_CHECK_INTERVAL = 10000
+
 ############################      MISC FUNCTIONS     ############################
 
 def seed(n):
@@ -26,14 +40,311 @@ def seed(n):
     """
     random.seed(n)
 
+class _RandomSource(threading.local):
+    """
+    The random number generator the generators draw their values from on each thread: the random module, except while
+    a row is generated by index, when each value is drawn from a generator seeded for it (see generate_range())
+    """
+    rng = random
+
+_random_source = _RandomSource()
+
+def get_random():
+    """
+    Get the random number generator generators must draw their values from. It is the random module, seeded using
+    :func:`seed`, except while rows are generated by index (see :meth:`dammy.EntityGenerator.generate_range`), when it
+    is a separate generator seeded for each value, so the random module is left untouched. Custom generators drawing
+    from it are generated by index like the ones of dammy.
+
+    :returns: The random module or a random.Random
+
+    Example::
+
+        class Dice(BaseGenerator):
+            def generate_raw(self, dataset=None, localization=None):
+                return self._generate(get_random().randint(1, 6))
+    """
+    return _random_source.rng
+
+def _file_fingerprint(path, sample_size=65536):
+    """
+    Describe the content of a file without reading all of it: its size, its modification time and a hash of its first and
+    last bytes
+
+    :param path: The path of the file
+    :param sample_size: The number of bytes hashed at each end of the file
+    :type path: str
+    :type sample_size: int
+    :returns: str containing the description
+    """
+    stat = os.stat(path)
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        digest.update(f.read(sample_size))
+        if stat.st_size > sample_size:
+            f.seek(max(sample_size, stat.st_size - sample_size))
+            digest.update(f.read())
+
+    return '{}:{}:{}'.format(stat.st_size, stat.st_mtime_ns, digest.hexdigest())
+
+def _hash_seed(*parts):
+    """
+    Derive a seed from the given values. The same values always produce the same seed, no matter the
+    process, the platform or the Python version.
+
+    :param parts: The values to derive the seed from
+    :returns: A 64 bit integer
+    """
+    data = '\x00'.join(str(p) for p in parts).encode('utf-8')
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little')
+
+# The values generated for the row being generated by each thread, see _evaluate()
+_row_state = threading.local()
+
+class _RowContext:
+    """
+    Context manager making every generator evaluated using _evaluate() generate its value only once
+    while the context is active, so all the columns of a row using the same generator get the same value.
+
+    :param fresh: If set to True, a new context is always started. Otherwise, the active context is used if there is one
+    :type fresh: bool
+    """
+    def __init__(self, fresh=True):
+        self.fresh = fresh
+        self._previous = None
+
+    def __enter__(self):
+        self._previous = getattr(_row_state, 'values', None)
+        if self.fresh or self._previous is None:
+            _row_state.values = {}
+        return _row_state.values
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _row_state.values = self._previous
+
+def _evaluate(generator, dataset=None, localization=None, values=None):
+    """
+    Get the value of a generator for the row being generated. The value is generated the first time and reused
+    afterwards. Without an active row context, a new value is always generated.
+
+    :param generator: The generator
+    :param dataset: The dataset from which all referenced fields will be retrieved
+    :param values: The values of the active row context, if the caller already has them
+    :type generator: :class:`dammy.BaseGenerator`
+    :type dataset: :class:`dammy.db.DatasetGenerator` or dict
+    :type values: dict
+    :returns: The value of the generator
+    """
+    if values is None:
+        values = getattr(_row_state, 'values', None)
+    if values is None:
+        return generator.generate(dataset, localization)
+
+    # The generator is kept along with its value so its id is not reused while the row is generated
+    entry = values.get(id(generator))
+    if entry is None:
+        value = generator.generate(dataset, localization)
+        values[id(generator)] = (generator, value)
+        return value
+
+    return entry[1]
+
+def _remember(generator, value):
+    """
+    Set the value of a generator for the row being generated, if there is an active row context
+
+    :param generator: The generator
+    :param value: The value of the generator
+    :type generator: :class:`dammy.BaseGenerator`
+    """
+    values = getattr(_row_state, 'values', None)
+    if values is not None:
+        values[id(generator)] = (generator, value)
+
+def _get_nested_generators(roots):
+    """
+    Get the given generators and all the generators nested inside them. The order is always the same
+    for the same generator definitions.
+
+    :param roots: The generators to start from. Values which are not generators are ignored
+    :type roots: list
+    :returns: list containing every generator exactly once
+    """
+    generators = []
+    visited = set()
+
+    def visit(obj):
+        if isinstance(obj, BaseGenerator):
+            if id(obj) in visited:
+                return
+            visited.add(id(obj))
+            generators.append(obj)
+
+            children = list(vars(obj).values())
+            if isinstance(obj, EntityGenerator):
+                children.extend(getattr(obj, attr) for attr in obj.attrs)
+
+        elif isinstance(obj, (list, tuple)):
+            children = obj
+
+        elif isinstance(obj, dict):
+            children = list(obj.values())
+
+        else:
+            return
+
+        for child in children:
+            visit(child)
+
+    for root in roots:
+        visit(root)
+
+    return generators
+
+def _get_memory_usage():
+    """
+    Get the resident memory of the current process. If it cannot be read, the peak resident memory is used instead.
+
+    :returns: The memory used in bytes
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+############################        SESSIONS         ############################
+
+# The sessions entered with the with statement on each thread, see _current_session()
+_session_local = threading.local()
+
+# The number of sessions entered with the with statement on any thread. While there is none, every thread uses the
+# default session without looking up its own sessions
+_entered_sessions = 0
+_entered_lock = threading.Lock()
+
+class GenerationSession:
+    """
+    Holds the mutable state of generation runs: the last value of every generator, the counters of sequences such
+    as :class:`dammy.db.AutoIncrement`, the values already generated by :class:`dammy.db.Unique` fields, the children
+    assigned by foreign keys and the data of every :class:`dammy.db.DatasetGenerator`. Generators and datasets keep
+    no state themselves, so the same schema can be shared by several sessions.
+
+    The default session is shared by the whole process, so a dataset generated on one thread can be read and continued
+    on any other. A session activated using the with statement is only active on the thread activating it, for instance
+    to run several independent generations of the same schema, or generations on different threads that never mix their
+    states. Generating holds the lock of the session, so threads generating in the same session, such as the default
+    one, take turns instead of corrupting its counters and unique values.
+
+    The values still come from the random module, so generating concurrently in several threads is only reproducible
+    when each thread generates by index (see :meth:`dammy.EntityGenerator.generate_range`).
+
+    Example::
+
+        from dammy import GenerationSession
+
+        def worker():
+            with GenerationSession():
+                return DatasetGenerator((Car, 1000), (Person, 500)).generate().data
+    """
+    def __init__(self):
+        self._states = {}
+        self._references = {}
+        self._lock = threading.RLock()
+
+    def __enter__(self):
+        global _entered_sessions
+
+        stack = getattr(_session_local, 'stack', None)
+        if stack is None:
+            stack = _session_local.stack = []
+        stack.append(self)
+
+        with _entered_lock:
+            _entered_sessions += 1
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        global _entered_sessions
+
+        _session_local.stack.pop()
+        with _entered_lock:
+            _entered_sessions -= 1
+
+    def state(self, generator):
+        """
+        Get the state of a generator in this session. It is created the first time using the _new_state() method of
+        the generator and discarded when the generator is garbage collected.
+
+        :param generator: The generator
+        :type generator: :class:`dammy.BaseGenerator`
+        :returns: dict containing the state of the generator
+        """
+        try:
+            return self._states[id(generator)]
+        except KeyError:
+            pass
+
+        with self._lock:
+            # Another thread may have created it meanwhile
+            key = id(generator)
+            states = self._states
+            if key in states:
+                return states[key]
+
+            # States are removed as soon as their generator is collected, before its id can be reused
+            references = self._references
+
+            def collected(ref):
+                states.pop(key, None)
+                references.pop(key, None)
+
+            references[key] = weakref.ref(generator, collected)
+            state = states[key] = generator._new_state()
+            return state
+
+    def discard(self, generators):
+        """
+        Discard the state of the given generators, so they start again from their initial state
+
+        :param generators: The generators
+        :type generators: list
+        """
+        for generator in generators:
+            self._states.pop(id(generator), None)
+            self._references.pop(id(generator), None)
+
+    def reset(self):
+        """
+        Discard the state of every generator in constant time
+        """
+        self._states = {}
+        self._references = {}
+
+# The session used by every thread which has not entered another one
+_default_session = GenerationSession()
+
+def _current_session():
+    """
+    Get the session active on the current thread: the last one it entered, or the default session
+
+    :returns: :class:`dammy.GenerationSession`
+    """
+    if _entered_sessions == 0:
+        return _default_session
+
+    stack = getattr(_session_local, 'stack', None)
+    return stack[-1] if stack else _default_session
+
 ############################         CORE            ############################
 class BaseGenerator:
     DAMMY_LOCALIZATION = LOCALIZATION
     """
     The base class from which all generators must inherit.
     """
+
     def __init__(self, sql_equivalent):
-        self._last_generated = None
         self._sql_equivalent = sql_equivalent
 
     def iterator(self, dataset=None):
@@ -81,15 +392,141 @@ class BaseGenerator:
         """
         return self.generate_raw(dataset, localization)
 
+    def generate_batch(self, n, dataset=None, localization=None):
+        """
+        Generate several values at once. By default, generate() is called n times, but generators able
+        to produce many values faster than one by one override this method.
+
+        :param n: The number of values to generate
+        :param dataset: The dataset from which all referenced fields will be retrieved
+        :type n: int
+        :type dataset: :class:`dammy.db.DatasetGenerator` or dict
+        :returns: list containing the generated values
+        """
+        return [self.generate(dataset, localization) for _ in range(n)]
+
+    def _cardinality(self):
+        """
+        Get the number of different values the generator can generate. By default it is unknown.
+
+        :returns: The number of different values, or None if it is unknown or infinite
+        """
+        return None
+
+    def _is_unique(self):
+        """
+        Check wether every value generated in a session is different from the previous ones by construction,
+        so :class:`dammy.db.Unique` does not need to keep them. By default, it is not.
+
+        :returns: bool
+        """
+        return False
+
+    def _fingerprint(self):
+        """
+        Get a description of the data the generator reads from outside its definition, such as the content of a file,
+        so cached results depending on it can be discarded when it changes (see :func:`dammy.snapshot.fingerprint`).
+        By default, the generator reads no such data.
+
+        :returns: str containing the description, or None
+        """
+        return None
+
+    def _new_state(self):
+        """
+        Get the initial mutable state of the generator in a session. Generators keeping more state than
+        the last generated value extend it.
+
+        :returns: dict containing the initial state
+        """
+        return {'last_generated': None}
+
+    def _state(self):
+        """
+        Get the mutable state of the generator in the active session. See :class:`dammy.GenerationSession`. Generators
+        reading and then updating their state do so holding the lock of the session, so other threads cannot interleave
+
+        :returns: dict containing the state
+        """
+        return _current_session().state(self)
+
+    @property
+    def _last_generated(self):
+        """
+        The last value generated by the generator in the active session
+        """
+        return self._state()['last_generated']
+
+    @_last_generated.setter
+    def _last_generated(self, value):
+        self._state()['last_generated'] = value
+
     def _generate(self, value):
         """
         Updates the last generated value of the generator
 
         :param value: The value to set as the last generated value
         """
-        self._last_generated = value
+        _current_session().state(self)['last_generated'] = value
         return value
 
+    def _get_state(self):
+        """
+        Get the mutable state of the generator in the active session, so it can be restored later
+
+        :returns: dict containing the state
+        """
+        return dict(self._state())
+
+    def _set_state(self, state):
+        """
+        Restore a state previously obtained using _get_state()
+
+        :param state: The state to restore
+        :type state: dict
+        """
+        self._state().update(state)
+
+    def _get_checkpoint_state(self, checkpoint, key):
+        """
+        Get the state of the generator to save in a checkpoint. Generators keeping data which grows with the number
+        of generated values append what was added since the previous checkpoint to its journal instead of returning
+        it, so saving a checkpoint does not take longer as the run goes on. By default, the whole state is returned.
+
+        :param checkpoint: The checkpoint being saved
+        :param key: Identifies the records of the generator in the journal
+        :type checkpoint: :class:`dammy.checkpoint.Checkpoint`
+        :type key: tuple
+        :returns: dict containing the state
+        """
+        return self._get_state()
+
+    def _set_checkpoint_state(self, state, records):
+        """
+        Restore a state previously obtained using _get_checkpoint_state()
+
+        :param state: The state to restore
+        :param records: The records appended to the journal by the generator, in order
+        :type state: dict
+        :type records: list
+        """
+        self._set_state(state)
+
+    def _seek(self, index, seed=None, source=None):
+        """
+        Position the generator so the next generated value is the one it would generate for the row
+        at the given index. Only generators whose values depend on the previously generated ones, such as
+        sequences, need to override this method. By default, nothing is done.
+
+        :param index: The index of the row, starting at 0
+        :param seed: The seed from which the randomness of every value is derived
+        :param source: Values identifying the generator inside the entity, the same in every process
+        :type index: int
+        :type seed: int
+        :type source: tuple
+        """
+        pass
+
     def __add__(self, other):
         """
         Performs the addition of 2 BaseGenerator objects
@@ -299,6 +736,9 @@ class BaseGenerator:
         return AttributeGetter(self, name)
 
 
+# The entities whose foreign keys have been named, see EntityGenerator._name_foreign_keys()
+_named_entities = weakref.WeakSet()
+
 class EntityGenerator(BaseGenerator):
     """
     The class from which all composite generators must inherit.
@@ -312,9 +752,39 @@ class EntityGenerator(BaseGenerator):
         self.attrs = [name for name, value in items if name[:1] != '_' and name[:6] != 'DAMMY_' and not callable(value)]
         self.special_attrs = [name for name, value in items if name[:6] == 'DAMMY_']
 
+        if self.__class__ not in _named_entities:
+            self._name_foreign_keys()
+            _named_entities.add(self.__class__)
+
+    def _name_foreign_keys(self):
+        """
+        Name the columns of the foreign keys in the generated rows. They are named after the referenced fields, unless
+        another column of the entity has the same name, in which case they are named as in the SQL tables, prefixed
+        with the name of the foreign key
+        """
+        counts = {}
+        for attr in self.attrs:
+            attr_obj = getattr(self, attr)
+            if isinstance(attr_obj, ForeignKey):
+                names = attr_obj.referenced_object.fields.keys()
+            elif isinstance(attr_obj, Unique):
+                names = attr_obj.fields.keys()
+            else:
+                names = [attr]
+            for name in names:
+                counts[name] = counts.get(name, 0) + 1
+
+        for attr in self.attrs:
+            attr_obj = getattr(self, attr)
+            if isinstance(attr_obj, ForeignKey):
+                attr_obj._columns = dict(
+                    (f, f if counts[f] == 1 else '{}_{}'.format(attr, f)) for f in attr_obj.referenced_object.fields.keys()
+                )
+
     def generate_raw(self, dataset=None, localization=None):
         """
-        Gets all the attributes of the class and generates a new value.
+        Gets all the attributes of the class and generates a new value. Every generator is evaluated
+        only once per row, so all the columns derived from the same generator use the same value.
 
         Implementation of the generate_raw() method from BaseGenerator.
 
@@ -327,17 +797,38 @@ class EntityGenerator(BaseGenerator):
         if localization is None:
             localization = self.DAMMY_LOCALIZATION
 
+        plan, needs_context = self._get_row_plan()
+        if not needs_context:
+            return self._generate(self._generate_row(plan, dataset, localization))
+
+        with _RowContext() as values:
+            return self._generate(self._generate_row(plan, dataset, localization, values))
+
+    def _generate_row(self, plan, dataset=None, localization=None, values=None):
+        """
+        Generate the value of every attribute
+
+        :param plan: The attributes, as returned by _get_row_plan()
+        :param dataset: The dataset from which all referenced fields will be retrieved
+        :param localization: The localization used to generate the row
+        :param values: The values of the active row context, if there is one
+        :type plan: list
+        :type dataset: :class:`dammy.db.DatasetGenerator` or dict
+        :type localization: str
+        :type values: dict
+        :returns: A dict where every key value pair is an attribute and its value
+        """
         result = {}
-        for attr in self.attrs:
-            attr_obj = getattr(self, attr)
+        for attr, attr_obj, shared in plan:
 
             # Get references to foreign keys and generate primary keys and unique values
             if isinstance(attr_obj, ForeignKey) or isinstance(attr_obj, Unique):
-                generated = attr_obj.generate(dataset, localization)
-                for k, v in generated.items():
-                    result[k] = v
+                result.update(attr_obj.generate(dataset, localization))
+
+            # Generate other fields, only once per row if other fields use them
+            elif shared:
+                result[attr] = _evaluate(attr_obj, dataset, localization, values)
 
-            # Generate other fields
             elif isinstance(attr_obj, BaseGenerator):
                 result[attr] = attr_obj.generate(dataset, localization)
 
@@ -345,8 +836,149 @@ class EntityGenerator(BaseGenerator):
             else:
                 result[attr] = attr_obj
 
+        return result
+
+    def _get_row_plan(self):
+        """
+        Get the attributes of the entity along with wether their value has to be kept while generating a row because
+        other attributes use it, such as a column used to derive other columns. Only entities with derived values need
+        a row context (see _evaluate()).
+
+        :returns: A tuple containing a list of (name, value, shared) tuples, one per attribute, and wether a row context is needed
+        """
+        if '_row_plan' not in vars(self):
+            uses = {}
+            derived = False
+            for attr in self.attrs:
+                for generator in _get_nested_generators([getattr(self, attr)]):
+                    uses[id(generator)] = uses.get(id(generator), 0) + 1
+                    derived = derived or isinstance(generator, (FunctionResult, AttributeGetter, MethodCaller, OperationResult))
+
+            plan = []
+            for attr in self.attrs:
+                attr_obj = getattr(self, attr)
+                plan.append((attr, attr_obj, isinstance(attr_obj, BaseGenerator) and uses[id(attr_obj)] > 1))
+
+            self._row_plan = (plan, derived or any(shared for _, _, shared in plan))
+
+        return self._row_plan
+
+    def _generate_at(self, index, seed, dataset=None, localization=None):
+        """
+        Generates the row at the given index without generating the previous ones. The randomness of each
+        value is derived from the seed, the name of the entity, the name of the attribute and the index,
+        so the same row is always generated for the same index.
+
+        :param index: The index of the row, starting at 0
+        :param seed: The seed from which the randomness of every value is derived
+        :param dataset: The dataset from which all referenced fields will be retrieved
+        :param localization: The localization used to generate the row
+        :type index: int
+        :type seed: int
+        :type dataset: :class:`dammy.db.DatasetGenerator` or dict
+        :type localization: str
+        :returns: A dict where every key value pair is an attribute and its value
+        """
+        if localization is None:
+            localization = self.DAMMY_LOCALIZATION
+
+        if '_sequences' not in vars(self):
+            generators = _get_nested_generators([getattr(self, attr) for attr in self.attrs])
+            self._sequences = [g for g in generators if type(g)._seek is not BaseGenerator._seek]
+
+        table = self.__class__.__name__
+        for i, sequence in enumerate(self._sequences):
+            sequence._seek(index, seed, (table, i))
+
+        plan, _ = self._get_row_plan()
+
+        # Every value is drawn from a generator of its own, so the random module is left untouched
+        rng = random.Random()
+        previous = _random_source.rng
+        _random_source.rng = rng
+
+        result = {}
+        try:
+            with _RowContext() as values:
+                for attr, attr_obj, shared in plan:
+                    rng.seed(_hash_seed(seed, table, attr, index))
+
+                    # Get references to foreign keys and generate primary keys and unique values
+                    if isinstance(attr_obj, ForeignKey):
+                        result.update(attr_obj._generate_at(index, seed, dataset, localization, (table, attr)))
+
+                    elif isinstance(attr_obj, Unique):
+                        result.update(attr_obj._generate_at(dataset, localization))
+
+                    # Generate other fields, only once per row if other fields use them
+                    elif shared:
+                        result[attr] = _evaluate(attr_obj, dataset, localization, values)
+
+                    elif isinstance(attr_obj, BaseGenerator):
+                        result[attr] = attr_obj.generate(dataset, localization)
+
+                    # Generate constant values
+                    else:
+                        result[attr] = attr_obj
+        finally:
+            _random_source.rng = previous
+
         return self._generate(result)
 
+    def generate_at(self, index, seed, dataset=None, localization=None):
+        """
+        Generates the row at the given index without generating the previous ones. See generate_range().
+
+        :param index: The index of the row, starting at 0
+        :param seed: The seed from which the randomness of every value is derived
+        :param dataset: The dataset from which all referenced fields will be retrieved
+        :param localization: The localization used to generate the row
+        :type index: int
+        :type seed: int
+        :type dataset: :class:`dammy.db.DatasetGenerator` or dict
+        :type localization: str
+        :returns: A dict where every key value pair is an attribute and its value
+        """
+        return self.generate_range(index, index + 1, seed, dataset, localization)[0]
+
+    def generate_range(self, start, stop, seed, dataset=None, localization=None):
+        """
+        Generates the rows from start (included) to stop (excluded) in O(stop - start) time, without generating
+        the previous ones. Every value is generated from a seed derived from the given seed, the name of the entity,
+        the name of the attribute and the index of the row, so a row is always the same no matter which range it is
+        generated in. Rows can be generated in parallel by splitting the indices between processes.
+
+        Sequences such as :class:`dammy.db.AutoIncrement` generate the value corresponding to the index of the row. The
+        values generated by :class:`dammy.db.Unique` fields are not checked against the other rows, so only sequences
+        are guaranteed to be unique. Foreign keys referencing a table of a :class:`dammy.db.DatasetGenerator` choose a row
+        of that table by index and generate it the same way.
+
+        The results differ from the ones obtained by generate(), and generating a range leaves the state of the
+        generators and of the random module untouched: every value is drawn from a generator of its own, returned by
+        :func:`dammy.get_random` while it is generated.
+
+        :param start: The index of the first row, starting at 0
+        :param stop: The index after the last row
+        :param seed: The seed from which the randomness of every value is derived
+        :param dataset: The dataset from which all referenced fields will be retrieved
+        :param localization: The localization used to generate the rows
+        :type start: int
+        :type stop: int
+        :type seed: int
+        :type dataset: :class:`dammy.db.DatasetGenerator` or dict
+        :type localization: str
+        :returns: list containing the generated rows
+        """
+        if isinstance(dataset, DatasetGenerator) and self.__class__.__name__ in dataset._name_class_map:
+            return dataset.generate_range(self.__class__.__name__, start, stop, seed, localization)
+
+        random_state = random.getstate()
+        try:
+            with GenerationSession():
+                return [self._generate_at(i, seed, dataset, localization) for i in range(start, stop)]
+        finally:
+            random.setstate(random_state)
+
     def _get_column_names(self):
         """
         Get the names of the columns for this entity
@@ -355,20 +987,29 @@ class EntityGenerator(BaseGenerator):
         """
         result = []
         for attr in self.attrs:
-            attr_obj = getattr(self, attr)
+            result.extend(self._get_attr_columns(attr))
 
-            # Get references to foreign keys
-            if isinstance(attr_obj, ForeignKey):
-                result.extend(attr_obj.referenced_object.fields.keys())
+        return result
 
-            # Generate primary keys and unique values
-            elif isinstance(attr_obj, Unique):
-                result.extend(attr_obj.fields.keys())
+    def _get_attr_columns(self, attr):
+        """
+        Get the names of the columns of an attribute
 
-            else:
-                result.append(attr)
+        :param attr: The name of the attribute
+        :type attr: str
+        :returns: list containing the names of its columns
+        """
+        attr_obj = getattr(self, attr)
 
-        return result
+        # Get references to foreign keys
+        if isinstance(attr_obj, ForeignKey):
+            return list(attr_obj._columns.values())
+
+        # Generate primary keys and unique values
+        elif isinstance(attr_obj, Unique):
+            return list(attr_obj.fields.keys())
+
+        return [attr]
 
     def _get_instances(self, number):
         """
@@ -385,33 +1026,42 @@ class EntityGenerator(BaseGenerator):
         Get the specified amount of instances as a list of json dicts
 
         :param number: The number of instances
-        :param save_to: The path where the generated json will be saved. If none, it will be returned as a string
+        :param save_to: The path or the sink where the generated json will be saved. If none, it will be returned as a string
         :type number: int
-        :type save_to: str
+        :type save_to: str or :class:`dammy.sinks.BaseSink`
         :returns: str containing the generated json if save_to=None, None in other cases
         """
         if save_to is None:
             return json.dumps(self._get_instances(number), indent=indent)
         else:
-            with open(save_to, 'w') as f:
-                json.dump(self._get_instances(number), f, indent=indent)
-                f.close()
+            with sink_for(save_to) as sink:
+                sink.write(json.dumps(self._get_instances(number), indent=indent))
             return None
 
     def to_csv(self, number, save_to):
         """
-        Save the specified amount of instances in a csv file
+        Save the specified amount of instances in a csv file. Instances are written as they are generated,
+        by a background thread when save_to is a path.
 
         :param number: The number of instances
-        :param save_to: The path to the file where the instances will be saved
+        :param save_to: The path to the file or the sink where the instances will be saved
         :type number: int
-        :type save_to: str
+        :type save_to: str or :class:`dammy.sinks.BaseSink`
         """
-        with open(save_to, 'w') as f:
-            writer = csv.writer(f, delimiter=',')
+        with sink_for(save_to, threaded=True) as sink:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer, delimiter=',')
             writer.writerow(self._get_column_names())
-            writer.writerows([list(r.values()) for r in self._get_instances(number)])
-            f.close()
+
+            for _ in range(0, number):
+                writer.writerow(list(self.generate().values()))
+
+                if buffer.tell() >= DEFAULT_BUFFER_SIZE:
+                    sink.write(buffer.getvalue())
+                    buffer.seek(0)
+                    buffer.truncate()
+
+            sink.write(buffer.getvalue())
 
 ############################ Generator manipulation  ############################
 class FunctionResult(BaseGenerator):
@@ -427,7 +1077,7 @@ class FunctionResult(BaseGenerator):
 
     def generate_raw(self, dataset=None, localization=None):
         """
-        Generate a value and call the function using the generated value as a parameter
+        Call the function using the value of the generator in the current row as a parameter
 
         Implementation of the generate_raw() method from BaseGenerator.
 
@@ -435,7 +1085,8 @@ class FunctionResult(BaseGenerator):
         :type dataset: :class:`dammy.db.DatasetGenerator` or dict
         :returns: The result of running the generated value through the function
         """
-        return self._generate(self.function(self.obj.generate(dataset), *self.args, **self.kwargs))
+        with _RowContext(fresh=False):
+            return self._generate(self.function(_evaluate(self.obj, dataset, localization), *self.args, **self.kwargs))
 
 class AttributeGetter(BaseGenerator):
     """
@@ -448,7 +1099,7 @@ class AttributeGetter(BaseGenerator):
 
     def generate_raw(self, dataset=None, localization=None):
         """
-        Generate a value and get the specified attribute
+        Get the specified attribute of the value of the generator in the current row
 
         Implementation of the generate_raw() method from BaseGenerator.
 
@@ -456,7 +1107,8 @@ class AttributeGetter(BaseGenerator):
         :type dataset: :class:`dammy.db.DatasetGenerator` or dict
         :returns: The value of the attribute on the generated object
         """
-        return self._generate(getattr(self.obj.generate(dataset, localization), self.attr))
+        with _RowContext(fresh=False):
+            return self._generate(getattr(_evaluate(self.obj, dataset, localization), self.attr))
 
     def __call__(self, *args, **kwargs):
         """
@@ -481,7 +1133,7 @@ class MethodCaller(BaseGenerator):
 
     def generate_raw(self, dataset=None, localization=None):
         """
-        Generate a value and call the specified method on the generated value
+        Call the specified method on the value of the generator in the current row
 
         Implementation of the generate_raw() method from BaseGenerator.
 
@@ -489,7 +1141,8 @@ class MethodCaller(BaseGenerator):
         :type dataset: :class:`dammy.db.DatasetGenerator` or dict
         :returns: The value returned by the called method
         """
-        method = getattr(self.obj.generate(dataset, localization), self.method)
+        with _RowContext(fresh=False):
+            method = getattr(_evaluate(self.obj, dataset, localization), self.method)
 
         if len(self.args) == 1 and len(self.args[0]) == 0:
             if len(self.kwargs) == 0:
@@ -531,11 +1184,11 @@ class OperationResult(BaseGenerator):
         self.d2 = b
 
     @staticmethod
-    def _get_operand_value(op, dataset=None):
+    def _get_operand_value(op, dataset=None, localization=None):
         """
         Get the value of the operand. If it is a generator, the value of the operand
-        will be a value generated by the generator. If it is not, the value will be
-        the input value.
+        will be the value of the generator in the current row, generated only once per row.
+        If it is not, the value will be the input value.
 
         :param op: The operand value or a generator generating that value
         :param dataset: The dataset from which all referenced fields will be retrieved
@@ -543,14 +1196,8 @@ class OperationResult(BaseGenerator):
         :returns: The value returned after performing the operation
         :raises: DatasetRequiredException
         """
-        if isinstance(op, OperationResult) or isinstance(op, AttributeGetter) or isinstance(op, FunctionResult) or isinstance(op, MethodCaller):
-            return op.generate_raw(dataset)
-
-        elif isinstance(op, BaseGenerator):
-            if op._last_generated is None:
-                return op.generate_raw(dataset)
-            else:
-                return op._last_generated
+        if isinstance(op, BaseGenerator):
+            return _evaluate(op, dataset, localization)
         else:
             return op
 
@@ -566,8 +1213,9 @@ class OperationResult(BaseGenerator):
         :returns: The value returned after performing the operation
         :raises: TypeError
         """
-        d1 = OperationResult._get_operand_value(self.d1, dataset)
-        d2 = OperationResult._get_operand_value(self.d2, dataset)
+        with _RowContext(fresh=False):
+            d1 = OperationResult._get_operand_value(self.d1, dataset, localization)
+            d2 = OperationResult._get_operand_value(self.d2, dataset, localization)
 
         if self.operator == OperationResult.Operator.addition:
             result = d1 + d2
@@ -617,10 +1265,17 @@ class AutoIncrement(BaseGenerator):
     """
     def __init__(self, start=1, increment=1):
         super(AutoIncrement, self).__init__('INTEGER')
-        if self._last_generated is None:
-            self._last_generated = start - 1
+        self._start = start
         self._increment = increment
 
+    def _new_state(self):
+        """
+        Get the initial state of the sequence, positioned before its first value
+
+        :returns: dict containing the initial state
+        """
+        return {'last_generated': self._start - self._increment}
+
     def generate_raw(self, dataset=None, localization=None):
         """
         Generates and updates the next value
@@ -631,11 +1286,25 @@ class AutoIncrement(BaseGenerator):
         :type dataset: :class:`dammy.db.DatasetGenerator` or dict
         :returns: The next value of the sequence
         """
-        return self._generate(self._last_generated + 1)
+        with _current_session()._lock:
+            state = self._state()
+            state['last_generated'] += self._increment
+            return state['last_generated']
+
+    def _seek(self, index, seed=None, source=None):
+        """
+        Position the sequence so the next value is the one of the row at the given index
+
+        :param index: The index of the row, starting at 0
+        :type index: int
+        """
+        self._state()['last_generated'] = self._start + (index - 1) * self._increment
 
 class Unique(BaseGenerator):
     """
-    Represents a unique field. The generator encapsulated here, will be guaranteed to generate unique values
+    Represents a unique field. The generator encapsulated here, will be guaranteed to generate unique values.
+    The generated values are kept to check them, unless one of the generators never repeats a value, such as
+    :class:`dammy.stdlib.Ascending` without repetition.
 
     :param u: The generator which will generate unique values
     :param max_retries: The number of times it will retry to generate the value when it has already been generated
@@ -647,45 +1316,118 @@ class Unique(BaseGenerator):
             raise EmptyKeyException()
 
         self.table = None
-        self.generated = set()
         self.max_retries = max_retries
         self.fields = kwargs
 
     def __len__(self):
         return len(self.fields)
 
-    def __generate_using(self, method, dataset=None, localization=None):
-        generated = []
-        for x in self.fields.values():
-            generate_method = getattr(x, method)
-            generated.append(generate_method(dataset, localization))
-        generated = tuple(generated)
+    def _new_state(self):
+        """
+        Get the initial state of the field: no values generated and no retries
 
-        retries = 0
-        while generated in self.generated and retries < self.max_retries:
-            generated = []
-            for x in self.fields.values():
-                generate_method = getattr(x, method)
-                generated.append(generate_method(dataset, localization))
-            generated = tuple(generated)
-            retries += 1
+        :returns: dict containing the initial state
+        """
+        return {'last_generated': None, 'generated': set(), 'unsaved': None, 'retries': 0, 'collisions': 0}
 
-        if retries < self.max_retries:
-            self.generated.add(generated)
-            return self._generate(dict(zip(self.fields.keys(), generated)))
-        else:
-            raise MaximumRetriesExceededException(
-                'Maximum retries exceeded for {}. Cannot generate more than {} unique values'.format(
-                    self.fields,
-                    len(self.generated)
-                )
-            )
+    @property
+    def generated(self):
+        """
+        The values generated in the active session
+        """
+        return self._state()['generated']
 
-    def generate_raw(self, dataset=None, localization=None):
+    @property
+    def retries(self):
         """
-        Generates a unique value
+        The number of values generated again in the active session because they had already been generated
+        """
+        return self._state()['retries']
 
-        Implementation of the generate_raw() method from BaseGenerator.
+    @property
+    def collisions(self):
+        """
+        The number of values needing at least one retry in the active session
+        """
+        return self._state()['collisions']
+
+    def _cardinality(self):
+        """
+        Get the number of different values the generator can generate, which is the product of
+        the number of values of each field
+
+        :returns: The number of different values, or None if it is unknown or infinite
+        """
+        cardinality = 1
+        for x in self.fields.values():
+            field_cardinality = x._cardinality() if isinstance(x, BaseGenerator) else None
+            if field_cardinality is None:
+                return None
+            cardinality *= field_cardinality
+
+        return cardinality
+
+    def __generate_using(self, method, dataset=None, localization=None):
+        with _current_session()._lock:
+            state = self._state()
+            already_generated = state['generated']
+
+            # Values unique by construction are not kept
+            if '_limits' not in vars(self):
+                tracked = not any(isinstance(x, BaseGenerator) and x._is_unique() for x in self.fields.values())
+                self._limits = (tracked, self._cardinality())
+            tracked, cardinality = self._limits
+
+            if tracked and cardinality is not None and len(already_generated) >= cardinality:
+                raise MaximumRetriesExceededException(
+                    'All the {} possible values of {} have already been generated'.format(cardinality, self.fields)
+                )
+
+            generated = []
+            for x in self.fields.values():
+                generate_method = getattr(x, method)
+                generated.append(generate_method(dataset, localization))
+            generated = tuple(generated)
+
+            retries = 0
+            while generated in already_generated and retries < self.max_retries:
+                generated = []
+                for x in self.fields.values():
+                    generate_method = getattr(x, method)
+                    generated.append(generate_method(dataset, localization))
+                generated = tuple(generated)
+                retries += 1
+
+            if retries > 0:
+                state['retries'] += retries
+                state['collisions'] += 1
+
+            if retries < self.max_retries:
+                if tracked:
+                    already_generated.add(generated)
+                    if state['unsaved'] is not None:
+                        state['unsaved'].append(generated)
+
+                # Retries bypass the row context, so the accepted values are the ones used by the rest of the row
+                if getattr(_row_state, 'values', None) is not None:
+                    for x, value in zip(self.fields.values(), generated):
+                        _remember(x, value)
+
+                state['last_generated'] = dict(zip(self.fields.keys(), generated))
+                return state['last_generated']
+            else:
+                raise MaximumRetriesExceededException(
+                    'Maximum retries exceeded for {}. Cannot generate more than {} unique values'.format(
+                        self.fields,
+                        len(already_generated)
+                    )
+                )
+
+    def generate_raw(self, dataset=None, localization=None):
+        """
+        Generates a unique value
+
+        Implementation of the generate_raw() method from BaseGenerator.
 
         :param dataset: The dataset from which all referenced fields will be retrieved.
         :type dataset: :class:`dammy.db.DatasetGenerator` or dict
@@ -707,11 +1449,69 @@ class Unique(BaseGenerator):
         """
         return self.__generate_using('generate', dataset, localization)
 
+    def _generate_at(self, dataset=None, localization=None):
+        """
+        Generates a value without checking wether it has already been generated, as done when generating
+        rows by index. See :meth:`dammy.EntityGenerator.generate_range`
+
+        :param dataset: The dataset from which all referenced fields will be retrieved.
+        :type dataset: :class:`dammy.db.DatasetGenerator` or dict
+        :returns: The value generated by the associated generator
+        """
+        return self._generate(dict((k, _evaluate(x, dataset, localization)) for k, x in self.fields.items()))
+
     def reset(self):
         """
-        Reset the uniqueness of the generator.
+        Reset the uniqueness of the generator in the active session.
+        """
+        state = self._state()
+        state['generated'] = set()
+        state['unsaved'] = None
+
+    def _spill(self):
+        """
+        Move the generated values to a :class:`dammy.core.SpilledSet` on disk, so they no longer use memory
+        """
+        state = self._state()
+        if not isinstance(state['generated'], SpilledSet):
+            state['generated'] = SpilledSet(state['generated'])
+
+    def _get_checkpoint_state(self, checkpoint, key):
+        """
+        Get the state of the field to save in a checkpoint. The values generated since the previous checkpoint are
+        appended to its journal, all of them the first time.
+
+        :param checkpoint: The checkpoint being saved
+        :param key: Identifies the records of the generator in the journal
+        :type checkpoint: :class:`dammy.checkpoint.Checkpoint`
+        :type key: tuple
+        :returns: dict containing the state, without the generated values
+        """
+        state = self._state()
+        if state['unsaved'] is None:
+            checkpoint.append(key, (True, list(state['generated'])))
+        elif len(state['unsaved']) > 0:
+            checkpoint.append(key, (False, state['unsaved']))
+        state['unsaved'] = []
+
+        return dict((k, v) for k, v in state.items() if k not in ('generated', 'unsaved'))
+
+    def _set_checkpoint_state(self, state, records):
+        """
+        Restore a state previously obtained using _get_checkpoint_state(), adding back the values in the journal
+
+        :param state: The state to restore
+        :param records: The records appended to the journal by the generator, in order
+        :type state: dict
+        :type records: list
         """
-        self.generated = set()
+        generated = set()
+        for reset, values in records:
+            if reset:
+                generated = set()
+            generated.update(values)
+
+        self._state().update(state, generated=generated, unsaved=[])
 
 class PrimaryKey(Unique):
     """
@@ -749,23 +1549,79 @@ class ForeignKey(BaseGenerator):
     and the second a list of strings, each of them containing the name of a field forming
     the primary key. If the referenced attribut is not unique or primay key, a InvalidReferenceException is raised
 
-    :param ref_table: The table where the referenced field is
-    :param \*args: List of the names of the fields forming the referenced key
-    :type ref_table: :class:`dammy.db.EntityGenerator`
-    :type \*args: str
-    :raises: :class:`dammy.exceptions.InvalidReferenceException`
+    By default, every referenced row is equally likely to be chosen. Skewed references, where a few rows are referenced
+    much more often than the rest, are generated by giving one of the following:
+
+    - zipf: The exponent of a Zipf distribution. The first row is the most referenced one, the second row is referenced half
+      as often when the exponent is 1, and so on.
+    - weights: The weight of each referenced row. The number of weights must match the number of referenced rows.
+    - fan_out: The number of times each row is referenced, or a tuple with the minimum and the maximum. Children are
+      assigned to parents beforehand, so generating more children than the fan-out allows raises an IntegrityException.
+
+    Rows are chosen in O(1) time using an alias table (see :class:`dammy.sampling.AliasTable`) built once for the referenced table.
+
+    The values of the key are stored in the rows under the names of the referenced fields. When another column of the entity
+    has the same name, such as its own primary key or another foreign key to the same table, they are stored under the names of
+    the SQL columns instead, prefixed with the name of the foreign key (for example, sender_id).
+
+    Keys of a table which is not generated, such as an existing production table, are referenced by giving a
+    :class:`dammy.db.KeyIndex` instead of an entity. Keys are read from the index only when chosen, and Zipf skewed
+    references are sampled in constant memory.
+
+    :param ref_table: The table where the referenced field is, or the index of the keys of an external table
+    :param ref_field: The name of the unique field or the primary key referenced. It can only be omitted when referencing an index
+    :param zipf: The exponent of the Zipf distribution used to choose the referenced rows
+    :param weights: The weight of each referenced row
+    :param fan_out: The number of children of each referenced row, or a tuple with the minimum and the maximum
+    :type ref_table: :class:`dammy.db.EntityGenerator` or :class:`dammy.db.KeyIndex`
+    :type ref_field: str
+    :type zipf: float
+    :type weights: list
+    :type fan_out: int or tuple
+    :raises: :class:`dammy.exceptions.InvalidReferenceException`, ValueError
+
+    Example::
+
+        class Order(EntityGenerator):
+            customer = ForeignKey(Customer, 'key', zipf=1.1)    # A few customers place most of the orders
+            product = ForeignKey(Product, 'key', fan_out=(0, 20))
     """
-    def __init__(self, ref_table, ref_field):
+    def __init__(self, ref_table, ref_field=None, zipf=None, weights=None, fan_out=None):
         super(ForeignKey, self).__init__(None)
 
-        attr_obj = getattr(ref_table, ref_field)
+        if len([x for x in (zipf, weights, fan_out) if x is not None]) > 1:
+            raise ValueError('Only one of zipf, weights or fan_out can be given')
+
+        if isinstance(ref_table, KeyIndex):
+            if ref_field is not None and ref_field != ref_table.field:
+                raise InvalidReferenceException('The index of {} contains {}, not {}'.format(ref_table.table, ref_table.field, ref_field))
+
+            self.referenced_table = ref_table.table
+            self.referenced_field = ref_table.field
+            self.referenced_object = Unique(**{ref_table.field: ref_table})
+            self.external = ref_table
 
-        if isinstance(attr_obj, Unique):
-            self.referenced_table = ref_table.__name__
-            self.referenced_field = ref_field
-            self.referenced_object = attr_obj
         else:
-            raise InvalidReferenceException('Unique or PrimaryKey expected, got {}'.format(attr_obj.__class__.__name__))
+            if ref_field is None:
+                raise InvalidReferenceException('The referenced field of {} must be given'.format(getattr(ref_table, '__name__', ref_table)))
+
+            attr_obj = getattr(ref_table, ref_field)
+
+            if isinstance(attr_obj, Unique):
+                self.referenced_table = ref_table.__name__
+                self.referenced_field = ref_field
+                self.referenced_object = attr_obj
+                self.external = None
+            else:
+                raise InvalidReferenceException('Unique or PrimaryKey expected, got {}'.format(attr_obj.__class__.__name__))
+
+        self._zipf = zipf
+        self._weights = weights
+        self._fan_out = fan_out
+        self._sampler = None
+
+        # The name of the column of each referenced field in the rows, set by the entity containing the key
+        self._columns = dict((f, f) for f in self.referenced_object.fields.keys())
 
     def __len__(self):
         """
@@ -775,6 +1631,112 @@ class ForeignKey(BaseGenerator):
         """
         return len(self.referenced_object)
 
+    def _new_state(self):
+        """
+        Get the initial state of the key: no children assigned to the referenced rows and no references resolved
+
+        :returns: dict containing the initial state
+        """
+        return {'last_generated': None, 'assignment': None, 'saved_assignment': None, 'assigned': 0, 'indexed_assignment': None, 'resolutions': 0}
+
+    @property
+    def resolutions(self):
+        """
+        The number of references resolved in the active session
+        """
+        return self._state()['resolutions']
+
+    def reset(self):
+        """
+        Forget the children assigned to each referenced row in the active session when a fan-out is given, so the
+        references can be generated again
+        """
+        state = self._state()
+        state['assignment'] = None
+        state['assigned'] = 0
+
+    def _get_checkpoint_state(self, checkpoint, key):
+        """
+        Get the state of the key to save in a checkpoint. The children assigned to each referenced row do not change
+        once assigned, so they are appended to its journal only when they are assigned again.
+
+        :param checkpoint: The checkpoint being saved
+        :param key: Identifies the records of the generator in the journal
+        :type checkpoint: :class:`dammy.checkpoint.Checkpoint`
+        :type key: tuple
+        :returns: dict containing the state, without the assignment
+        """
+        state = self._state()
+        if state['assignment'] is not state['saved_assignment']:
+            checkpoint.append(key, state['assignment'])
+            state['saved_assignment'] = state['assignment']
+
+        return dict((k, v) for k, v in state.items() if k not in ('assignment', 'saved_assignment', 'indexed_assignment'))
+
+    def _set_checkpoint_state(self, state, records):
+        """
+        Restore a state previously obtained using _get_checkpoint_state(), reading the assignment from the journal
+
+        :param state: The state to restore
+        :param records: The records appended to the journal by the generator, in order
+        :type state: dict
+        :type records: list
+        """
+        assignment = records[-1] if len(records) > 0 else None
+        self._state().update(state, assignment=assignment, saved_assignment=assignment, indexed_assignment=None)
+
+    def _get_sampler(self, count):
+        """
+        Get the alias table used to choose among the given number of referenced rows
+
+        :param count: The number of referenced rows
+        :type count: int
+        :returns: :class:`dammy.sampling.AliasTable`, or None if rows are chosen uniformly
+        :raises: IntegrityException
+        """
+        if self._zipf is None and self._weights is None:
+            return None
+
+        # An alias table would need memory for every key of an external table, so Zipf is sampled directly
+        if self.external is not None and self._weights is None:
+            sampler = self._sampler
+            if sampler is None or sampler._n != count:
+                from .stdlib.distributions import Zipf
+                sampler = self._sampler = Zipf(self._zipf, count)
+            return sampler
+
+        # The table only depends on the number of rows, so it is shared by every session
+        sampler = self._sampler
+        if sampler is None or len(sampler) != count:
+            if self._weights is not None:
+                if len(self._weights) != count:
+                    raise IntegrityException('{} weights given for {} {}s'.format(len(self._weights), count, self.referenced_table))
+                sampler = AliasTable(self._weights)
+            else:
+                sampler = AliasTable(zipf_weights(count, self._zipf))
+            self._sampler = sampler
+
+        return sampler
+
+    def _get_assigned(self, assignment, child):
+        """
+        Get the referenced row assigned to a child when a fan-out is given
+
+        :param assignment: The index of the referenced row of every child
+        :param child: The index of the child
+        :type assignment: array.array
+        :type child: int
+        :returns: int containing the index of the referenced row
+        :raises: IntegrityException
+        """
+        if child >= len(assignment):
+            raise IntegrityException('The fan-out of {} allows {} references, but more have been requested'.format(
+                self.referenced_table,
+                len(assignment)
+            ))
+
+        return assignment[child]
+
     def generate_raw(self, dataset=None, localization=None):
         """
         Gets the values corresponding to the key from the given dataset. If the dataset is not specified,
@@ -785,23 +1747,512 @@ class ForeignKey(BaseGenerator):
         :param dataset: The dataset from which all referenced fields will be retrieved.
         :type dataset: :class:`dammy.db.DatasetGenerator` or dict
         :returns: A unique value generated by the associated generator
-        :raises: DatasetRequiredException
+        :raises: DatasetRequiredException, IntegrityException
         """
-        if dataset is None:
-            raise DatasetRequiredException(
-                'Reference to a unique field or primary key ({}) given but no dataset containing {}s supplied'.format(
-                    self.referenced_field,
-                    self.referenced_table
+        with _current_session()._lock:
+            if self.external is not None:
+                return self._generate_external(self._choose_external(len(self.external)))
+
+            if dataset is None:
+                raise DatasetRequiredException(
+                    'Reference to a unique field or primary key ({}) given but no dataset containing {}s supplied'.format(
+                        self.referenced_field,
+                        self.referenced_table
+                    )
                 )
-            )
+            else:
+                rows = dataset[self.referenced_table]
+
+                if len(rows) == 0:
+                    raise IntegrityException('Reference to {} given but no {}s have been generated'.format(
+                        self.referenced_field,
+                        self.referenced_table
+                    ))
+
+                state = self._state()
+                if self._fan_out is not None:
+                    if state['assignment'] is None:
+                        state['assignment'] = fan_out_assignment(len(rows), self._fan_out, _random_source.rng)
+                    chosen = rows[self._get_assigned(state['assignment'], state['assigned'])]
+                    state['assigned'] += 1
+
+                else:
+                    sampler = self._get_sampler(len(rows))
+                    chosen = _random_source.rng.choice(rows) if sampler is None else rows[sampler.sample(_random_source.rng)]
+
+                state['resolutions'] += 1
+                state['last_generated'] = dict((self._columns[k], v) for k, v in chosen.items() if k in self._columns)
+                return state['last_generated']
+
+    def _choose_external(self, count, index=None, seed=None, source=None):
+        """
+        Choose a key of the external table. When a fan-out is given, the keys are assigned to the children beforehand,
+        by index when generating rows by index.
+
+        :param count: The number of keys
+        :param index: The index of the row containing the foreign key, when generating rows by index
+        :param seed: The seed from which the randomness of every value is derived, when generating rows by index
+        :param source: The names of the table and the attribute containing the foreign key
+        :type count: int
+        :type index: int
+        :type seed: int
+        :type source: tuple
+        :returns: int containing the position of the key in the index
+        :raises: IntegrityException
+        """
+        if count == 0:
+            raise IntegrityException('Reference to {} given but the index of {} is empty'.format(
+                self.referenced_field,
+                self.referenced_table
+            ))
+
+        state = self._state()
+        if self._fan_out is not None:
+            if index is None:
+                if state['assignment'] is None:
+                    state['assignment'] = fan_out_assignment(count, self._fan_out, _random_source.rng)
+                position = self._get_assigned(state['assignment'], state['assigned'])
+                state['assigned'] += 1
+                return position
+
+            key = (seed, count, source)
+            if state['indexed_assignment'] is None or state['indexed_assignment'][0] != key:
+                rng = random.Random(_hash_seed(seed, 'fan_out', *(source or ())))
+                state['indexed_assignment'] = (key, fan_out_assignment(count, self._fan_out, rng))
+            return self._get_assigned(state['indexed_assignment'][1], index)
+
+        sampler = self._get_sampler(count)
+        if sampler is None:
+            return _random_source.rng.randrange(count)
+        if isinstance(sampler, AliasTable):
+            return sampler.sample(_random_source.rng)
+        return sampler._sample() - 1
+
+    def _generate_external(self, position):
+        """
+        Get the key at the given position of the external index
+
+        :param position: The position of the key in the index
+        :type position: int
+        :returns: dict containing the key
+        """
+        state = self._state()
+        state['resolutions'] += 1
+        state['last_generated'] = {self._columns[self.referenced_field]: self.external[position]}
+        return state['last_generated']
+
+    def _generate_at(self, index, seed, dataset=None, localization=None, source=None):
+        """
+        Chooses a row of the referenced table by index and generates it using the given seed, as done when
+        generating rows by index. See :meth:`dammy.EntityGenerator.generate_range`. If the dataset is not a
+        :class:`dammy.db.DatasetGenerator`, the row is chosen among the rows in the dataset.
+
+        :param index: The index of the row containing the foreign key
+        :param seed: The seed from which the randomness of every value is derived
+        :param dataset: The dataset from which all referenced fields will be retrieved.
+        :param source: The names of the table and the attribute containing the foreign key, from which the fan-out assignment is derived
+        :type index: int
+        :type seed: int
+        :type dataset: :class:`dammy.db.DatasetGenerator` or dict
+        :type source: tuple
+        :returns: The values of the referenced key
+        :raises: DatasetRequiredException, IntegrityException
+        """
+        if self.external is not None:
+            return self._generate_external(self._choose_external(len(self.external), index, seed, source))
+
+        if not isinstance(dataset, DatasetGenerator):
+            return self.generate_raw(dataset, localization)
+
+        count = dataset._fixed_counters[self.referenced_table]
+        if count <= 0:
+            raise IntegrityException('Reference to {} given but no {}s are generated'.format(
+                self.referenced_field,
+                self.referenced_table
+            ))
+
+        state = self._state()
+        if self._fan_out is not None:
+            key = (seed, count, source)
+            if state['indexed_assignment'] is None or state['indexed_assignment'][0] != key:
+                rng = random.Random(_hash_seed(seed, 'fan_out', *(source or ())))
+                state['indexed_assignment'] = (key, fan_out_assignment(count, self._fan_out, rng))
+            parent = self._get_assigned(state['indexed_assignment'][1], index)
+
         else:
-            if isinstance(dataset, DatasetGenerator):
-                while dataset._counters[self.referenced_table] != 0:
-                    dataset._generate_entity(self.referenced_table)
+            sampler = self._get_sampler(count)
+            parent = _random_source.rng.randrange(count) if sampler is None else sampler.sample(_random_source.rng)
+
+        chosen = dataset._generate_row_at(self.referenced_table, parent, seed, localization)
+
+        state['resolutions'] += 1
+        state['last_generated'] = dict((self._columns[k], v) for k, v in chosen.items() if k in self._columns)
+        return state['last_generated']
+
+class KeyColumns:
+    """
+    Compact storage for the rows of a table whose data has been written and discarded, keeping only the
+    columns referenced by foreign keys. Integer and floating point columns are stored as arrays instead of
+    lists of Python objects. It can be used as a list of rows containing only the kept columns.
+
+    :param fields: The names of the columns to keep
+    :type fields: list
+    """
+    def __init__(self, fields):
+        self.fields = list(fields)
+        self._columns = [None] * len(self.fields)
+        self._length = 0
+
+    def append(self, row):
+        """
+        Add the kept columns of a row
+
+        :param row: The row
+        :type row: dict
+        """
+        for i, field in enumerate(self.fields):
+            value = row[field]
+            column = self._columns[i]
+
+            if column is None:
+                if type(value) is int:
+                    column = array.array('q')
+                elif type(value) is float:
+                    column = array.array('d')
+                else:
+                    column = []
+                self._columns[i] = column
+
+            try:
+                column.append(value)
+            except (TypeError, OverflowError):
+                # The value does not fit in the array, fall back to a list
+                column = self._columns[i] = list(column)
+                column.append(value)
+
+        self._length += 1
+
+    def __len__(self):
+        """
+        Counts the number of rows
+
+        :returns: The number of rows
+        """
+        return self._length
+
+    def __getitem__(self, index):
+        """
+        Get the kept columns of a row
+
+        :param index: The position of the row
+        :type index: int
+        :returns: dict containing the kept columns of the row
+        """
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError('Row index out of range')
+
+        return dict((field, column[index]) for field, column in zip(self.fields, self._columns))
+
+    def __iter__(self):
+        for i in range(0, self._length):
+            yield self[i]
+
+class SpilledSet:
+    """
+    Set of the values generated by a unique field, kept in a temporary database on disk instead of in memory once the
+    memory limit is reached (see :meth:`dammy.db.DatasetGenerator.export`). The values added recently are kept in memory
+    and written in batches, so the memory used does not grow with the number of values.
+
+    :param values: The values already generated
+    :type values: iterable
+    """
+    # The number of values kept in memory before writing them
+    BATCH_SIZE = 10000
+
+    def __init__(self, values=()):
+        import sqlite3
+
+        # An empty name opens a private database in a temporary file, deleted once it is closed
+        self._db = sqlite3.connect('', check_same_thread=False)
+        self._db.execute('CREATE TABLE generated (value BLOB PRIMARY KEY) WITHOUT ROWID')
+        self._pending = set()
+        self._length = 0
+        for value in values:
+            self.add(value)
+
+    @staticmethod
+    def _key(value):
+        return pickle.dumps(value, protocol=4)
+
+    def _flush(self):
+        """
+        Write the values kept in memory to the database
+        """
+        if len(self._pending) > 0:
+            self._db.executemany('INSERT OR IGNORE INTO generated VALUES (?)', ((self._key(v),) for v in self._pending))
+            self._pending = set()
+
+    def add(self, value):
+        """
+        Add a value if it is not in the set
+
+        :param value: The value
+        :type value: tuple
+        """
+        if value not in self:
+            self._pending.add(value)
+            self._length += 1
+            if len(self._pending) >= SpilledSet.BATCH_SIZE:
+                self._flush()
+
+    def __contains__(self, value):
+        if value in self._pending:
+            return True
+        return self._db.execute('SELECT 1 FROM generated WHERE value = ?', (self._key(value),)).fetchone() is not None
+
+    def __len__(self):
+        """
+        Counts the number of values
+
+        :returns: The number of values
+        """
+        return self._length
+
+    def __iter__(self):
+        self._flush()
+        for (key,) in self._db.execute('SELECT value FROM generated'):
+            yield pickle.loads(key)
+
+class KeyIndex(BaseGenerator):
+    """
+    The keys of an existing table, such as a production table, stored in a file of fixed width keys which is memory
+    mapped instead of loaded. Integer keys are stored as 64 bit integers in the native byte order and string keys as UTF-8
+    padded with null bytes to the given width, so any raw binary file of keys in one of these layouts can be used directly.
+    Indices can also be built from a CSV file or a SQLite table.
+
+    A :class:`dammy.db.ForeignKey` given an index references its keys, which are read from the file only when chosen.
+    Generating the index itself gives a random key.
+
+    :param path: The path of the file of keys
+    :param table: The name of the table containing the keys
+    :param field: The name of the key column
+    :param key_type: Either 'int' or 'str'
+    :param width: The width in bytes of string keys
+    :type path: str
+    :type table: str
+    :type field: str
+    :type key_type: str
+    :type width: int
+    :raises: ValueError
+
+    Example::
+
+        customers = KeyIndex.from_csv('customers.csv', 'id', 'customers.idx', 'Customer')
+
+        class Order(EntityGenerator):
+            id = PrimaryKey(order_id=AutoIncrement())
+            customer = ForeignKey(customers, zipf=1.1)
+    """
+    def __init__(self, path, table, field, key_type='int', width=None):
+        if key_type == 'int':
+            width = 8
+            sql_equivalent = 'INTEGER'
+        elif key_type == 'str':
+            if width is None or width < 1:
+                raise ValueError('The width of string keys must be given')
+            sql_equivalent = 'VARCHAR({})'.format(width)
+        else:
+            raise ValueError('Unknown key type {}'.format(key_type))
+
+        super(KeyIndex, self).__init__(sql_equivalent)
+        self.path = path
+        self.table = table
+        self.field = field
+        self.key_type = key_type
+        self.width = width
+
+        size = os.path.getsize(path)
+        if size % width != 0:
+            raise ValueError('The size of {} is not a multiple of the width of the keys ({} bytes)'.format(path, width))
+
+        self._length = size // width
+        self._file = open(path, 'rb')
+
+        # Empty files cannot be mapped
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size > 0 else b''
+        self._keys = memoryview(self._map).cast('q') if key_type == 'int' else memoryview(self._map)
+
+    @classmethod
+    def _write(cls, keys, path, table, field, key_type='int', width=None):
+        """
+        Write keys to an index file and open it
+
+        :param keys: Iterable of keys, or a function returning a new iterable of keys when the width must be computed
+        :returns: :class:`KeyIndex`
+        """
+        if key_type == 'str' and width is None:
+            width = max((len(str(k).encode('utf-8')) for k in keys()), default=1)
+
+        with open(path, 'wb') as f:
+            if key_type == 'int':
+                buffer = array.array('q')
+                for key in (keys() if callable(keys) else keys):
+                    buffer.append(int(key))
+                    if len(buffer) >= DEFAULT_BUFFER_SIZE // 8:
+                        buffer.tofile(f)
+                        buffer = array.array('q')
+                buffer.tofile(f)
+
+            else:
+                buffer = []
+                for key in (keys() if callable(keys) else keys):
+                    encoded = str(key).encode('utf-8')
+                    if len(encoded) > width:
+                        raise ValueError('The key {} is longer than {} bytes'.format(key, width))
+                    buffer.append(encoded.ljust(width, b'\x00'))
+                    if len(buffer) >= DEFAULT_BUFFER_SIZE // width:
+                        f.write(b''.join(buffer))
+                        buffer = []
+                f.write(b''.join(buffer))
+
+        return cls(path, table, field, key_type, width)
+
+    @classmethod
+    def from_csv(cls, csv_path, column, path, table, field=None, key_type='int', width=None, delimiter=','):
+        """
+        Build an index from a column of a CSV file with a header. The file is read as a stream, and read twice
+        when the width of string keys is not given.
+
+        :param csv_path: The path of the CSV file
+        :param column: The name of the column containing the keys
+        :param path: The path where the index will be saved
+        :param table: The name of the table containing the keys
+        :param field: The name of the key column. By default, the name of the CSV column
+        :param key_type: Either 'int' or 'str'
+        :param width: The width in bytes of string keys. By default, the width of the longest key
+        :param delimiter: The delimiter of the CSV file
+        :type csv_path: str
+        :type column: str
+        :type path: str
+        :type table: str
+        :type field: str
+        :type key_type: str
+        :type width: int
+        :type delimiter: str
+        :returns: :class:`KeyIndex`
+        :raises: ValueError
+        """
+        def keys():
+            with open(csv_path, newline='') as f:
+                reader = csv.reader(f, delimiter=delimiter)
+                header = next(reader, [])
+                if column not in header:
+                    raise ValueError('{} has no column {}'.format(csv_path, column))
+                i = header.index(column)
+                for row in reader:
+                    yield row[i]
+
+        return cls._write(keys, path, table, field or column, key_type, width)
+
+    @classmethod
+    def from_sqlite(cls, database, source_table, column, path, table=None, field=None, key_type='int', width=None):
+        """
+        Build an index from a column of a SQLite table. The rows are read as a stream, and read twice
+        when the width of string keys is not given.
+
+        :param database: The path of the SQLite database
+        :param source_table: The name of the table in the database
+        :param column: The name of the column containing the keys
+        :param path: The path where the index will be saved
+        :param table: The name of the table containing the keys. By default, the name of the table in the database
+        :param field: The name of the key column. By default, the name of the column in the database
+        :param key_type: Either 'int' or 'str'
+        :param width: The width in bytes of string keys. By default, the width of the longest key
+        :type database: str
+        :type source_table: str
+        :type column: str
+        :type path: str
+        :type table: str
+        :type field: str
+        :type key_type: str
+        :type width: int
+        :returns: :class:`KeyIndex`
+        :raises: ValueError
+        """
+        import sqlite3
+
+        connection = sqlite3.connect(database)
+
+        def keys():
+            cursor = connection.execute('SELECT "{}" FROM "{}"'.format(column, source_table))
+            for row in cursor:
+                yield row[0]
+
+        try:
+            return cls._write(keys, path, table or source_table, field or column, key_type, width)
+        finally:
+            connection.close()
+
+    def __len__(self):
+        """
+        Counts the number of keys
+
+        :returns: The number of keys
+        """
+        return self._length
+
+    def __getitem__(self, index):
+        """
+        Get a key
+
+        :param index: The position of the key
+        :type index: int
+        :returns: The key, either an int or a str
+        """
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError('Key index out of range')
+
+        if self.key_type == 'int':
+            return self._keys[index]
+
+        start = index * self.width
+        return str(self._keys[start:start + self.width], 'utf-8').rstrip('\x00')
+
+    def generate_raw(self, dataset=None, localization=None):
+        """
+        Get a random key
+
+        Implementation of the generate_raw() method from BaseGenerator.
+
+        :param dataset: The dataset from which all referenced fields will be retrieved. It will be ignored
+        :type dataset: :class:`dammy.db.DatasetGenerator` or dict
+        :returns: A randomly chosen key
+        """
+        return self._generate(self[_random_source.rng.randrange(self._length)])
 
-            chosen = random.choice(dataset[self.referenced_table])
+    def _cardinality(self):
+        return self._length
 
-            return self._generate(dict((k, v) for k, v in chosen.items() if k in self.referenced_object.fields.keys()))
+    def _fingerprint(self):
+        """
+        Describe the content of the file of keys
+
+        :returns: str containing the description
+        """
+        return _file_fingerprint(self.path)
+
+    def close(self):
+        """
+        Unmap and close the file of keys
+        """
+        self._keys.release()
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
 
 ############################    dataset_generator    ############################
 class DatasetGenerator(BaseGenerator):
@@ -855,23 +2306,372 @@ class DatasetGenerator(BaseGenerator):
         self._fixed_counters = dict((v[0].__name__, v[1]) for v in args)
         self._name_class_map = dict((v[0].__name__, v[0]) for v in args)
         self._args = args
+        self._indexed_entities = {}
+        self._lookup_fields = {}
+        self._amplified = {}
 
-        self.data = {}
-        self._counters = None
+    def _new_state(self):
+        """
+        Get the initial state of a generation run of the dataset: no data, no entities left to generate, no
+        indexes and no listener, memory limit or metrics, which are only set while exporting
 
-    def _generate_entity(self, c, localization):
+        :returns: dict containing the initial state
         """
-        Generates a single entity of the given class
+        return {
+            'last_generated': None,
+            'data': {},
+            'counters': None,
+            'spilling': False,
+            'row_listener': None,
+            'memory_limit': None,
+            'metrics': None,
+            'row_fragments': None,
+            'indexes': {},
+            'templates': {},
+            'saved_rows': {},
+            'unchecked_rows': 0
+        }
 
-        :param c: The class that will generate the entity
-        :type c: :class:`dammy.BaseGenerator`
+    @property
+    def data(self):
         """
-        if c in self.data:
-            self.data[c].append(self._name_class_map[c]().generate(self, localization))
-            self._counters[c] -= 1
-        else:
-            self.data[c] = []
-            self._generate_entity(c, localization)
+        The data generated in the active session, as a dict containing the list of rows of each table
+        """
+        return self._state()['data']
+
+    def _reset(self):
+        """
+        Discard all the generated data and set the number of entities to generate back to the given values.
+        Sequences, unique fields and foreign keys start again from their initial state.
+        """
+        session = _current_session()
+        session.discard(self._get_generators())
+
+        state = session.state(self)
+        state['counters'] = self._fixed_counters.copy()
+        state['data'] = dict((name, []) for name in self._name_class_map)
+        state['spilling'] = False
+        state['indexes'] = {}
+        state['templates'] = {}
+        state['saved_rows'] = {}
+        state['unchecked_rows'] = 0
+
+    def _get_referenced_fields(self):
+        """
+        Get the columns of each table referenced by foreign keys
+
+        :returns: dict containing the list of referenced columns of each table
+        """
+        referenced = dict((name, []) for name in self._name_class_map)
+        for generator in self._get_generators():
+            if isinstance(generator, ForeignKey) and generator.external is None:
+                fields = referenced.setdefault(generator.referenced_table, [])
+                fields.extend(f for f in generator.referenced_object.fields.keys() if f not in fields)
+
+        return referenced
+
+    def _spill(self):
+        """
+        Discard the data generated so far except the columns referenced by foreign keys, which are kept
+        as :class:`dammy.core.KeyColumns`. From now on, only those columns are kept for new entities. The values
+        of unique fields are moved to disk (see :class:`dammy.core.SpilledSet`).
+        """
+        state = self._state()
+        referenced = self._get_referenced_fields()
+        for name, rows in state['data'].items():
+            if not isinstance(rows, KeyColumns):
+                columns = KeyColumns(referenced[name])
+                for row in rows:
+                    columns.append(row)
+                state['data'][name] = columns
+
+        for generator in self._get_generators():
+            if isinstance(generator, Unique):
+                generator._spill()
+
+        state['spilling'] = True
+
+    def _check_memory(self):
+        """
+        Start keeping only the referenced columns and moving unique values to disk if the memory limit has been reached
+        """
+        state = self._state()
+        if state['memory_limit'] is not None and not state['spilling'] and _get_memory_usage() >= state['memory_limit']:
+            self._spill()
+
+    def _get_table_order(self):
+        """
+        Sort the tables so every table goes after all the tables it references through foreign keys.
+        Tables are kept in the order they were given whenever possible.
+
+        :returns: list containing the names of the tables
+        :raises: :class:`dammy.exceptions.InvalidReferenceException`, :class:`dammy.exceptions.CircularReferenceException`
+        """
+        dependencies = {}
+        for name, c in self._name_class_map.items():
+            dependencies[name] = []
+            for generator in self._get_generators([c]):
+                if isinstance(generator, ForeignKey) and generator.external is None and generator.referenced_table not in dependencies[name]:
+                    if generator.referenced_table not in self._name_class_map:
+                        raise InvalidReferenceException(
+                            '{} references {}, which is not part of the dataset'.format(name, generator.referenced_table)
+                        )
+                    dependencies[name].append(generator.referenced_table)
+
+        order = []
+        pending = list(self._name_class_map.keys())
+        while len(pending) > 0:
+            ready = [t for t in pending if all(d in order for d in dependencies[t])]
+
+            if len(ready) == 0:
+                # Follow the references from any pending table until a table is repeated to find a cycle
+                path = [pending[0]]
+                while path.count(path[-1]) < 2:
+                    path.append([d for d in dependencies[path[-1]] if d not in order][0])
+                cycle = path[path.index(path[-1]):]
+                raise CircularReferenceException('Circular reference between tables: {}'.format(' -> '.join(cycle)))
+
+            order.append(ready[0])
+            pending.remove(ready[0])
+
+        return order
+
+    def _generate_table(self, name, localization=None, after_entity=None):
+        """
+        Generates all the pending entities of a table. All the tables it references must have been generated before.
+
+        :param name: The name of the table
+        :param localization: The localization used to generate the entities
+        :param after_entity: A function called without arguments after generating each entity
+        :type name: str
+        :type localization: str
+        :type after_entity: callable
+        """
+        entity = self._name_class_map[name]()
+        self._check_memory()
+
+        state = self._state()
+        counters = state['counters']
+        row_listener = state['row_listener']
+        metrics = state['metrics']
+        memory_limit = state['memory_limit']
+        amplifier = self._get_amplifier(name, entity, localization) if name in self._amplified else None
+        encoded = None
+
+        # The rows generated since the memory was last checked, counting the rows of the previous tables
+        unchecked = state['unchecked_rows']
+
+        while counters[name] > 0:
+            if amplifier is None:
+                row = entity.generate(self, localization)
+            else:
+                row, encoded = amplifier()
+            state['data'][name].append(row)
+            counters[name] -= 1
+
+            if row_listener is not None:
+                row_listener(name, row, encoded)
+
+            if metrics is not None:
+                metrics.tick()
+
+            if memory_limit is not None:
+                unchecked += 1
+                if unchecked >= MEMORY_CHECK_INTERVAL:
+                    self._check_memory()
+                    unchecked = 0
+
+            if after_entity is not None:
+                after_entity()
+
+        state['unchecked_rows'] = unchecked
+
+    def amplify(self, table, templates, jitter=(), sampling='cycle'):
+        """
+        Generate a table by cloning a pool of template rows instead of generating every row, for volume tests where only
+        the keys and a few columns need to vary. The templates are generated once, and each row copies the columns of a
+        template, chosen one after another (cycle) or at random (sample). The primary key, the unique fields, the
+        sequences such as :class:`dammy.db.AutoIncrement` and the jitter attributes are generated again for every row.
+        Jitter attributes derived from copied columns use the values of the template, and copied columns cannot be
+        derived from jitter attributes, so every row stays consistent.
+
+        When exporting, the encoding of the columns copied from each template is computed once, so most of each row is
+        written without encoding its values again. Amplification applies to :meth:`generate`, :meth:`export` and
+        :meth:`export_partitioned`, not to generation by index (see :meth:`generate_range`).
+
+        :param table: The name of the table
+        :param templates: The number of template rows
+        :param jitter: The attributes generated again for every row
+        :param sampling: Either 'cycle' or 'sample'
+        :type table: str
+        :type templates: int
+        :type jitter: list
+        :type sampling: str
+        :returns: The dataset itself
+        :raises: ValueError
+
+        Example::
+
+            dataset = DatasetGenerator((Customer, 1000), (Order, 1000000000))
+            dataset.amplify('Order', 10000, jitter=['amount', 'created_at'])
+        """
+        if table not in self._name_class_map:
+            raise ValueError('{} is not part of the dataset'.format(table))
+        if templates < 1:
+            raise ValueError('The number of templates must be positive')
+        if sampling not in ('cycle', 'sample'):
+            raise ValueError('Unknown sampling {}'.format(sampling))
+
+        entity = self._get_entity(table)
+        unknown = [attr for attr in jitter if attr not in entity.attrs]
+        if unknown:
+            raise ValueError('{} has no attribute {}'.format(table, ', '.join(unknown)))
+
+        # A copied column derived from a jitter attribute would not match the value generated for the row
+        plan, _ = entity._get_row_plan()
+        jittered = dict((id(attr_obj), attr) for attr, attr_obj, _ in plan if attr in jitter and isinstance(attr_obj, BaseGenerator))
+        for (attr, attr_obj, _), fresh in zip(plan, DatasetGenerator._get_fresh_attributes(plan, jitter)):
+            used = [jittered[id(g)] for g in _get_nested_generators([attr_obj]) if id(g) in jittered]
+            if not fresh and used:
+                raise ValueError('{} is derived from the jitter attribute {}, so it must be jittered too'.format(attr, ', '.join(used)))
+
+        self._amplified[table] = {'templates': templates, 'jitter': tuple(jitter), 'sampling': sampling}
+        return self
+
+    @staticmethod
+    def _get_fresh_attributes(plan, jitter):
+        """
+        Get which attributes of an amplified table are generated again for every row instead of being copied from a
+        template: the jitter attributes, the primary key, the unique fields and the attributes using sequences
+
+        :param plan: The attributes, as returned by :meth:`dammy.EntityGenerator._get_row_plan`
+        :param jitter: The names of the jitter attributes
+        :type plan: list
+        :type jitter: list
+        :returns: list containing True for every attribute generated again, False for the copied ones
+        """
+        return [
+            attr in jitter or isinstance(attr_obj, Unique) or not isinstance(attr_obj, ForeignKey)
+            and any(isinstance(g, AutoIncrement) for g in _get_nested_generators([attr_obj]))
+            for attr, attr_obj, _ in plan
+        ]
+
+    def _get_amplifier(self, name, entity, localization=None):
+        """
+        Get the function generating the next row of an amplified table (see amplify()). The templates are generated the
+        first time and kept in the state of the run, so a run resumed from a checkpoint uses the same templates, along
+        with the values of the generators of the copied columns the generated attributes are derived from. Each row is
+        generated in a row context holding those values, so derived attributes are consistent with the copied columns.
+
+        :param name: The name of the table
+        :param entity: The entity of the table
+        :param localization: The localization used to generate the entities
+        :type name: str
+        :type entity: :class:`dammy.EntityGenerator`
+        :type localization: str
+        :returns: A function without arguments returning the next row and its encoding, or None if the rows are not being written
+        """
+        options = self._amplified[name]
+        if localization is None:
+            localization = entity.DAMMY_LOCALIZATION
+
+        plan, _ = entity._get_row_plan()
+        fresh = DatasetGenerator._get_fresh_attributes(plan, options['jitter'])
+        fresh_plan = [p for p, f in zip(plan, fresh) if f]
+        fresh_columns = [entity._get_attr_columns(attr) for (attr, _, _), f in zip(plan, fresh) if f]
+
+        # The generators of the copied columns whose values are used by the generated attributes
+        used = set(id(g) for g in _get_nested_generators([attr_obj for _, attr_obj, _ in fresh_plan]))
+        seeded = [g for g in _get_nested_generators([attr_obj for (_, attr_obj, _), f in zip(plan, fresh) if not f]) if id(g) in used]
+
+        # Each template contains the columns of every copied attribute, in the order of the attributes, and the
+        # position and the value of every seeded generator evaluated while generating it
+        state = self._state()
+        templates = state['templates'].get(name)
+        if templates is None:
+            templates = []
+            for _ in range(options['templates']):
+                with _RowContext() as values:
+                    parts = [entity._generate_row([p], self, localization, values) for p, f in zip(plan, fresh) if not f]
+                seed = [(i, values[id(g)][1]) for i, g in enumerate(seeded) if id(g) in values]
+                templates.append((parts, seed))
+            state['templates'][name] = templates
+
+        contexts = None
+        if len(seeded) > 0:
+            contexts = [dict((id(seeded[i]), (seeded[i], value)) for i, value in seed) for _, seed in templates]
+
+        # The encoding of each template: strings for the copied columns and the position of the generated attributes
+        encoded = None
+        if state['row_fragments'] is not None:
+            prefix, encode_value, separator, suffix = state['row_fragments'](name)
+            encoded = []
+            for parts, _ in templates:
+                parts = iter(parts)
+                segments = []
+                for f in fresh:
+                    if f:
+                        segments.append(len(segments))
+                    else:
+                        part = separator.join(encode_value(c, v) for c, v in next(parts).items())
+                        if segments and type(segments[-1]) is str:
+                            segments[-1] += separator + part
+                        else:
+                            segments.append(part)
+                encoded.append(segments)
+
+        counters = state['counters']
+        sampling = options['sampling']
+        count = len(templates)
+
+        def amplify():
+            if sampling == 'cycle':
+                k = (self._fixed_counters[name] - counters[name]) % count
+            else:
+                k = _random_source.rng.randrange(count)
+
+            with _RowContext() as context:
+                if contexts is not None:
+                    context.update(contexts[k])
+                values = entity._generate_row(fresh_plan, self, localization, context)
+
+            row = {}
+            parts = iter(templates[k][0])
+            columns = iter(fresh_columns)
+            for f in fresh:
+                if f:
+                    for c in next(columns):
+                        row[c] = values[c]
+                else:
+                    row.update(next(parts))
+
+            if encoded is None:
+                return row, None
+
+            pieces = []
+            columns = iter(fresh_columns)
+            for segment in encoded[k]:
+                if type(segment) is str:
+                    pieces.append(segment)
+                else:
+                    pieces.append(separator.join(encode_value(c, values[c]) for c in next(columns)))
+
+            return row, prefix + separator.join(pieces) + suffix
+
+        return amplify
+
+    def _generate_pending(self, localization=None, after_entity=None):
+        """
+        Generates all the entities that have not been generated yet. Tables are generated one after another,
+        so every table is generated after the tables it references.
+
+        :param localization: The localization used to generate the entities
+        :param after_entity: A function called without arguments after generating each entity
+        :type localization: str
+        :type after_entity: callable
+        """
+        for name in self._get_table_order():
+            self._generate_table(name, localization, after_entity)
 
     def generate_raw(self, dataset=None, localization=None):
         """
@@ -884,47 +2684,541 @@ class DatasetGenerator(BaseGenerator):
         :returns: A dict where every key value pair is an attribute and its value
         :raises: :class:`dammy.exceptions.DatasetRequiredException`
         """
-        self._counters = self._fixed_counters.copy()
-        self.data = {}
+        with _current_session()._lock:
+            self._reset()
+
+            self._generate_pending(localization)
+
+            return self._generate(self)
+
+    def _generate_row_at(self, table, index, seed, localization=None):
+        """
+        Generates the row of a table at the given index. See :meth:`dammy.EntityGenerator.generate_range`
 
-        for c, n in self._args:
-            if self._counters[c.__name__] != 0:
-                for _ in range(0, n):
-                    self._generate_entity(c.__name__, localization)
+        :param table: The name of the table
+        :param index: The index of the row, starting at 0
+        :param seed: The seed from which the randomness of every value is derived
+        :param localization: The localization used to generate the row
+        :type table: str
+        :type index: int
+        :type seed: int
+        :type localization: str
+        :returns: dict containing the row
+        """
+        return self._get_entity(table)._generate_at(index, seed, self, localization)
 
-        return self._generate(self)
+    def _get_entity(self, table):
+        """
+        Get an instance of the entity of a table, created the first time it is needed
+
+        :param table: The name of the table
+        :type table: str
+        :returns: :class:`dammy.EntityGenerator`
+        """
+        if table not in self._indexed_entities:
+            self._indexed_entities[table] = self._name_class_map[table]()
+
+        return self._indexed_entities[table]
+
+    def _get_unindexed_unique(self, table):
+        """
+        Get the unique fields of a table which are not kept unique when its rows are generated by index, because some
+        of their fields are not sequences. See generate_range()
+
+        :param table: The name of the table
+        :type table: str
+        :returns: list containing the names of the unique fields
+        """
+        plan, _ = self._get_entity(table)._get_row_plan()
+        return [
+            attr for attr, attr_obj, _ in plan
+            if isinstance(attr_obj, Unique) and not all(isinstance(x, AutoIncrement) for x in attr_obj.fields.values())
+        ]
+
+    def generate_range(self, table, start, stop, seed, localization=None):
+        """
+        Generates the rows of a table from start (included) to stop (excluded) in O(stop - start) time,
+        without generating any other row. Referenced rows are generated by index the same way, so the generated
+        rows are always consistent with the rest of the table and with the referenced tables, no matter which
+        ranges are generated. See :meth:`dammy.EntityGenerator.generate_range` for the details.
+
+        The generated rows are not added to the dataset.
+
+        :param table: The name of the table
+        :param start: The index of the first row, starting at 0
+        :param stop: The index after the last row
+        :param seed: The seed from which the randomness of every value is derived
+        :param localization: The localization used to generate the rows
+        :type table: str
+        :type start: int
+        :type stop: int
+        :type seed: int
+        :type localization: str
+        :returns: list containing the generated rows
+        :raises: ValueError
+        """
+        if not 0 <= start <= stop <= self._fixed_counters[table]:
+            raise ValueError('Invalid range [{}, {}) for {} rows of {}'.format(start, stop, self._fixed_counters[table], table))
+
+        random_state = random.getstate()
+        try:
+            with GenerationSession():
+                return [self._generate_row_at(table, i, seed, localization) for i in range(start, stop)]
+        finally:
+            random.setstate(random_state)
+
+    def changes(self, mix=None, update_columns=None, on_delete='restrict', weights=None, localization=None):
+        """
+        Get a stream of inserts, updates and deletes over the generated data. See :class:`dammy.cdc.ChangeStream`
+
+        :param mix: The weight of each operation. By default, {'insert': 0.5, 'update': 0.4, 'delete': 0.1}
+        :param update_columns: The attributes updated in each table. By default, every attribute which is not a key
+        :param on_delete: Either 'restrict' to never delete referenced rows or 'cascade' to delete the rows referencing them
+        :param weights: The weight of each table when choosing the table of a change. By default, the number of rows of each table
+        :param localization: The localization used to generate the new values
+        :type mix: dict
+        :type update_columns: dict
+        :type on_delete: str
+        :type weights: dict
+        :type localization: str
+        :returns: :class:`dammy.cdc.ChangeStream`
+        :raises: ValueError
+        """
+        from .cdc import ChangeStream
+        return ChangeStream(self, mix, update_columns, on_delete, weights, localization)
+
+    def estimate(self, sample_size=1000, output_format='sql', localization=None):
+        """
+        Estimate the time, the memory and the size of the output of the generation of the dataset by generating a sample
+        of every table, and describe how every column is generated. See :class:`dammy.estimate.Estimate`
+
+        :param sample_size: The maximum number of rows generated of each table
+        :param output_format: Either 'sql', 'csv' or 'jsonl'
+        :param localization: The localization used to generate the rows
+        :type sample_size: int
+        :type output_format: str
+        :type localization: str
+        :returns: :class:`dammy.estimate.Estimate`
+        :raises: ValueError
+        """
+        from .estimate import Estimate
+        return Estimate(self, sample_size, output_format, localization)
+
+    def _get_generators(self, classes=None):
+        """
+        Get all the generators used by the entities of the dataset, including the ones nested inside
+        other generators. The order is always the same for the same entity definitions.
+
+        :param classes: The entity classes whose generators will be returned. If None, all the entities of the dataset are used
+        :type classes: list
+        :returns: list containing every generator exactly once
+        """
+        if classes is None:
+            classes = self._name_class_map.values()
+
+        return _get_nested_generators([getattr(c, attr) for c in classes for attr in c().attrs])
+
+    def _get_state(self, checkpoint):
+        """
+        Get the state of the generation run to save in a checkpoint: the entities left to generate, the state of
+        every generator and the state of the random number generator. The referenced columns of the rows generated
+        since the previous checkpoint are appended to the journal of the checkpoint, along with the data kept by the
+        generators (see :meth:`dammy.BaseGenerator._get_checkpoint_state`), so saving a checkpoint only writes what was
+        generated since the previous one.
+
+        :param checkpoint: The checkpoint being saved
+        :type checkpoint: :class:`dammy.checkpoint.Checkpoint`
+        :returns: dict containing the state of the run
+        """
+        state = self._state()
+        referenced = self._get_referenced_fields()
+
+        for name, rows in state['data'].items():
+            saved = state['saved_rows'].get(name, 0)
+            if saved < len(rows):
+                fields = referenced[name]
+                checkpoint.append(('data', name), [tuple(rows[i][f] for f in fields) for i in range(saved, len(rows))])
+                state['saved_rows'][name] = len(rows)
+
+        return {
+            'tables': [(c.__name__, n) for c, n in self._args],
+            'counters': state['counters'],
+            'referenced': referenced,
+            'templates': state['templates'],
+            'generators': [g._get_checkpoint_state(checkpoint, ('generator', i)) for i, g in enumerate(self._get_generators())],
+            'random': random.getstate()
+        }
+
+    def _set_state(self, state, checkpoint):
+        """
+        Restore the state of a generation run obtained using _get_state(). Only the referenced columns of the rows
+        generated before the checkpoint are restored, as done when the memory limit is reached (see :meth:`export`).
+
+        :param state: The state to restore
+        :param checkpoint: The loaded checkpoint
+        :type state: dict
+        :type checkpoint: :class:`dammy.checkpoint.Checkpoint`
+        :raises: :class:`dammy.exceptions.CheckpointException`
+        """
+        generators = self._get_generators()
+
+        if state['tables'] != [(c.__name__, n) for c, n in self._args] or len(state['generators']) != len(generators):
+            raise CheckpointException('The checkpoint does not match the definition of the dataset')
+
+        records = checkpoint.records()
+        data = {}
+        for name, fields in state['referenced'].items():
+            columns = data[name] = KeyColumns(fields)
+            for keys in records.get(('data', name), []):
+                for key in keys:
+                    columns.append(dict(zip(fields, key)))
+
+        saved_rows = dict((name, len(rows)) for name, rows in data.items())
+        self._state().update(counters=state['counters'], data=data, saved_rows=saved_rows, indexes={}, templates=state['templates'])
+
+        for i, (generator, generator_state) in enumerate(zip(generators, state['generators'])):
+            generator._set_checkpoint_state(generator_state, records.get(('generator', i), []))
+
+        random.setstate(state['random'])
+
+    def _get_row_encoder(self, output_format):
+        """
+        Get the function used to encode a single row in the given format
+
+        :param output_format: The format, either 'sql' or 'jsonl'
+        :type output_format: str
+        :returns: A function taking the table name and the row and returning the encoded row as a string
+        :raises: ValueError
+        """
+        if output_format == 'sql':
+            _, tables = self._get_sql_tables()
+            return lambda table, row: DatasetGenerator._sql_insert(table, tables[table]['columns'], row)
+
+        elif output_format == 'jsonl':
+            return lambda table, row: json.dumps({table: row})
+
+        else:
+            raise ValueError('Unknown output format {}'.format(output_format))
+
+    def _get_partition_encoder(self, output_format, tables):
+        """
+        Get the function used to encode a single row of a table when writing each table to its own files
+
+        :param output_format: The format, either 'sql', 'csv' or 'jsonl'
+        :param tables: The definition of every table, as returned by _get_sql_tables()
+        :type output_format: str
+        :type tables: dict
+        :returns: A function taking the table name and the row and returning the encoded row as a string
+        :raises: ValueError
+        """
+        if output_format == 'sql':
+            return lambda table, row: DatasetGenerator._sql_insert(table, tables[table]['columns'], row)
+
+        elif output_format == 'csv':
+            buffer = io.StringIO()
+            writer = csv.writer(buffer, delimiter=',', lineterminator='')
+
+            def encode(table, row):
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerow(row.values())
+                return buffer.getvalue()
+
+            return encode
+
+        elif output_format == 'jsonl':
+            return lambda table, row: json.dumps(row)
+
+        else:
+            raise ValueError('Unknown output format {}'.format(output_format))
+
+    def _get_fragment_encoder(self, output_format, tables, nested=False):
+        """
+        Get the function giving the parts of the encoding of the rows of a table, so the encoding of some of the columns of
+        a row can be computed once and reused. A row is encoded as the prefix, followed by the encoding of each of its
+        columns joined by the separator, and the suffix, which is the same as encoding it with _get_row_encoder() when
+        nested, or with _get_partition_encoder() otherwise.
+
+        :param output_format: The format, either 'sql', 'csv' or 'jsonl'
+        :param tables: The definition of every table, as returned by _get_sql_tables()
+        :param nested: If set to true, JSON rows are nested inside an object with the name of the table as key
+        :type output_format: str
+        :type tables: dict
+        :type nested: bool
+        :returns: A function taking the table name and returning the prefix, the function encoding a column taking its name and its value, the separator and the suffix
+        :raises: ValueError
+        """
+        if output_format == 'sql':
+            encode_value = lambda column, value: DatasetGenerator._sql_literal(value)
+            return lambda table: ('INSERT INTO {} ({}) VALUES ('.format(table, ', '.join(tables[table]['columns'])), encode_value, ', ', ');')
+
+        elif output_format == 'csv':
+            buffer = io.StringIO()
+            writer = csv.writer(buffer, delimiter=',', lineterminator='')
+
+            def encode_value(column, value):
+                # A single empty value is quoted by the writer, but not when it is one of several values
+                if value is None or value == '':
+                    return ''
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerow([value])
+                return buffer.getvalue()
+
+            return lambda table: ('', encode_value, ',', '')
+
+        elif output_format == 'jsonl':
+            encode_value = lambda column, value: '{}: {}'.format(json.dumps(column), json.dumps(value))
+            if nested:
+                return lambda table: ('{{{}: {{'.format(json.dumps(table)), encode_value, ', ', '}}')
+            return lambda table: ('{', encode_value, ', ', '}')
+
+        else:
+            raise ValueError('Unknown output format {}'.format(output_format))
+
+    def export(self, save_to, output_format='sql', create_tables=True, checkpoint=None, checkpoint_every=100000, resume=False, memory_limit=None, compression=None, threaded=True, metrics=None, localization=None):
+        """
+        Generate the dataset writing every row to a file or a sink as soon as it is generated. Rows are written in the
+        order they are generated, so referenced rows are always written before the rows referencing them. When a path is
+        given, the file can be compressed and is written by a background thread unless threaded is set to False.
+
+        If a checkpoint is given, the state of the run and the size of the file are saved every checkpoint_every
+        rows. When resume is set to True and the checkpoint exists, the run continues from the last checkpoint
+        and everything written to the file after it is discarded. The result is identical to the one of an
+        uninterrupted run, but only the columns referenced by foreign keys are kept for the rows written before the
+        checkpoint, as when the memory limit is reached. Each checkpoint only writes what was generated since the
+        previous one (see :class:`dammy.checkpoint.Checkpoint`). The checkpoint is removed once the run finishes.
+        Resuming requires the output to be given by its path, and sinks given must support
+        :meth:`dammy.sinks.BaseSink.sync` to save checkpoints.
+
+        If a memory limit is given, once the process reaches it only the columns referenced by foreign keys
+        are kept for the rows already written, and for every row generated afterwards (see :class:`dammy.core.KeyColumns`),
+        and the values of unique fields are moved to disk (see :class:`dammy.core.SpilledSet`). The memory is checked
+        before each table and every time a number of rows have been generated, whatever the table they belong to.
+        A limit of 0 keeps only those columns from the beginning.
+
+        :param save_to: The path or the sink where the generated data will be saved
+        :param output_format: Either 'sql' for INSERT statements or 'jsonl' for one JSON object per row
+        :param create_tables: If set to true and the format is SQL, the instructions to create the tables are written first
+        :param checkpoint: The checkpoint where the state of the run will be saved
+        :param checkpoint_every: The number of rows generated between two checkpoints
+        :param resume: If set to true, resume the run from the checkpoint if it exists
+        :param memory_limit: The memory in bytes used by the process from which only the referenced columns are kept
+        :param compression: The compression of the file when save_to is a path. Either None, 'gzip', 'bz2', 'lzma' or 'zstd'
+        :param threaded: If set to true and save_to is a path, the file is written by a background thread
+        :param metrics: The metrics reporting the progress of the run. The sink is reported as 'output'
+        :param localization: The localization used to generate the entities
+        :type save_to: str or :class:`dammy.sinks.BaseSink`
+        :type output_format: str
+        :type create_tables: bool
+        :type checkpoint: :class:`dammy.checkpoint.Checkpoint`
+        :type checkpoint_every: int
+        :type resume: bool
+        :type memory_limit: int
+        :type compression: str
+        :type threaded: bool
+        :type metrics: :class:`dammy.metrics.Metrics`
+        :type localization: str
+        :returns: The dataset itself, containing the generated data
+        :raises: ValueError, :class:`dammy.exceptions.CheckpointException`
+        """
+        with _current_session()._lock:
+            encode = self._get_row_encoder(output_format)
+            fragments = self._get_fragment_encoder(output_format, self._get_sql_tables()[1], nested=True)
+            offset = None
+
+            if resume and checkpoint is not None and checkpoint.exists():
+                state = checkpoint.load()
+                if state['output_format'] != output_format:
+                    raise CheckpointException('The checkpoint was saved for {} output, not {}'.format(state['output_format'], output_format))
+
+                if isinstance(save_to, BaseSink):
+                    raise CheckpointException('Resuming requires the path of the output file')
+
+                if not os.path.exists(save_to) or os.path.getsize(save_to) < state['offset']:
+                    raise CheckpointException('{} is shorter than the checkpointed output'.format(save_to))
+
+                self._set_state(state['dataset'], checkpoint)
+                offset = state['offset']
+
+            else:
+                if checkpoint is not None:
+                    checkpoint.remove()
+                self._reset()
+
+            pending_rows = 0
+
+            with sink_for(save_to, compression, threaded, offset) as sink:
+                if offset is None and output_format == 'sql' and create_tables:
+                    sink.write(self._sql_create_tables() + '\n')
+
+                def write_row(table, row, encoded=None):
+                    nonlocal pending_rows
+                    sink.write((encode(table, row) if encoded is None else encoded) + '\n')
+                    pending_rows += 1
+
+                def save_checkpoint():
+                    nonlocal pending_rows
+                    if pending_rows >= checkpoint_every:
+                        checkpoint.save({
+                            'output_format': output_format,
+                            'offset': sink.sync(),
+                            'dataset': self._get_state(checkpoint)
+                        })
+                        pending_rows = 0
+
+                if metrics is not None:
+                    metrics.start(self)
+                    metrics.add_sink('output', sink)
+
+                state = self._state()
+                state.update(row_listener=write_row, row_fragments=fragments, memory_limit=memory_limit, metrics=metrics)
+                try:
+                    self._generate_pending(localization, save_checkpoint if checkpoint is not None else None)
+                finally:
+                    state.update(row_listener=None, row_fragments=None, memory_limit=None, metrics=None)
+                    if checkpoint is not None:
+                        checkpoint.close()
+
+                if metrics is not None:
+                    metrics.stop()
+
+            if checkpoint is not None:
+                checkpoint.remove()
+
+            return self._generate(self)
+
+    def export_partitioned(self, directory, output_format='csv', shards=None, rows_per_shard=None, shard_size=None, compression=None, create_tables=True, memory_limit=None, threaded=False, progress=None, metrics=None, localization=None):
+        """
+        Generate the dataset writing each table into several files (shards), so the tables can be loaded in parallel.
+        The shards of a table are limited either by their number, by the number of rows or by their size in bytes
+        before compression. Each shard can be compressed using gzip, bz2, lzma or zstd (requires the zstandard package).
+
+        A manifest.json file listing the shards of each table, with their row counts, sizes and SHA-256 checksums, is
+        written to the directory. Tables are listed so referenced tables go first. For SQL output, the CREATE TABLE
+        statements are saved to schema.sql if create_tables is set to True.
+
+        The memory limit works as in :meth:`export`.
+
+        :param directory: The directory where the shards and the manifest will be saved. It is created if it does not exist
+        :param output_format: The format of the shards. Either 'sql', 'csv' or 'jsonl'
+        :param shards: The number of shards for each table
+        :param rows_per_shard: The maximum number of rows per shard
+        :param shard_size: The target size of each shard in bytes, before compression
+        :param compression: The compression used on each shard. Either None, 'gzip', 'bz2', 'lzma' or 'zstd'
+        :param create_tables: If set to true and the format is SQL, the instructions to create the tables are saved
+        :param memory_limit: The memory in bytes used by the process from which only the referenced columns are kept
+        :param threaded: If set to true, each shard is written by a background thread
+        :param progress: A function called with the name of the table after writing each row
+        :param metrics: The metrics reporting the progress of the run. The shards of each table are reported as a sink named after the table
+        :param localization: The localization used to generate the entities
+        :type directory: str
+        :type output_format: str
+        :type shards: int
+        :type rows_per_shard: int
+        :type shard_size: int
+        :type compression: str
+        :type create_tables: bool
+        :type memory_limit: int
+        :type threaded: bool
+        :type progress: callable
+        :type metrics: :class:`dammy.metrics.Metrics`
+        :type localization: str
+        :returns: dict containing the manifest
+        :raises: ValueError, ImportError
+        """
+        with _current_session()._lock:
+            if len([x for x in (shards, rows_per_shard, shard_size) if x is not None]) != 1:
+                raise ValueError('Exactly one of shards, rows_per_shard or shard_size must be given')
+
+            table_order, tables = self._get_sql_tables()
+            encode = self._get_partition_encoder(output_format, tables)
+
+            os.makedirs(directory, exist_ok=True)
+
+            writers = {}
+            for t in table_order:
+                limit = rows_per_shard
+                if shards is not None:
+                    limit = max(1, -(-self._fixed_counters.get(t, 0) // shards))
+
+                header = None
+                if output_format == 'csv':
+                    header = encode(t, dict((c, c) for c in tables[t]['columns']))
+
+                writers[t] = ShardedTableWriter(directory, t, output_format, limit, shard_size, compression, header, threaded)
+
+            manifest = {
+                'format': output_format,
+                'compression': compression,
+                'schema': None,
+                'tables': {}
+            }
+
+            if output_format == 'sql' and create_tables:
+                manifest['schema'] = 'schema.sql'
+                with open(os.path.join(directory, 'schema.sql'), 'w') as f:
+                    f.write(self._sql_create_tables())
+
+            self._reset()
+
+            def write_row(table, row, encoded=None):
+                writers[table].write(encode(table, row) if encoded is None else encoded)
+                if progress is not None:
+                    progress(table)
+
+            if metrics is not None:
+                metrics.start(self)
+                for t in table_order:
+                    metrics.add_sink(t, writers[t])
+
+            state = self._state()
+            state.update(row_listener=write_row, row_fragments=self._get_fragment_encoder(output_format, tables), memory_limit=memory_limit, metrics=metrics)
+            try:
+                self._generate_pending(localization)
+            finally:
+                state.update(row_listener=None, row_fragments=None, memory_limit=None, metrics=None)
+                table_shards = dict((t, writers[t].close()) for t in table_order)
+
+            if metrics is not None:
+                metrics.stop()
+
+            for t in table_order:
+                manifest['tables'][t] = {
+                    'columns': tables[t]['columns'],
+                    'rows': sum(shard['rows'] for shard in table_shards[t]),
+                    'shards': table_shards[t]
+                }
+
+            write_manifest(directory, manifest)
+
+            return manifest
 
     def to_json(self, save_to=None, indent=4):
         """
         Get the JSON representation of the dataset. If a path is specified, a file is created and the resulting JSON is written
         to the file. If no path is given, the generated JSON will be returned.
 
-        :param save_to: The path where the JSON will be saved
+        :param save_to: The path or the sink where the JSON will be saved
         :param indent: The indentation level of the resulting JSON
-        :type save_to: str
+        :type save_to: str or :class:`dammy.sinks.BaseSink`
         :type indent: int
         :returns: String containing the JSON encoded dataset or none if it has been written to a file
         """
         if save_to is None:
             return json.dumps(self.data, indent=indent)
         else:
-            with open(save_to, 'w') as f:
-                json.dump(self.data, f, indent=indent)
-                f.close()
+            with sink_for(save_to) as sink:
+                sink.write(json.dumps(self.data, indent=indent))
             return None
 
-    def to_sql(self, save_to=None, create_tables=True):
+    def _get_sql_tables(self):
         """
-        Gets the dataset as SQL INSERT statements. The generated SQL is always returned and if save_to is specified,
-        it is saved to that location. Additional CREATE TABLE statements are added if create_tables is set to True
+        Get the SQL definition of every table in the dataset
 
-        :param save_to: The path where the resulting SQL will be saved.
-        :param create_tables: If set to true, it will generate the instructions to create the tables.
-        :type save_to: str
-        :type create_tables: bool
-        :returns: A string with the SQL sentences required to insert all the tuples
+        :returns: A tuple containing the list of table names, sorted so referenced tables go first, and a dict
+         containing the columns, the column types and the constraints of each table
         """
-        table_order = []
         tables = {}
         instances = {}
         for name, c in self._name_class_map.items():
@@ -960,10 +3254,6 @@ class DatasetGenerator(BaseGenerator):
                         )
                     )
 
-                    # Add the table
-                    if col_obj.referenced_table not in table_order:
-                        table_order.append(col_obj.referenced_table)
-
                 elif isinstance(col_obj, PrimaryKey):
                     # Add the columns
                     tables[name]['columns'].extend(col_obj.fields.keys())
@@ -998,35 +3288,73 @@ class DatasetGenerator(BaseGenerator):
                     tables[name]['columns'].append(col)
                     tables[name]['column_types'].append(DatasetGenerator._infer_type(col))
 
-            if name not in table_order:
-                table_order.append(name)
+        return self._get_table_order(), tables
+
+    def _sql_create_tables(self):
+        """
+        Get the SQL statements creating every table in the dataset
+
+        :returns: A string with a CREATE TABLE statement per table
+        """
+        table_order, tables = self._get_sql_tables()
+
+        lines = []
+        for table in table_order:
+            lines.append(
+                'CREATE TABLE IF NOT EXISTS {} (\n\t{}\n);'.format(
+                    table,
+                    ',\n\t'.join([' '.join(x) for x in zip(tables[table]['columns'], tables[table]['column_types'])] + tables[table]['constraints'])
+                )
+            )
+
+        return '\n'.join(lines)
+
+    @staticmethod
+    def _sql_insert(table, columns, row):
+        """
+        Get the SQL statement inserting a row in a table
+
+        :param table: The name of the table
+        :param columns: The names of the columns of the table
+        :param row: The row to insert
+        :type table: str
+        :type columns: list
+        :type row: dict
+        :returns: A string containing the INSERT statement
+        """
+        return 'INSERT INTO {} ({}) VALUES ({});'.format(
+            table,
+            ', '.join(columns),
+            ', '.join([DatasetGenerator._sql_literal(x) for x in row.values()]),
+        )
+
+    def to_sql(self, save_to=None, create_tables=True):
+        """
+        Gets the dataset as SQL INSERT statements. The generated SQL is always returned and if save_to is specified,
+        it is saved to that location. Additional CREATE TABLE statements are added if create_tables is set to True
+
+        :param save_to: The path or the sink where the resulting SQL will be saved.
+        :param create_tables: If set to true, it will generate the instructions to create the tables.
+        :type save_to: str or :class:`dammy.sinks.BaseSink`
+        :type create_tables: bool
+        :returns: A string with the SQL sentences required to insert all the tuples
+        """
+        table_order, tables = self._get_sql_tables()
 
         lines = []
 
         if create_tables:
-            for table in table_order:
-                lines.append(
-                    'CREATE TABLE IF NOT EXISTS {} (\n\t{}\n);'.format(
-                        table,
-                        ',\n\t'.join([' '.join(x) for x in zip(tables[table]['columns'], tables[table]['column_types'])] + tables[table]['constraints'])
-                    )
-                )
+            lines.append(self._sql_create_tables())
 
         for table in table_order:
             for row in self.data[table]:
-                lines.append(
-                    'INSERT INTO {} ({}) VALUES ({});'.format(
-                        table,
-                        ', '.join(tables[table]['columns']),
-                        ', '.join([DatasetGenerator._sql_literal(x) for x in row.values()]),
-                    )
-                )
+                lines.append(DatasetGenerator._sql_insert(table, tables[table]['columns'], row))
 
         sql = '\n'.join(lines)
 
         if save_to is not None:
-            with open(save_to, 'w') as f:
-                f.write(sql)
+            with sink_for(save_to) as sink:
+                sink.write(sql)
 
         return sql
 
@@ -1052,4 +3380,105 @@ class DatasetGenerator(BaseGenerator):
         :type key: str
         :returns: A dictionary with all the data contained on the table
         """
-        return self.data[key]
\ No newline at end of file
+        return self.data[key]
+
+    def _get_index(self, table, fields, unique=True):
+        """
+        Get the hash index of the rows of a table on the given fields. The index is built the first time it is needed
+        and the rows generated since the last time are added to it, so it is never rebuilt. Generating the dataset again
+        discards every index.
+
+        :param table: The name of the table
+        :param fields: The names of the indexed fields
+        :param unique: If set to True, every value is mapped to the position of its row. Otherwise, it is mapped to the list of positions of its rows
+        :type table: str
+        :type fields: tuple
+        :type unique: bool
+        :returns: dict containing the positions of the rows for each tuple of values of the fields
+        """
+        state = self._state()
+        rows = state['data'][table]
+
+        entry = state['indexes'].get((table, fields, unique))
+        if entry is None:
+            entry = state['indexes'][(table, fields, unique)] = [{}, 0]
+
+        index, indexed = entry
+        if unique:
+            for i in range(indexed, len(rows)):
+                row = rows[i]
+                index[tuple(row[f] for f in fields)] = i
+        else:
+            for i in range(indexed, len(rows)):
+                row = rows[i]
+                index.setdefault(tuple(row[f] for f in fields), []).append(i)
+
+        entry[1] = len(rows)
+        return index
+
+    def get(self, table, **key):
+        """
+        Get the row of a table with the given primary key or unique value in O(1) time, using a hash index
+        built the first time it is needed
+
+        :param table: The name of the table
+        :param \\*\\*key: The values of the fields of a primary key or a unique field of the table
+        :type table: str
+        :returns: dict containing the row, or None if there is no such row
+        :raises: ValueError
+
+        Example::
+
+            dataset.get('Person', id_pk=812345)
+        """
+        names = (table, frozenset(key.keys()))
+        if names not in self._lookup_fields:
+            entity = self._get_entity(table)
+            for attr in entity.attrs:
+                attr_obj = getattr(entity, attr)
+                if isinstance(attr_obj, Unique) and set(attr_obj.fields.keys()) == names[1]:
+                    self._lookup_fields[names] = tuple(attr_obj.fields.keys())
+
+        fields = self._lookup_fields.get(names)
+        if fields is None:
+            raise ValueError('{} has no primary key or unique field made of {}'.format(table, ', '.join(key.keys())))
+
+        position = self._get_index(table, fields).get(tuple(key[f] for f in fields))
+        return None if position is None else self.data[table][position]
+
+    def children(self, table, row, child_table, attr=None):
+        """
+        Get the rows of a table referencing a row through a foreign key in O(k) time for k rows, using
+        a reverse index built the first time it is needed
+
+        :param table: The name of the referenced table
+        :param row: The referenced row, or a dict containing the values of its referenced key
+        :param child_table: The name of the table referencing it
+        :param attr: The name of the foreign key in child_table. It is only needed when child_table references table several times
+        :type table: str
+        :type row: dict
+        :type child_table: str
+        :type attr: str
+        :returns: list containing the referencing rows
+        :raises: ValueError
+
+        Example::
+
+            dataset.children('Person', dataset.get('Person', id_pk=812345), 'Car')
+        """
+        entity = self._get_entity(child_table)
+        foreign_keys = [
+            getattr(entity, a) for a in entity.attrs
+            if isinstance(getattr(entity, a), ForeignKey) and getattr(entity, a).external is None
+            and getattr(entity, a).referenced_table == table and (attr is None or a == attr)
+        ]
+
+        if len(foreign_keys) != 1:
+            raise ValueError('{} references {} {} times{}'.format(
+                child_table, table, len(foreign_keys), ', give the foreign key' if len(foreign_keys) > 1 else ''
+            ))
+
+        fields = tuple(foreign_keys[0]._columns.keys())
+        columns = tuple(foreign_keys[0]._columns.values())
+        rows = self.data[child_table]
+        return [rows[i] for i in self._get_index(child_table, columns, unique=False).get(tuple(row[f] for f in fields), ())]
\ No newline at end of file
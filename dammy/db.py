@@ -2,4 +2,4 @@
 this module contains everything database related, allowing you to create primary keys, foreign keys
 and autoincrement fields
 """
-from .core import AutoIncrement, ForeignKey, PrimaryKey, Unique, DatasetGenerator
\ No newline at end of file
+from .core import AutoIncrement, ForeignKey, KeyIndex, PrimaryKey, Unique, DatasetGenerator
\ No newline at end of file
@@ -0,0 +1,297 @@
+"""
+This module emits generated rows at a controlled rate instead of all at once, to generate load for soak tests.
+Rows are generated in batches by a background thread ahead of demand and released on a timeline paced by a token
+bucket. The rate can be constant or follow a pattern, such as a daily curve.
+"""
+import csv
+import io
+import json
+import math
+import queue
+import threading
+import time
+
+from .core import _current_session
+from .sinks import sink_for
+
+# Maximum number of seconds the emitter sleeps at once, so changes of the rate are noticed
+MAX_SLEEP = 0.1
+
+def diurnal(peak, trough, period=86400.0, peak_at=0.5):
+    """
+    Get a rate following a daily curve, a cosine going from the trough to the peak and back once every period
+
+    :param peak: The highest rate in rows per second
+    :param trough: The lowest rate in rows per second
+    :param period: The duration of a cycle in seconds. By default, a day
+    :param peak_at: The moment of the cycle where the rate is the highest, as a fraction of the period
+    :type peak: float
+    :type trough: float
+    :type period: float
+    :type peak_at: float
+    :returns: A function giving the rate for the seconds elapsed since the start
+
+    Example::
+
+        # 50000 rows per second at noon, 5000 at midnight
+        emitter = RateEmitter(Person(), diurnal(50000, 5000), TCPSink('localhost', 9000))
+    """
+    def rate(elapsed):
+        return trough + (peak - trough) * (1 + math.cos(2 * math.pi * (elapsed / period - peak_at))) / 2
+
+    return rate
+
+class RateEmitter:
+    """
+    Emits the values of a generator to a sink at the given rate. A background thread generates and encodes batches of
+    rows ahead of demand, and the rows are released as the tokens of a token bucket, refilled at the current rate, allow.
+    Rows that could not be emitted on time because generation did not keep up are emitted as soon as they are generated,
+    until the timeline is caught up again.
+
+    The progress is reported to the callback every report_interval seconds as a dict containing:
+
+    - elapsed: The seconds since the start
+    - emitted: The number of rows emitted
+    - rate: The current target rate in rows per second
+    - actual_rate: The rows emitted per second since the start
+    - lag_rows: The number of rows behind the timeline
+    - lag_seconds: The seconds behind the timeline at the current rate
+    - max_lag_seconds: The highest lag so far
+    - underruns: The number of times rows were due but none had been generated yet
+
+    :param generator: The generator of the rows, usually an :class:`dammy.EntityGenerator`
+    :param rate: The rows per second, or a function giving the rows per second for the seconds elapsed since the start
+    :param sink: The path or the sink where the rows are emitted
+    :param output_format: Either 'jsonl', 'csv' or a function encoding a row as a string
+    :param dataset: The dataset from which all referenced fields will be retrieved
+    :param batch_size: The number of rows generated at once
+    :param prefetch: The maximum number of batches generated ahead of demand
+    :param burst: The maximum number of rows released at once. By default, the rows due in a hundredth of a second
+    :param callback: The function called with the progress
+    :param report_interval: The seconds between two reports
+    :param localization: The localization used to generate the rows
+    :type generator: :class:`dammy.BaseGenerator`
+    :type rate: float or callable
+    :type sink: str or :class:`dammy.sinks.BaseSink`
+    :type output_format: str or callable
+    :type dataset: :class:`dammy.db.DatasetGenerator` or dict
+    :type batch_size: int
+    :type prefetch: int
+    :type burst: int
+    :type callback: callable
+    :type report_interval: float
+    :type localization: str
+    :raises: ValueError
+
+    Example::
+
+        from dammy.emitter import RateEmitter
+        from dammy.sinks import TCPSink
+
+        emitter = RateEmitter(Person(), 50000, TCPSink('localhost', 9000), callback=print)
+        emitter.run(duration=3600)
+    """
+    def __init__(self, generator, rate, sink, output_format='jsonl', dataset=None, batch_size=1000, prefetch=10, burst=None, callback=None, report_interval=1.0, localization=None):
+        if batch_size < 1 or prefetch < 1:
+            raise ValueError('The batch size and the number of batches generated ahead must be positive')
+
+        self.generator = generator
+        self.rate = rate if callable(rate) else (lambda elapsed: rate)
+        self.sink = sink
+        self.encode = self._get_encoder(output_format)
+        self.dataset = dataset
+        self.batch_size = batch_size
+        self.prefetch = prefetch
+        self.burst = burst
+        self.callback = callback
+        self.report_interval = report_interval
+        self.localization = localization
+
+        self._queue = None
+        self._stop = None
+        self._error = None
+
+    @staticmethod
+    def _get_encoder(output_format):
+        """
+        Get the function encoding a row as a line
+
+        :param output_format: Either 'jsonl', 'csv' or a function encoding a row as a string
+        :type output_format: str or callable
+        :returns: A function taking a row and returning the encoded row as a string
+        :raises: ValueError
+        """
+        if callable(output_format):
+            return output_format
+
+        if output_format == 'jsonl':
+            return json.dumps
+
+        if output_format == 'csv':
+            buffer = io.StringIO()
+            writer = csv.writer(buffer, delimiter=',', lineterminator='')
+
+            def encode(row):
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerow(row.values() if isinstance(row, dict) else [row])
+                return buffer.getvalue()
+
+            return encode
+
+        raise ValueError('Unknown output format {}'.format(output_format))
+
+    def _produce(self, rows, session):
+        """
+        Generate and encode batches of rows until rows have been generated or the emitter stops. Runs in the background
+        thread, in the session of the thread running the emitter, so sequences continue from the previous runs and the
+        tables of the dataset are visible.
+
+        :param rows: The number of rows to generate, or None to generate until the emitter stops
+        :param session: The session of the thread running the emitter
+        :type rows: int
+        :type session: :class:`dammy.GenerationSession`
+        """
+        generated = 0
+        try:
+            with session:
+                while not self._stop.is_set() and (rows is None or generated < rows):
+                    n = self.batch_size if rows is None else min(self.batch_size, rows - generated)
+                    batch = [self.encode(self.generator.generate(self.dataset, self.localization)) + '\n' for _ in range(n)]
+                    generated += n
+                    self._put(batch)
+
+        except BaseException as e:
+            self._error = e
+
+        finally:
+            # No more batches
+            self._put(None)
+
+    def _put(self, batch):
+        """
+        Hand a batch to the emitter, waiting while too many batches are pending unless the emitter stops
+
+        :param batch: The encoded rows
+        :type batch: list
+        """
+        while not self._stop.is_set():
+            try:
+                self._queue.put(batch, timeout=MAX_SLEEP)
+                return
+            except queue.Full:
+                pass
+
+    def _report(self, start, now, emitted, owed, rate, stats):
+        """
+        Update the progress and pass it to the callback
+
+        :returns: dict containing the progress
+        """
+        elapsed = now - start
+        lag_rows = max(0.0, owed - emitted)
+
+        stats['elapsed'] = elapsed
+        stats['emitted'] = emitted
+        stats['rate'] = rate
+        stats['actual_rate'] = emitted / elapsed if elapsed > 0 else 0.0
+        stats['lag_rows'] = lag_rows
+        stats['lag_seconds'] = lag_rows / rate if rate > 0 else 0.0
+        stats['max_lag_seconds'] = max(stats['max_lag_seconds'], stats['lag_seconds'])
+
+        if self.callback is not None:
+            self.callback(dict(stats))
+
+        return stats
+
+    def run(self, rows=None, duration=None):
+        """
+        Emit rows until the given number of rows have been emitted or the given number of seconds have passed.
+        At least one of them must be given.
+
+        :param rows: The number of rows to emit
+        :param duration: The seconds to emit for
+        :type rows: int
+        :type duration: float
+        :returns: dict containing the final progress
+        :raises: ValueError
+        """
+        if rows is None and duration is None:
+            raise ValueError('Either the number of rows or the duration must be given')
+
+        self._queue = queue.Queue(maxsize=self.prefetch)
+        self._stop = threading.Event()
+        self._error = None
+
+        producer = threading.Thread(target=self._produce, args=(rows, _current_session()), name='dammy-emitter', daemon=True)
+        producer.start()
+
+        stats = {'max_lag_seconds': 0.0, 'underruns': 0}
+        emitted = 0
+        batch = []
+        position = 0
+        exhausted = False
+
+        try:
+            with sink_for(self.sink) as sink:
+                start = time.monotonic()
+                last = start
+                last_report = start
+                tokens = 0.0
+                owed = 0.0
+                rate = self.rate(0.0)
+
+                while not exhausted and (rows is None or emitted < rows):
+                    now = time.monotonic()
+                    if duration is not None and now - start >= duration:
+                        break
+
+                    # Refill the bucket at the current rate, keeping track of the rows due so far
+                    rate = max(0.0, self.rate(now - start))
+                    burst = self.burst if self.burst is not None else max(1.0, rate / 100)
+                    owed += (now - last) * rate
+                    tokens = min(tokens + (now - last) * rate, max(burst, owed - emitted))
+                    last = now
+
+                    if now - last_report >= self.report_interval:
+                        self._report(start, now, emitted, owed, rate, stats)
+                        last_report = now
+
+                    if tokens < 1:
+                        time.sleep(min(MAX_SLEEP, (1 - tokens) / rate) if rate > 0 else MAX_SLEEP)
+                        continue
+
+                    if position == len(batch):
+                        try:
+                            batch = self._queue.get_nowait()
+                        except queue.Empty:
+                            stats['underruns'] += 1
+                            batch = self._queue.get()
+
+                        position = 0
+                        if batch is None:
+                            exhausted = True
+                            break
+
+                    n = min(int(tokens), len(batch) - position)
+                    if rows is not None:
+                        n = min(n, rows - emitted)
+
+                    for line in batch[position:position + n]:
+                        sink.write(line)
+                    sink.flush()
+
+                    position += n
+                    emitted += n
+                    tokens -= n
+
+                self._report(start, time.monotonic(), emitted, min(owed, rows) if rows is not None else owed, rate, stats)
+
+        finally:
+            self._stop.set()
+            producer.join()
+
+        if self._error is not None:
+            raise self._error
+
+        return stats
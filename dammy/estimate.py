@@ -0,0 +1,331 @@
+"""
+This module estimates the cost of generating a dataset before running it. A small sample of every table is generated,
+measuring the time spent on each column and the size of the encoded values, and the results are extrapolated to the
+requested number of rows. Problems such as unique fields whose values cannot be unique are reported as warnings.
+"""
+import json
+import math
+import random
+import sys
+import time
+
+from .core import (
+    BaseGenerator, AutoIncrement, FunctionResult, AttributeGetter, MethodCaller, OperationResult, ForeignKey, Unique, PrimaryKey,
+    DatasetGenerator, GenerationSession, _RowContext, _evaluate
+)
+
+# Approximate bytes used by each entry of a set or a list, besides the value itself
+SET_ENTRY_BYTES = 2 * 8 * 2
+LIST_ENTRY_BYTES = 8
+
+def _expected_draws(n, cardinality):
+    """
+    Get the expected number of values generated to obtain n different values out of cardinality equally likely values
+
+    :returns: float containing the expected number of values generated
+    """
+    if n == 0:
+        return 0.0
+    if cardinality is None:
+        return float(n)
+    if n >= cardinality:
+        return math.inf
+
+    # cardinality * (H(cardinality) - H(cardinality - n)), using the approximation of the harmonic numbers
+    return cardinality * math.log(cardinality / (cardinality - n)) if n > 1000 else sum(cardinality / (cardinality - k) for k in range(n))
+
+def _format_bytes(n):
+    for unit in ('B', 'KB', 'MB', 'GB', 'TB'):
+        if n < 1024 or unit == 'TB':
+            return '{:.1f} {}'.format(n, unit)
+        n /= 1024
+
+def _format_seconds(s):
+    if math.isinf(s):
+        return 'unbounded'
+    if s < 60:
+        return '{:.1f} s'.format(s)
+    if s < 3600:
+        return '{:.1f} min'.format(s / 60)
+    return '{:.1f} h'.format(s / 3600)
+
+def _is_sequence(generator):
+    return isinstance(generator, AutoIncrement)
+
+def _is_unique_by_construction(attr_obj):
+    """
+    Check wether the values of a unique field can never repeat, because all its fields are sequences or one of them never
+    repeats a value (see :meth:`dammy.BaseGenerator._is_unique`), so they are neither kept nor retried
+
+    :returns: True if the values are unique by construction
+    """
+    fields = attr_obj.fields.values()
+    return all(_is_sequence(x) for x in fields) or any(isinstance(x, BaseGenerator) and x._is_unique() for x in fields)
+
+def _strategy(attr_obj, shared):
+    """
+    Describe how the values of a column are generated
+
+    :returns: str containing the description
+    """
+    if isinstance(attr_obj, ForeignKey):
+        if attr_obj._fan_out is not None:
+            choice = 'fan-out assignment'
+        elif attr_obj._zipf is not None:
+            choice = 'zipf, sampled directly' if attr_obj.external is not None else 'zipf, alias table'
+        elif attr_obj._weights is not None:
+            choice = 'weighted, alias table'
+        else:
+            choice = 'uniform'
+
+        target = 'external key index' if attr_obj.external is not None else 'rows kept in memory'
+        return 'foreign key to {} ({}, {})'.format(attr_obj.referenced_table, target, choice)
+
+    if isinstance(attr_obj, Unique):
+        kind = 'primary key' if isinstance(attr_obj, PrimaryKey) else 'unique'
+        if all(_is_sequence(x) for x in attr_obj.fields.values()):
+            return '{} (sequence, unique by construction)'.format(kind)
+        if _is_unique_by_construction(attr_obj):
+            return '{} (unique by construction)'.format(kind)
+        return '{} (set of generated values, retried on collision)'.format(kind)
+
+    if not isinstance(attr_obj, BaseGenerator):
+        return 'constant'
+
+    details = [attr_obj.__class__.__name__]
+    if _is_sequence(attr_obj):
+        details.append('sequence')
+    if isinstance(attr_obj, (FunctionResult, AttributeGetter, MethodCaller, OperationResult)):
+        details.append('derived')
+    if type(attr_obj).generate_batch is not BaseGenerator.generate_batch:
+        details.append('batch capable')
+    if shared:
+        details.append('evaluated once per row')
+
+    return 'generator ({})'.format(', '.join(details))
+
+def _deep_size(value):
+    """
+    Get the approximate memory used by a row or a value
+
+    :returns: int containing the number of bytes
+    """
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_deep_size(v) for v in value.values())
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(_deep_size(v) for v in value)
+    return sys.getsizeof(value)
+
+class Estimate:
+    """
+    Estimates the time, the memory and the size of the output of the generation of a dataset, by generating a sample of
+    every table. Rows are generated as done by :meth:`dammy.db.DatasetGenerator.generate`, in a separate
+    :class:`dammy.GenerationSession`, and the state of the random module is left untouched.
+
+    The time spent on unique fields is extrapolated taking into account the retries needed as their values run out,
+    unless they are unique by construction. The memory includes the rows kept in the dataset and the values kept by
+    unique fields.
+
+    :param dataset: The dataset to estimate
+    :param sample_size: The maximum number of rows generated of each table
+    :param output_format: Either 'sql', 'csv' or 'jsonl'
+    :param localization: The localization used to generate the rows
+    :type dataset: :class:`dammy.db.DatasetGenerator`
+    :type sample_size: int
+    :type output_format: str
+    :type localization: str
+    :raises: ValueError
+
+    The results are available as attributes:
+
+    - tables: dict containing, for each table, its number of rows and sampled rows, its estimated seconds, memory bytes and
+      output bytes, and its columns, each one with its name, its strategy, its estimated seconds and output bytes
+    - seconds: The estimated seconds to generate the dataset
+    - memory_bytes: The estimated memory used by the generated dataset
+    - output_bytes: The estimated size of the output
+    - warnings: list of str containing the problems found
+
+    Example::
+
+        estimate = dataset.estimate()
+        print(estimate.explain())
+    """
+    def __init__(self, dataset, sample_size=1000, output_format='sql', localization=None):
+        if sample_size < 1:
+            raise ValueError('The sample size must be positive')
+
+        self.dataset = dataset
+        self.sample_size = sample_size
+        self.output_format = output_format
+        self.tables = {}
+        self.warnings = []
+
+        sql_tables = dataset._get_sql_tables()[1]
+        encode = dataset._get_partition_encoder(output_format, sql_tables)
+        encode_value = self._get_value_encoder(output_format)
+
+        random_state = random.getstate()
+        try:
+            with GenerationSession():
+                dataset._reset()
+                for name in dataset._get_table_order():
+                    self.tables[name] = self._estimate_table(name, encode, encode_value, localization)
+        finally:
+            random.setstate(random_state)
+
+        self.seconds = sum(t['seconds'] for t in self.tables.values())
+        self.memory_bytes = sum(t['memory_bytes'] for t in self.tables.values())
+        self.output_bytes = sum(t['output_bytes'] for t in self.tables.values())
+
+        # The CREATE TABLE statements written before the rows
+        if output_format == 'sql':
+            self.output_bytes += len(dataset._sql_create_tables().encode('utf-8')) + 1
+
+    @staticmethod
+    def _get_value_encoder(output_format):
+        """
+        Get the function returning the size of a value in the given format
+
+        :returns: function taking a value and returning the number of bytes
+        :raises: ValueError
+        """
+        if output_format == 'sql':
+            return lambda v: len(DatasetGenerator._sql_literal(v).encode('utf-8')) + 2
+        elif output_format == 'csv':
+            return lambda v: len(str(v).encode('utf-8')) + 1
+        elif output_format == 'jsonl':
+            return lambda v: len(json.dumps(v).encode('utf-8')) + 2
+        raise ValueError('Unknown output format {}'.format(output_format))
+
+    def _estimate_table(self, name, encode, encode_value, localization):
+        """
+        Generate the sample of a table and extrapolate its cost
+
+        :returns: dict containing the estimation of the table
+        """
+        dataset = self.dataset
+        rows = dataset._fixed_counters[name]
+        sample_rows = min(rows, self.sample_size)
+
+        entity = dataset._name_class_map[name]()
+        if localization is None:
+            localization = entity.DAMMY_LOCALIZATION
+        plan, _ = entity._get_row_plan()
+
+        seconds = [0.0] * len(plan)
+        value_bytes = [0] * len(plan)
+        row_bytes = 0
+        memory = 0
+        data = dataset.data[name]
+
+        for _ in range(sample_rows):
+            row = {}
+            with _RowContext() as values:
+                for i, (attr, attr_obj, shared) in enumerate(plan):
+                    start = time.perf_counter()
+                    if isinstance(attr_obj, (ForeignKey, Unique)):
+                        value = attr_obj.generate(dataset, localization)
+                        row.update(value)
+                        value_bytes[i] += sum(encode_value(v) for v in value.values())
+                    else:
+                        if shared:
+                            value = _evaluate(attr_obj, dataset, localization, values)
+                        elif isinstance(attr_obj, BaseGenerator):
+                            value = attr_obj.generate(dataset, localization)
+                        else:
+                            value = attr_obj
+                        row[attr] = value
+                        value_bytes[i] += encode_value(value)
+                    seconds[i] += time.perf_counter() - start
+
+            data.append(row)
+            row_bytes += len(encode(name, row).encode('utf-8')) + 1
+            memory += _deep_size(row) + LIST_ENTRY_BYTES
+
+        scale = rows / sample_rows if sample_rows > 0 else 0.0
+        columns = []
+        for i, (attr, attr_obj, shared) in enumerate(plan):
+            column_seconds = seconds[i] * scale
+
+            if isinstance(attr_obj, Unique) and sample_rows > 0 and not _is_unique_by_construction(attr_obj):
+                column_seconds = self._estimate_unique(name, attr, attr_obj, rows, sample_rows, seconds[i])
+                memory_per_value = sum(_deep_size(v) + SET_ENTRY_BYTES for v in attr_obj.generated) / max(1, len(attr_obj.generated))
+                memory += memory_per_value * sample_rows
+
+            columns.append({
+                'name': attr,
+                'strategy': _strategy(attr_obj, shared),
+                'seconds': column_seconds,
+                'output_bytes': value_bytes[i] * scale
+            })
+
+        self._check_parallel(name)
+
+        return {
+            'rows': rows,
+            'sample_rows': sample_rows,
+            'seconds': sum(c['seconds'] for c in columns),
+            'memory_bytes': memory * scale,
+            'output_bytes': row_bytes * scale,
+            'columns': columns
+        }
+
+    def _estimate_unique(self, table, attr, attr_obj, rows, sample_rows, sample_seconds):
+        """
+        Extrapolate the time spent on a unique field, taking into account the retries as its values run out,
+        and warn about fields without enough values
+
+        :returns: float containing the estimated seconds
+        """
+        cardinality = attr_obj._cardinality()
+
+        if cardinality is not None and rows > cardinality:
+            self.warnings.append('{}.{} can only take {} different values, but {} rows are requested'.format(table, attr, cardinality, rows))
+            return math.inf
+
+        if cardinality is not None and rows > cardinality / 2:
+            self.warnings.append('{}.{} uses {:.0%} of its {} possible values, so retries will grow as they run out'.format(table, attr, rows / cardinality, cardinality))
+
+        draws = _expected_draws(rows, cardinality)
+        sample_draws = _expected_draws(sample_rows, cardinality)
+        return sample_seconds * draws / sample_draws
+
+    def _check_parallel(self, name):
+        """
+        Warn about tables which cannot be generated by index, as done by generate_range() and the command line interface with
+        several workers, because they have unique fields that are not sequences
+        """
+        fields = self.dataset._get_unindexed_unique(name)
+        if fields:
+            self.warnings.append('{} has no parallel path: generating it by index does not keep {} unique'.format(name, ', '.join(fields)))
+
+    def explain(self):
+        """
+        Describe the estimation and the strategy used to generate every column
+
+        :returns: str containing the description
+        """
+        lines = ['Estimated time {}, memory {}, {} output {}'.format(
+            _format_seconds(self.seconds), _format_bytes(self.memory_bytes), self.output_format, _format_bytes(self.output_bytes)
+        )]
+
+        for name, table in self.tables.items():
+            lines.append('')
+            lines.append('{} ({} rows, {} sampled): {}, memory {}, output {}'.format(
+                name, table['rows'], table['sample_rows'], _format_seconds(table['seconds']),
+                _format_bytes(table['memory_bytes']), _format_bytes(table['output_bytes'])
+            ))
+            for column in table['columns']:
+                lines.append('    {}: {} [{}, output {}]'.format(
+                    column['name'], column['strategy'], _format_seconds(column['seconds']), _format_bytes(column['output_bytes'])
+                ))
+
+        if self.warnings:
+            lines.append('')
+            lines.append('Warnings:')
+            lines.extend('    ' + w for w in self.warnings)
+
+        return '\n'.join(lines)
+
+    def __str__(self):
+        return self.explain()
\ No newline at end of file
@@ -88,4 +88,17 @@ class EmptyKeyException(DammyException):
     """
     Raised when a primary key or a unique filed is empty
     """
+    pass
+
+class CheckpointException(DammyException):
+    """
+    Raised when a checkpoint cannot be loaded or does not match the dataset being resumed
+    """
+    pass
+
+class CircularReferenceException(DammyException):
+    """
+    Raised when the tables of a dataset reference each other through foreign keys forming a cycle,
+    so there is no order in which they can be generated
+    """
     pass
\ No newline at end of file
@@ -0,0 +1,209 @@
+"""
+This module allows monitoring long generation runs. The progress of the run, the throughput, the bytes written,
+the retries of unique fields, the foreign keys resolved and the memory used are periodically reported to a
+callback and optionally saved to a file in the Prometheus text format.
+"""
+import os
+import time
+
+from .core import ForeignKey, Unique, _get_memory_usage
+
+class Metrics:
+    """
+    Collects the metrics of a generation run and reports them every interval seconds. Pass it to
+    :meth:`dammy.db.DatasetGenerator.export` or :meth:`dammy.db.DatasetGenerator.export_partitioned`.
+
+    Each report is a dict containing:
+
+    - elapsed: The seconds since the run started
+    - rows: The number of rows generated of each table
+    - total_rows: The number of rows to generate of each table
+    - progress: The fraction of rows generated, from 0 to 1
+    - rows_per_second: The rows generated per second since the run started, or since it was resumed
+    - recent_rows_per_second: The rows generated per second since the previous report
+    - eta: The estimated seconds until the run finishes, or None if unknown
+    - bytes_written: The bytes written to each sink
+    - unique: The retries, the collisions (values needing at least one retry) and the number of values kept by each unique field
+    - foreign_keys: The number of references resolved by each foreign key
+    - memory: The memory used by the process in bytes
+
+    Unique fields and foreign keys are named after their table and attribute, such as Car.owner.
+
+    :param callback: The function called with the report
+    :param interval: The minimum number of seconds between two reports
+    :param prometheus_file: The path of the file where the metrics are saved in the Prometheus text format
+    :type callback: callable
+    :type interval: float
+    :type prometheus_file: str
+
+    Example::
+
+        from dammy.metrics import Metrics
+
+        metrics = Metrics(lambda m: print('{:.1%} done'.format(m['progress'])), interval=60, prometheus_file='dammy.prom')
+        dataset.export('dataset.sql', metrics=metrics)
+    """
+    def __init__(self, callback=None, interval=10.0, prometheus_file=None):
+        self.callback = callback
+        self.interval = interval
+        self.prometheus_file = prometheus_file
+
+        self.dataset = None
+        self.sinks = {}
+        self._uniques = {}
+        self._foreign_keys = {}
+        self._start = None
+        self._last_report = None
+        self._last_rows = 0
+        self._start_rows = 0
+
+    def start(self, dataset):
+        """
+        Start collecting the metrics of a run. Called by the dataset when the run starts
+
+        :param dataset: The dataset being generated
+        :type dataset: :class:`dammy.db.DatasetGenerator`
+        """
+        self.dataset = dataset
+        self.sinks = {}
+        self._uniques = {}
+        self._foreign_keys = {}
+
+        for name, c in dataset._name_class_map.items():
+            for attr in c().attrs:
+                generator = getattr(c, attr)
+                if isinstance(generator, ForeignKey):
+                    self._foreign_keys['{}.{}'.format(name, attr)] = generator
+                elif isinstance(generator, Unique):
+                    self._uniques['{}.{}'.format(name, attr)] = generator
+
+        self._start = time.monotonic()
+        self._last_report = self._start
+        self._start_rows = self._generated_rows()
+        self._last_rows = self._start_rows
+
+    def add_sink(self, name, sink):
+        """
+        Report the bytes written to a sink. Any object with a bytes_written attribute is accepted
+
+        :param name: The name of the sink in the reports
+        :param sink: The sink
+        :type name: str
+        :type sink: :class:`dammy.sinks.BaseSink`
+        """
+        self.sinks[name] = sink
+
+    def _generated_rows(self):
+        """
+        Count the rows generated so far
+
+        :returns: int containing the number of rows generated of every table
+        """
+        counters = self.dataset._state()['counters'] or self.dataset._fixed_counters
+        return sum(self.dataset._fixed_counters[t] - counters[t] for t in counters)
+
+    def tick(self):
+        """
+        Report the metrics if the interval has passed since the last report. Called by the dataset after every row
+        """
+        if time.monotonic() - self._last_report >= self.interval:
+            self.report()
+
+    def stop(self):
+        """
+        Report the final metrics of the run. Called by the dataset when the run ends
+        """
+        self.report()
+
+    def collect(self):
+        """
+        Get the current metrics
+
+        :returns: dict containing the metrics
+        """
+        now = time.monotonic()
+        elapsed = now - self._start
+        counters = self.dataset._state()['counters'] or self.dataset._fixed_counters
+        rows = dict((t, self.dataset._fixed_counters[t] - counters[t]) for t in self.dataset._fixed_counters)
+        generated = sum(rows.values())
+        total = sum(self.dataset._fixed_counters.values())
+
+        # Rows generated before resuming from a checkpoint do not count towards the rate
+        rate = (generated - self._start_rows) / elapsed if elapsed > 0 else 0.0
+        since_report = now - self._last_report
+
+        return {
+            'elapsed': elapsed,
+            'rows': rows,
+            'total_rows': dict(self.dataset._fixed_counters),
+            'progress': generated / total if total > 0 else 1.0,
+            'rows_per_second': rate,
+            'recent_rows_per_second': (generated - self._last_rows) / since_report if since_report > 0 else 0.0,
+            'eta': (total - generated) / rate if rate > 0 else None,
+            'bytes_written': dict((name, sink.bytes_written) for name, sink in self.sinks.items()),
+            'unique': dict(
+                (name, {'retries': u.retries, 'collisions': u.collisions, 'generated': len(u.generated)})
+                for name, u in self._uniques.items()
+            ),
+            'foreign_keys': dict((name, fk.resolutions) for name, fk in self._foreign_keys.items()),
+            'memory': _get_memory_usage()
+        }
+
+    def report(self):
+        """
+        Collect the metrics, pass them to the callback and save them to the Prometheus file
+
+        :returns: dict containing the metrics
+        """
+        metrics = self.collect()
+
+        self._last_report = self._start + metrics['elapsed']
+        self._last_rows = sum(metrics['rows'].values())
+
+        if self.prometheus_file is not None:
+            self.write_prometheus(metrics)
+
+        if self.callback is not None:
+            self.callback(metrics)
+
+        return metrics
+
+    def write_prometheus(self, metrics):
+        """
+        Save the metrics to the Prometheus file. The file is replaced atomically, so it can be read
+        by the textfile collector of the node exporter at any time
+
+        :param metrics: The metrics to save, as returned by collect()
+        :type metrics: dict
+        """
+        lines = []
+
+        def add(name, kind, description, samples):
+            lines.append('# HELP dammy_{} {}'.format(name, description))
+            lines.append('# TYPE dammy_{} {}'.format(name, kind))
+            for labels, value in samples:
+                label_text = ','.join('{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"')) for k, v in labels)
+                lines.append('dammy_{}{} {}'.format(name, '{' + label_text + '}' if label_text else '', value))
+
+        add('rows_generated_total', 'counter', 'Rows generated per table', [((('table', t),), n) for t, n in metrics['rows'].items()])
+        add('rows_target', 'gauge', 'Rows to generate per table', [((('table', t),), n) for t, n in metrics['total_rows'].items()])
+        add('progress_ratio', 'gauge', 'Fraction of the rows generated', [((), metrics['progress'])])
+        add('rows_per_second', 'gauge', 'Rows generated per second since the run started', [((), metrics['rows_per_second'])])
+        add('eta_seconds', 'gauge', 'Estimated seconds until the run finishes', [((), metrics['eta'] if metrics['eta'] is not None else 'NaN')])
+        add('bytes_written_total', 'counter', 'Bytes written per sink', [((('sink', s),), n) for s, n in metrics['bytes_written'].items()])
+        add('unique_retries_total', 'counter', 'Values generated again by unique fields because they already existed',
+            [((('field', f),), u['retries']) for f, u in metrics['unique'].items()])
+        add('unique_collisions_total', 'counter', 'Values of unique fields needing at least one retry',
+            [((('field', f),), u['collisions']) for f, u in metrics['unique'].items()])
+        add('unique_values', 'gauge', 'Values kept by unique fields to check uniqueness',
+            [((('field', f),), u['generated']) for f, u in metrics['unique'].items()])
+        add('foreign_key_resolutions_total', 'counter', 'References resolved by foreign keys',
+            [((('field', f),), n) for f, n in metrics['foreign_keys'].items()])
+        add('memory_bytes', 'gauge', 'Memory used by the process', [((), metrics['memory'])])
+        add('elapsed_seconds', 'gauge', 'Seconds since the run started', [((), metrics['elapsed'])])
+
+        tmp_path = '{}.tmp'.format(self.prometheus_file)
+        with open(tmp_path, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+
+        os.replace(tmp_path, self.prometheus_file)
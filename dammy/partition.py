@@ -0,0 +1,157 @@
+"""
+This module allows writing each table of a dataset split into several files (shards), along with a
+manifest describing them, so the tables can be loaded in parallel.
+"""
+import hashlib
+import json
+import os
+
+from .sinks import COMPRESSION_EXTENSIONS, StreamSink, ThreadedSink
+
+MANIFEST_NAME = 'manifest.json'
+
+class _ChecksumFile:
+    """
+    Wraps a binary file, keeping the size and the checksum of everything written to it
+    """
+    def __init__(self, f):
+        self._file = f
+        self.size = 0
+        self.sha256 = hashlib.sha256()
+
+    def write(self, data):
+        self._file.write(data)
+        self.sha256.update(data)
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+class ShardedTableWriter:
+    """
+    Writes the rows of a table into shard files. A new shard is started when the current one reaches
+    the given number of rows or the given size in bytes (measured before compression). The number of bytes
+    written to every shard, before compression, is kept in bytes_written.
+
+    :param directory: The directory where the shards will be saved
+    :param table: The name of the table
+    :param extension: The extension of the shard files, without compression
+    :param rows_per_shard: The maximum number of rows of each shard
+    :param shard_size: The target size in bytes of each shard, before compression
+    :param compression: The compression used on each shard. Either None, 'gzip', 'bz2', 'lzma' or 'zstd'
+    :param header: A line written at the beginning of each shard, such as the header of a CSV file
+    :param threaded: If set to True, each shard is written by a background thread
+    :param first_shard: The number of the first shard, used when several writers share the shards of a table
+    :type directory: str
+    :type table: str
+    :type extension: str
+    :type rows_per_shard: int
+    :type shard_size: int
+    :type compression: str
+    :type header: str
+    :type threaded: bool
+    :type first_shard: int
+    :raises: ValueError
+    """
+    def __init__(self, directory, table, extension, rows_per_shard=None, shard_size=None, compression=None, header=None, threaded=False, first_shard=0):
+        if compression not in COMPRESSION_EXTENSIONS:
+            raise ValueError('Unknown compression {}'.format(compression))
+
+        self.directory = directory
+        self.table = table
+        self.extension = extension
+        self.rows_per_shard = rows_per_shard
+        self.shard_size = shard_size
+        self.compression = compression
+        self.header = None if header is None else (header + '\n').encode('utf-8')
+        self.threaded = threaded
+        self.first_shard = first_shard
+
+        self.shards = []
+        self.bytes_written = 0
+        self._raw_file = None
+        self._file = None
+        self._rows = 0
+        self._bytes = 0
+
+    def _open_shard(self):
+        """
+        Start a new shard
+        """
+        name = '{}-{:05d}.{}{}'.format(self.table, self.first_shard + len(self.shards), self.extension, COMPRESSION_EXTENSIONS[self.compression])
+        self._raw_file = _ChecksumFile(open(os.path.join(self.directory, name), 'wb'))
+
+        self._file = StreamSink(self._raw_file, self.compression)
+        if self.threaded:
+            self._file = ThreadedSink(self._file)
+
+        self.shards.append({'path': name})
+        self._rows = 0
+        self._bytes = 0
+
+        if self.header is not None:
+            self._file.write(self.header)
+            self._bytes += len(self.header)
+            self.bytes_written += len(self.header)
+
+    def _close_shard(self):
+        """
+        Finish the current shard, recording its row count, size and checksum
+        """
+        self._file.close()
+
+        self.shards[-1].update({
+            'rows': self._rows,
+            'bytes': self._raw_file.size,
+            'sha256': self._raw_file.sha256.hexdigest()
+        })
+        self._file = None
+
+    def write(self, line):
+        """
+        Write a row to the current shard, starting a new one if the current one is full
+
+        :param line: The encoded row, without line terminator
+        :type line: str
+        """
+        data = (line + '\n').encode('utf-8')
+
+        if self._file is not None:
+            full = (self.rows_per_shard is not None and self._rows >= self.rows_per_shard) or \
+                (self.shard_size is not None and self._rows > 0 and self._bytes + len(data) > self.shard_size)
+            if full:
+                self._close_shard()
+
+        if self._file is None:
+            self._open_shard()
+
+        self._file.write(data)
+        self._rows += 1
+        self._bytes += len(data)
+        self.bytes_written += len(data)
+
+    def close(self):
+        """
+        Finish writing the table
+
+        :returns: list containing a dict with the path, row count, size and checksum of every shard
+        """
+        if self._file is not None:
+            self._close_shard()
+        return self.shards
+
+def write_manifest(directory, manifest):
+    """
+    Save the manifest describing the shards of a dataset
+
+    :param directory: The directory where the manifest will be saved
+    :param manifest: The manifest
+    :type directory: str
+    :type manifest: dict
+    """
+    with open(os.path.join(directory, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=4)
@@ -0,0 +1,415 @@
+"""
+This module contains the structures used to choose among many items with different probabilities
+in constant time, such as the rows referenced by a skewed foreign key or the children of a given parent,
+and to choose random samples in ascending order without keeping them in memory.
+"""
+import array
+import math
+import random
+
+# Method D of SequentialSample is used while the population is bigger than this many times the remaining sample
+SEQUENTIAL_SAMPLE_ALPHA = 13
+
+class AliasTable:
+    """
+    Chooses an index with probability proportional to its weight in O(1) time, using the alias method
+    (Vose, 1991). Building the table takes O(n) time and memory.
+
+    :param weights: The weight of each index. Weights must not be negative and at least one must be positive
+    :type weights: list
+    :raises: ValueError
+
+    Example::
+
+        table = AliasTable([5, 1, 1])
+        table.sample()  # 0 five times out of seven
+    """
+    def __init__(self, weights):
+        n = len(weights)
+        total = float(sum(weights))
+        if n == 0 or total <= 0 or min(weights) < 0:
+            raise ValueError('The weights must not be negative and at least one must be positive')
+
+        self._probability = array.array('d', [0.0]) * n
+        self._alias = array.array('q', [0]) * n
+
+        scaled = array.array('d', (w * n / total for w in weights))
+        small = [i for i in range(n) if scaled[i] < 1.0]
+        large = [i for i in range(n) if scaled[i] >= 1.0]
+
+        while small and large:
+            s = small.pop()
+            l = large.pop()
+
+            self._probability[s] = scaled[s]
+            self._alias[s] = l
+
+            scaled[l] = (scaled[l] + scaled[s]) - 1.0
+            if scaled[l] < 1.0:
+                small.append(l)
+            else:
+                large.append(l)
+
+        # Whatever remains has probability 1, up to rounding errors
+        for i in large + small:
+            self._probability[i] = 1.0
+            self._alias[i] = i
+
+    def __len__(self):
+        """
+        Get the number of indices
+
+        :returns: The number of weights the table was built from
+        """
+        return len(self._probability)
+
+    def sample(self, rng=random):
+        """
+        Choose an index
+
+        :param rng: The random number generator used. By default, the random module
+        :type rng: random.Random
+        :returns: int containing the chosen index
+        """
+        i = int(rng.random() * len(self._probability))
+        if rng.random() < self._probability[i]:
+            return i
+        return self._alias[i]
+
+class ConditionalTable:
+    """
+    Chooses a child of a given parent in O(1) time, such as a car model of a given brand. The children of every parent
+    are stored one after another in a single list along with the offset and the number of children of each parent,
+    and weighted children are chosen using an alias table per parent. Parents without children are left out.
+
+    Pairs of a parent and one of its children can also be chosen at once, without retrying parents without children.
+
+    :param children: The list of children of each parent
+    :param weights: The list of weights of the children of each parent. By default, the children are equally likely
+    :param parent_weights: The weight of each parent when choosing pairs. By default, the parents are equally likely
+    :type children: dict
+    :type weights: dict
+    :type parent_weights: dict
+    :raises: ValueError
+
+    Example::
+
+        table = ConditionalTable({'Audi': ['A3', 'A4'], 'BMW': ['X5']})
+        table.sample('Audi')    # 'A3' or 'A4'
+        table.sample_pairs(2)   # [('BMW', 'X5'), ('Audi', 'A4')]
+    """
+    def __init__(self, children, weights=None, parent_weights=None):
+        self.parents = [p for p, c in children.items() if len(c) > 0]
+        if not self.parents:
+            raise ValueError('At least one parent must have children')
+
+        self._index = dict((p, i) for i, p in enumerate(self.parents))
+        self._children = []
+        self._offsets = array.array('q')
+        self._counts = array.array('q')
+        self._samplers = [None] * len(self.parents)
+
+        for i, parent in enumerate(self.parents):
+            self._offsets.append(len(self._children))
+            self._counts.append(len(children[parent]))
+            self._children.extend(children[parent])
+
+            if weights is not None and parent in weights:
+                if len(weights[parent]) != len(children[parent]):
+                    raise ValueError('{} weights given for the {} children of {}'.format(len(weights[parent]), len(children[parent]), parent))
+                self._samplers[i] = AliasTable(weights[parent])
+
+        self._parent_sampler = None
+        if parent_weights is not None:
+            self._parent_sampler = AliasTable([parent_weights.get(p, 0) for p in self.parents])
+
+    def __len__(self):
+        """
+        Get the number of pairs
+
+        :returns: The number of children of all the parents
+        """
+        return len(self._children)
+
+    def __contains__(self, parent):
+        return parent in self._index
+
+    def children(self, parent):
+        """
+        Get the children of a parent
+
+        :param parent: The parent
+        :returns: list containing the children, empty if the parent has none
+        """
+        i = self._index.get(parent)
+        if i is None:
+            return []
+        return self._children[self._offsets[i]:self._offsets[i] + self._counts[i]]
+
+    def _sample_at(self, i, rng):
+        sampler = self._samplers[i]
+        if sampler is None:
+            return self._children[self._offsets[i] + int(rng.random() * self._counts[i])]
+        return self._children[self._offsets[i] + sampler.sample(rng)]
+
+    def _sample_parent_index(self, rng):
+        if self._parent_sampler is None:
+            return int(rng.random() * len(self.parents))
+        return self._parent_sampler.sample(rng)
+
+    def sample(self, parent, rng=random):
+        """
+        Choose a child of a parent
+
+        :param parent: The parent
+        :param rng: The random number generator used. By default, the random module
+        :type rng: random.Random
+        :returns: The chosen child
+        :raises: ValueError
+        """
+        i = self._index.get(parent)
+        if i is None:
+            raise ValueError('{} has no children'.format(parent))
+        return self._sample_at(i, rng)
+
+    def sample_parent(self, rng=random):
+        """
+        Choose a parent with at least one child
+
+        :param rng: The random number generator used. By default, the random module
+        :type rng: random.Random
+        :returns: The chosen parent
+        """
+        return self.parents[self._sample_parent_index(rng)]
+
+    def sample_pairs(self, n, rng=random):
+        """
+        Choose n parents along with one of their children
+
+        :param n: The number of pairs
+        :param rng: The random number generator used. By default, the random module
+        :type n: int
+        :type rng: random.Random
+        :returns: list containing a (parent, child) tuple per pair
+        """
+        parents = self.parents
+        sample_parent = self._sample_parent_index
+        sample_at = self._sample_at
+
+        pairs = []
+        for _ in range(n):
+            i = sample_parent(rng)
+            pairs.append((parents[i], sample_at(i, rng)))
+        return pairs
+
+class SequentialSample:
+    """
+    Chooses n different indices out of a population of N in ascending order, one at a time, in a single pass with
+    O(1) memory. Every subset of n indices is equally likely. The number of indices skipped before each chosen one is
+    sampled directly using the method D of Vitter (1987), in O(n) expected time overall, falling back to its method A
+    when the sample is a large part of the remaining population.
+
+    :param n: The number of indices to choose
+    :param population: The number of indices to choose from, N
+    :type n: int
+    :type population: int
+    :raises: ValueError
+
+    Example::
+
+        sample = SequentialSample(3, 1000000)
+        [sample.next_index() for _ in range(3)]  # Such as [20515, 487013, 851220]
+    """
+    def __init__(self, n, population):
+        if not 0 <= n <= population:
+            raise ValueError('Cannot choose {} different indices out of {}'.format(n, population))
+
+        self.remaining = n
+        self._population = population
+        self._current = -1
+        self._vprime = None
+
+    def __len__(self):
+        """
+        Get the number of indices left to choose
+
+        :returns: The number of indices left
+        """
+        return self.remaining
+
+    def _skip_d(self, rng):
+        """
+        Get the number of indices skipped before the next chosen one using the method D
+
+        :returns: int containing the number of skipped indices
+        """
+        n = self.remaining
+        N = self._population
+        ninv = 1.0 / n
+        nmin1inv = 1.0 / (n - 1)
+        qu1 = N - n + 1
+
+        vprime = self._vprime
+        if vprime is None:
+            vprime = math.exp(math.log(1.0 - rng.random()) * ninv)
+
+        while True:
+            while True:
+                x = N * (1.0 - vprime)
+                skip = int(x)
+                if skip < qu1:
+                    break
+                vprime = math.exp(math.log(1.0 - rng.random()) * ninv)
+
+            y1 = math.exp(math.log((1.0 - rng.random()) * N / qu1) * nmin1inv)
+            vprime = y1 * (1.0 - x / N) * (qu1 / (qu1 - skip))
+            if vprime <= 1.0:
+                break
+
+            y2 = 1.0
+            top = N - 1
+            if n - 1 > skip:
+                bottom = N - n
+                limit = N - skip
+            else:
+                bottom = N - skip - 1
+                limit = qu1
+            for _ in range(N - limit):
+                y2 = y2 * top / bottom
+                top -= 1
+                bottom -= 1
+
+            if N / (N - x) >= y1 * math.exp(math.log(y2) * nmin1inv):
+                vprime = math.exp(math.log(1.0 - rng.random()) * nmin1inv)
+                break
+            vprime = math.exp(math.log(1.0 - rng.random()) * ninv)
+
+        # The last uniform variate is distributed as required by the next choice, so it is kept
+        self._vprime = vprime
+        return skip
+
+    def _skip_a(self, rng):
+        """
+        Get the number of indices skipped before the next chosen one using the method A
+
+        :returns: int containing the number of skipped indices
+        """
+        n = self.remaining
+        N = self._population
+        self._vprime = None
+
+        if n == 1:
+            return int(N * rng.random())
+
+        v = rng.random()
+        skip = 0
+        top = N - n
+        quot = top / N
+        while quot > v:
+            skip += 1
+            top -= 1
+            N -= 1
+            quot = quot * top / N
+        return skip
+
+    def next_index(self, rng=random):
+        """
+        Choose the next index
+
+        :param rng: The random number generator used. By default, the random module
+        :type rng: random.Random
+        :returns: int containing the index, bigger than the previous one
+        :raises: ValueError
+        """
+        if self.remaining == 0:
+            raise ValueError('All the indices of the sample have already been chosen')
+
+        if self.remaining > 1 and self._population > SEQUENTIAL_SAMPLE_ALPHA * self.remaining:
+            skip = self._skip_d(rng)
+        else:
+            skip = self._skip_a(rng)
+
+        self._current += skip + 1
+        self._population -= skip + 1
+        self.remaining -= 1
+        return self._current
+
+class SortedUniforms:
+    """
+    Generates n uniform random numbers in [0, 1) in ascending order, one at a time, with O(1) memory. Each number is
+    the minimum of the remaining ones, obtained from the previous one as in the method of exponential spacings
+    (Bentley and Saxe, 1980), so the numbers are distributed as n independent uniform numbers once sorted.
+
+    :param n: The number of values
+    :type n: int
+    :raises: ValueError
+    """
+    def __init__(self, n):
+        if n < 0:
+            raise ValueError('The number of values must not be negative')
+
+        self.remaining = n
+        self._last = 0.0
+
+    def __len__(self):
+        """
+        Get the number of values left
+
+        :returns: The number of values left
+        """
+        return self.remaining
+
+    def next_value(self, rng=random):
+        """
+        Generate the next value
+
+        :param rng: The random number generator used. By default, the random module
+        :type rng: random.Random
+        :returns: float containing the value, not smaller than the previous one
+        :raises: ValueError
+        """
+        if self.remaining == 0:
+            raise ValueError('All the values of the sample have already been generated')
+
+        # The minimum of k uniform numbers in [last, 1) is 1 - (1 - last) * V^(1/k)
+        self._last = 1.0 - (1.0 - self._last) * (1.0 - rng.random()) ** (1.0 / self.remaining)
+        self.remaining -= 1
+
+        # Rounding may give 1.0 for the last values, which is kept out of the interval
+        return min(self._last, 1.0 - 2 ** -53)
+
+def zipf_weights(n, s):
+    """
+    Get the weights of a Zipf distribution over n items, where item k (starting at 0) has weight 1 / (k + 1)^s
+
+    :param n: The number of items
+    :param s: The exponent. The bigger, the more skewed
+    :type n: int
+    :type s: float
+    :returns: list containing the weight of each item
+    """
+    return [(k + 1) ** -s for k in range(n)]
+
+def fan_out_assignment(parents, fan_out, rng=random):
+    """
+    Assign children to parents so every parent gets a number of children within the given fan-out.
+    Parents appear in the returned array once per child, in random order.
+
+    :param parents: The number of parents
+    :param fan_out: The exact number of children of each parent, or a tuple with the minimum and the maximum
+    :param rng: The random number generator used. By default, the random module
+    :type parents: int
+    :type fan_out: int or tuple
+    :type rng: random.Random
+    :returns: array.array containing the index of the parent of each child
+    """
+    lb, ub = (fan_out, fan_out) if isinstance(fan_out, int) else fan_out
+
+    assignment = array.array('q')
+    for parent in range(parents):
+        children = lb if lb == ub else rng.randint(lb, ub)
+        assignment.extend(array.array('q', [parent]) * children)
+
+    rng.shuffle(assignment)
+
+    return assignment
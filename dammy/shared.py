@@ -0,0 +1,477 @@
+"""
+This module transfers the rows generated by worker processes to the parent process through shared memory instead of
+pickling them. The rows of each batch are stored column by column in a single shared memory block: integers, floats and
+booleans as arrays, strings as fixed width values when all of them have the same length or as offsets into a buffer of
+UTF-8 data otherwise. Any other value is pickled into a buffer the same way. The parent wraps the block without copying it.
+
+Requires Python 3.8 or later.
+"""
+import array
+import bisect
+import concurrent.futures
+import os
+import pickle
+
+try:
+    from multiprocessing import resource_tracker, shared_memory
+except ImportError:
+    resource_tracker = shared_memory = None
+
+from . import cli
+
+# Every buffer starts at a multiple of this number of bytes inside the block
+ALIGNMENT = 8
+
+INT64_MIN = -2 ** 63
+INT64_MAX = 2 ** 63 - 1
+
+def _check_available():
+    """
+    Check that shared memory is supported
+
+    :raises: ImportError
+    """
+    if shared_memory is None:
+        raise ImportError('Shared memory requires Python 3.8 or later')
+
+def _encode_column(values):
+    """
+    Encode the values of a column as the buffers stored in shared memory
+
+    :param values: The values of the column
+    :type values: list
+    :returns: tuple containing the kind of column, the width of its values (0 unless they are fixed width strings)
+     and a list of (typecode, buffer) tuples
+    """
+    types = set(type(v) for v in values)
+
+    if types == {bool}:
+        return 'bool', 0, [('B', bytes(values))]
+
+    if types == {int} and INT64_MIN <= min(values) and max(values) <= INT64_MAX:
+        return 'int', 0, [('q', array.array('q', values))]
+
+    if types == {float}:
+        return 'float', 0, [('d', array.array('d', values))]
+
+    if types == {str}:
+        encoded = [v.encode('utf-8') for v in values]
+        widths = set(len(v) for v in encoded)
+        if len(widths) == 1:
+            return 'fixed', widths.pop(), [('B', b''.join(encoded))]
+        kind = 'str'
+    else:
+        encoded = [pickle.dumps(v, protocol=pickle.HIGHEST_PROTOCOL) for v in values]
+        kind = 'object'
+
+    offsets = array.array('q', [0])
+    for v in encoded:
+        offsets.append(offsets[-1] + len(v))
+
+    return kind, 0, [('q', offsets), ('B', b''.join(encoded))]
+
+def layout_columns(columns, start=0):
+    """
+    Encode columns of values and place their buffers one after another, each one aligned, starting at the given offset
+
+    :param columns: The values of each column. All the columns must have the same number of values
+    :param start: The offset of the first buffer. It must be aligned
+    :type columns: dict
+    :type start: int
+    :returns: tuple containing the layout, to be passed to :func:`write_columns`, and the offset after the last buffer
+    :raises: ValueError
+    """
+    lengths = set(len(values) for values in columns.values())
+    if len(lengths) > 1:
+        raise ValueError('All the columns must have the same number of values')
+
+    layout = []
+    size = start
+    for name, values in columns.items():
+        kind, width, buffers = _encode_column(values)
+
+        column_buffers = []
+        for typecode, buffer in buffers:
+            nbytes = len(buffer) * array.array(typecode).itemsize
+            column_buffers.append((typecode, size, nbytes, buffer))
+            size += -(-nbytes // ALIGNMENT) * ALIGNMENT
+
+        layout.append((name, kind, width, column_buffers))
+
+    return {'rows': lengths.pop() if lengths else 0, 'columns': layout}, size
+
+def write_columns(buffer, layout):
+    """
+    Copy the encoded columns into a writable buffer, such as a shared memory block or a memory mapped file
+
+    :param buffer: The buffer, big enough for the layout
+    :param layout: The layout returned by :func:`layout_columns`
+    :type buffer: memoryview
+    :type layout: dict
+    :returns: dict describing the columns, to be passed to :class:`BufferColumns` along with the buffer
+    """
+    for _, _, _, column_buffers in layout['columns']:
+        for typecode, offset, nbytes, data in column_buffers:
+            view = buffer[offset:offset + nbytes].cast(typecode)
+            view[:] = data
+            view.release()
+
+    return {
+        'rows': layout['rows'],
+        'columns': [
+            {'name': name, 'kind': kind, 'width': width, 'buffers': [(t, o, n) for t, o, n, _ in column_buffers]}
+            for name, kind, width, column_buffers in layout['columns']
+        ]
+    }
+
+def share_columns(columns):
+    """
+    Copy columns of values into a new shared memory block. The block is not removed when the process exits, so it must
+    be removed by the process wrapping it using :meth:`SharedColumns.unlink`.
+
+    :param columns: The values of each column. All the columns must have the same number of values
+    :type columns: dict
+    :returns: dict describing the block, to be passed to :class:`SharedColumns`. It can be sent to other processes
+    :raises: ValueError, ImportError
+    """
+    _check_available()
+
+    layout, size = layout_columns(columns)
+
+    # Blocks cannot be empty
+    block = shared_memory.SharedMemory(create=True, size=max(size, 1))
+
+    # Otherwise, the block would be removed when the worker process exits, even if the parent still uses it
+    if os.name == 'posix':
+        resource_tracker.unregister(block._name, 'shared_memory')
+
+    try:
+        handle = write_columns(block.buf, layout)
+    finally:
+        block.close()
+
+    handle['name'] = block.name
+    return handle
+
+class _FixedColumn:
+    """
+    A column of strings with the same length in bytes, stored one after another
+
+    :param data: The encoded strings
+    :param width: The length in bytes of every string
+    :param length: The number of strings
+    :type data: memoryview
+    :type width: int
+    :type length: int
+    """
+    def __init__(self, data, width, length):
+        self._data = data
+        self._width = width
+        self._length = length
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        start = index * self._width
+        return str(self._data[start:start + self._width], 'utf-8')
+
+class _VariableColumn:
+    """
+    A column of values with different lengths in bytes, stored one after another along with the offset of each one
+
+    :param offsets: The offset of every value, followed by the total length of the data
+    :param data: The encoded values
+    :param decode: The function decoding a value from its bytes
+    :type offsets: memoryview
+    :type data: memoryview
+    :type decode: callable
+    """
+    def __init__(self, offsets, data, decode):
+        self._offsets = offsets
+        self._data = data
+        self._decode = decode
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        return self._decode(self._data[self._offsets[index]:self._offsets[index + 1]])
+
+class BufferColumns:
+    """
+    Wraps the columns written to a buffer by :func:`write_columns` without copying them. It behaves like a
+    read-only list of rows, so it can be exported or used as a table of the dataset given to a
+    :class:`dammy.db.ForeignKey`.
+
+    :param buffer: The buffer containing the columns
+    :param handle: The description of the columns returned by :func:`write_columns`
+    :type buffer: memoryview
+    :type handle: dict
+    """
+    def __init__(self, buffer, handle):
+        self.fields = [c['name'] for c in handle['columns']]
+        self._length = handle['rows']
+        self._buffer = buffer
+        self._views = []
+        self._columns = [self._wrap(c) for c in handle['columns']]
+
+    def _view(self, typecode, offset, nbytes):
+        """
+        Get a view of a buffer of a column
+
+        :returns: memoryview
+        """
+        view = self._buffer[offset:offset + nbytes]
+        typed = view.cast(typecode)
+        view.release()
+        self._views.append(typed)
+        return typed
+
+    def _wrap(self, column):
+        """
+        Get the values of a column
+
+        :param column: The description of the column
+        :type column: dict
+        :returns: A sequence containing the values of the column
+        """
+        kind = column['kind']
+        if kind == 'bool':
+            _, offset, nbytes = column['buffers'][0]
+            return self._view('?', offset, nbytes)
+
+        buffers = [self._view(*b) for b in column['buffers']]
+        if kind in ('int', 'float'):
+            return buffers[0]
+        elif kind == 'fixed':
+            return _FixedColumn(buffers[0], column['width'], self._length)
+        elif kind == 'str':
+            return _VariableColumn(buffers[0], buffers[1], lambda b: str(b, 'utf-8'))
+        else:
+            return _VariableColumn(buffers[0], buffers[1], pickle.loads)
+
+    def column(self, field):
+        """
+        Get the values of a column. Integers and floats are returned as a memoryview of the block
+
+        :param field: The name of the column
+        :type field: str
+        :returns: A sequence containing the values of the column
+        """
+        return self._columns[self.fields.index(field)]
+
+    def __len__(self):
+        """
+        Counts the number of rows
+
+        :returns: The number of rows
+        """
+        return self._length
+
+    def __getitem__(self, index):
+        """
+        Get a row
+
+        :param index: The position of the row
+        :type index: int
+        :returns: dict containing the row
+        """
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError('Row index out of range')
+
+        return dict((field, column[index]) for field, column in zip(self.fields, self._columns))
+
+    def __iter__(self):
+        for i in range(0, self._length):
+            yield self[i]
+
+    def close(self):
+        """
+        Stop using the buffer. The rows cannot be read afterwards
+        """
+        for view in self._views:
+            view.release()
+        self._views = []
+        self._columns = []
+
+class SharedColumns(BufferColumns):
+    """
+    Wraps the columns stored in a shared memory block by :func:`share_columns` without copying them. See :class:`BufferColumns`.
+
+    The block stays in memory until :meth:`unlink` is called, which is done when leaving a with statement.
+
+    :param handle: The description of the block returned by :func:`share_columns`
+    :type handle: dict
+    :raises: ImportError
+    """
+    def __init__(self, handle):
+        _check_available()
+
+        self.name = handle['name']
+        self._block = shared_memory.SharedMemory(name=self.name)
+        super(SharedColumns, self).__init__(self._block.buf, handle)
+
+    def close(self):
+        """
+        Stop using the block in this process. The rows cannot be read afterwards
+        """
+        super(SharedColumns, self).close()
+        self._buffer = None
+        self._block.close()
+
+    def unlink(self):
+        """
+        Close the block and remove it, freeing its memory once every process has closed it
+        """
+        self.close()
+        self._block.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.unlink()
+
+class SharedTable:
+    """
+    The rows of a table split into several :class:`SharedColumns`, one per batch, seen as a single read-only list of rows
+
+    :param batches: The batches, in order
+    :type batches: list
+    """
+    def __init__(self, batches):
+        self.batches = batches
+        self._starts = []
+
+        start = 0
+        for batch in batches:
+            self._starts.append(start)
+            start += len(batch)
+        self._length = start
+
+    def __len__(self):
+        """
+        Counts the number of rows
+
+        :returns: The number of rows
+        """
+        return self._length
+
+    def __getitem__(self, index):
+        """
+        Get a row
+
+        :param index: The position of the row
+        :type index: int
+        :returns: dict containing the row
+        """
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError('Row index out of range')
+
+        batch = bisect.bisect_right(self._starts, index) - 1
+        return self.batches[batch][index - self._starts[batch]]
+
+    def __iter__(self):
+        for batch in self.batches:
+            yield from batch
+
+    def unlink(self):
+        """
+        Remove the blocks of every batch
+        """
+        for batch in self.batches:
+            batch.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.unlink()
+
+def _generate_columns(table, start, stop, seed, localization):
+    """
+    Generate the rows of a table from start to stop by index into a shared memory block. Runs in the worker processes.
+
+    :returns: dict describing the block
+    """
+    dataset = cli._worker_dataset
+
+    columns = None
+    for i in range(start, stop):
+        row = dataset._generate_row_at(table, i, seed, localization)
+        if columns is None:
+            columns = dict((field, []) for field in row)
+
+        for field, value in row.items():
+            columns[field].append(value)
+
+    return share_columns(columns)
+
+def generate_shared(module, rows, table, seed, workers=None, batch_size=1000000, localization=None):
+    """
+    Generate the rows of a table by index in a pool of processes (see :meth:`dammy.db.DatasetGenerator.generate_range`).
+    Each worker stores its batch in shared memory and the parent wraps it without copying, so no rows are pickled.
+
+    :param module: The path of a Python file or the name of an importable module defining the entities
+    :param rows: list of tuples containing the name of each table of the dataset and its number of rows
+    :param table: The name of the table to generate
+    :param seed: The seed from which the randomness of every value is derived
+    :param workers: The number of processes. By default, the number of processors
+    :param batch_size: The number of rows generated by a worker at once
+    :param localization: The localization used to generate the rows
+    :type module: str
+    :type rows: list
+    :type table: str
+    :type seed: int
+    :type workers: int
+    :type batch_size: int
+    :type localization: str
+    :returns: :class:`SharedTable` containing the generated rows
+    :raises: ValueError, ImportError
+
+    Example::
+
+        from dammy.shared import generate_shared
+
+        with generate_shared('entities.py', [('Person', 1000000), ('Car', 5000000)], 'Car', seed=42, workers=8) as cars:
+            for car in cars:
+                ...
+    """
+    _check_available()
+
+    if batch_size < 1:
+        raise ValueError('The batch size must be positive')
+
+    count = dict(rows).get(table)
+    if count is None:
+        raise ValueError('{} is not part of the dataset'.format(table))
+
+    # Fail before starting the workers if the dataset is not valid
+    cli._build_dataset(module, rows)
+
+    batches = []
+    error = None
+    with concurrent.futures.ProcessPoolExecutor(workers, initializer=cli._init_worker, initargs=(module, rows)) as executor:
+        futures = [
+            executor.submit(_generate_columns, table, start, min(start + batch_size, count), seed, localization)
+            for start in range(0, count, batch_size)
+        ]
+
+        # Wrap every block created, even after a failure, so none is left behind
+        for future in futures:
+            try:
+                batches.append(SharedColumns(future.result()))
+            except Exception as e:
+                error = error or e
+
+    if error is not None:
+        for batch in batches:
+            batch.unlink()
+        raise error
+
+    return SharedTable(batches)
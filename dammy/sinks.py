@@ -0,0 +1,539 @@
+"""
+This module contains the sinks, the destinations where the generated data is written. Sinks buffer small
+writes into large ones and can compress the data on the fly. Any sink can be wrapped in a
+:class:`ThreadedSink` so the data is written by a background thread while generation continues.
+"""
+import bz2
+import contextlib
+import gzip
+import io
+import lzma
+import os
+import queue
+import socket
+import subprocess
+import sys
+import threading
+import urllib.request
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Size of the writes done by sinks, in bytes
+DEFAULT_BUFFER_SIZE = 1024 * 1024
+
+COMPRESSION_EXTENSIONS = {
+    None: '',
+    'gzip': '.gz',
+    'bz2': '.bz2',
+    'lzma': '.xz',
+    'zstd': '.zst'
+}
+
+def _compressor(stream, compression):
+    """
+    Wrap a binary stream so everything written to it is compressed. Closing the returned
+    object finishes the compressed stream, but does not close the wrapped one.
+
+    :param stream: The binary stream where the compressed data will be written
+    :param compression: The compression. Either None, 'gzip', 'bz2', 'lzma' or 'zstd'
+    :type compression: str
+    :returns: A writable binary stream, or the given stream if compression is None
+    :raises: ValueError, ImportError
+    """
+    if compression is None:
+        return stream
+    elif compression == 'gzip':
+        # mtime is fixed so the same data always produces the same output
+        return gzip.GzipFile(filename='', mode='wb', fileobj=stream, mtime=0)
+    elif compression == 'bz2':
+        return bz2.BZ2File(stream, 'wb')
+    elif compression == 'lzma':
+        return lzma.LZMAFile(stream, 'wb')
+    elif compression == 'zstd':
+        if zstandard is None:
+            raise ImportError('zstd compression requires the zstandard package')
+        return zstandard.ZstdCompressor().stream_writer(stream, closefd=False)
+    else:
+        raise ValueError('Unknown compression {}'.format(compression))
+
+class BaseSink:
+    """
+    The base class from which all sinks must inherit. Data is accumulated until buffer_size bytes are
+    reached and then written at once.
+
+    :param buffer_size: The number of bytes accumulated before writing
+    :type buffer_size: int
+    """
+    def __init__(self, buffer_size=DEFAULT_BUFFER_SIZE):
+        self.buffer_size = buffer_size
+        self.bytes_written = 0
+        self._buffer = []
+        self._buffered = 0
+
+    def _write_chunk(self, data):
+        """
+        Write a chunk of data to the destination. All sinks must implement this method.
+
+        :param data: The data to write
+        :type data: bytes
+        :raises: NotImplementedError
+        """
+        raise NotImplementedError('The _write_chunk() method must be overridden')
+
+    def _flush_buffer(self):
+        """
+        Write the accumulated data
+        """
+        if self._buffered > 0:
+            data = b''.join(self._buffer)
+            self._buffer = []
+            self._buffered = 0
+            self._write_chunk(data)
+
+    def write(self, data):
+        """
+        Write data to the sink. Strings are encoded as UTF-8
+
+        :param data: The data to write
+        :type data: bytes or str
+        """
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+
+        self._buffer.append(data)
+        self._buffered += len(data)
+        self.bytes_written += len(data)
+
+        if self._buffered >= self.buffer_size:
+            self._flush_buffer()
+
+    def flush(self):
+        """
+        Write all the accumulated data to the destination
+        """
+        self._flush_buffer()
+
+    def sync(self):
+        """
+        Make everything written so far durable, so the output can be truncated at the returned offset and resumed.
+        Only sinks writing to files support this.
+
+        :returns: The size of the output
+        :raises: NotImplementedError
+        """
+        raise NotImplementedError('{} cannot be synced'.format(self.__class__.__name__))
+
+    def close(self):
+        """
+        Write all the accumulated data and close the sink
+        """
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+class StreamSink(BaseSink):
+    """
+    Writes to a binary file object, such as a file, a socket file or a pipe.
+
+    :param stream: The binary file object
+    :param compression: The compression applied to the data. Either None, 'gzip', 'bz2', 'lzma' or 'zstd'
+    :param buffer_size: The number of bytes accumulated before writing
+    :param close_stream: If set to True, the stream is closed when the sink is closed
+    :type compression: str
+    :type buffer_size: int
+    :type close_stream: bool
+    :raises: ValueError, ImportError
+    """
+    def __init__(self, stream, compression=None, buffer_size=DEFAULT_BUFFER_SIZE, close_stream=True):
+        super(StreamSink, self).__init__(buffer_size)
+        self.compression = compression
+        self._raw = stream
+        self._stream = _compressor(stream, compression)
+        self._close_stream = close_stream
+
+    def _write_chunk(self, data):
+        self._stream.write(data)
+
+    def flush(self):
+        """
+        Write all the accumulated data to the stream
+        """
+        self._flush_buffer()
+        self._stream.flush()
+
+    def sync(self):
+        """
+        Make everything written so far durable. Compressed output is finished and a new compressed stream
+        is started, so the output is valid when truncated at the returned offset (gzip, bz2, xz and zstd all
+        support concatenated streams).
+
+        :returns: The size of the output in bytes
+        """
+        self._flush_buffer()
+        if self.compression is not None:
+            self._stream.close()
+
+        self._raw.flush()
+        try:
+            os.fsync(self._raw.fileno())
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            pass
+        offset = self._raw.tell()
+
+        if self.compression is not None:
+            self._stream = _compressor(self._raw, self.compression)
+
+        return offset
+
+    def close(self):
+        """
+        Write all the accumulated data, finish the compressed output and close the stream if required
+        """
+        self._flush_buffer()
+        if self.compression is not None:
+            self._stream.close()
+
+        if self._close_stream:
+            self._raw.close()
+        else:
+            self._raw.flush()
+
+class FileSink(StreamSink):
+    """
+    Writes to a file.
+
+    :param path: The path of the file
+    :param compression: The compression applied to the data. Either None, 'gzip', 'bz2', 'lzma' or 'zstd'
+    :param buffer_size: The number of bytes accumulated before writing
+    :param offset: If given, the existing file is truncated at this offset and the data is written after it
+    :type path: str
+    :type compression: str
+    :type buffer_size: int
+    :type offset: int
+    """
+    def __init__(self, path, compression=None, buffer_size=DEFAULT_BUFFER_SIZE, offset=None):
+        if offset is None:
+            f = open(path, 'wb')
+        else:
+            f = open(path, 'r+b')
+            f.truncate(offset)
+            f.seek(offset)
+
+        super(FileSink, self).__init__(f, compression, buffer_size)
+        self.path = path
+
+class StdoutSink(StreamSink):
+    """
+    Writes to the standard output
+
+    :param compression: The compression applied to the data. Either None, 'gzip', 'bz2', 'lzma' or 'zstd'
+    :param buffer_size: The number of bytes accumulated before writing
+    :type compression: str
+    :type buffer_size: int
+    """
+    def __init__(self, compression=None, buffer_size=DEFAULT_BUFFER_SIZE):
+        super(StdoutSink, self).__init__(sys.stdout.buffer, compression, buffer_size, close_stream=False)
+
+class PipeSink(StreamSink):
+    """
+    Writes to the standard input of a command, such as a database client loading the data.
+    Closing the sink waits for the command to finish.
+
+    :param command: The command. If it is a string, it is run by the shell
+    :param compression: The compression applied to the data. Either None, 'gzip', 'bz2', 'lzma' or 'zstd'
+    :param buffer_size: The number of bytes accumulated before writing
+    :type command: str or list
+    :type compression: str
+    :type buffer_size: int
+    """
+    def __init__(self, command, compression=None, buffer_size=DEFAULT_BUFFER_SIZE):
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE, shell=isinstance(command, str))
+        super(PipeSink, self).__init__(self.process.stdin, compression, buffer_size)
+
+    def close(self):
+        """
+        Write all the accumulated data, close the standard input of the command and wait for it to finish
+
+        :raises: subprocess.CalledProcessError
+        """
+        super(PipeSink, self).close()
+        if self.process.wait() != 0:
+            raise subprocess.CalledProcessError(self.process.returncode, self.process.args)
+
+class MemorySink(StreamSink):
+    """
+    Keeps the data in memory
+
+    :param compression: The compression applied to the data. Either None, 'gzip', 'bz2', 'lzma' or 'zstd'
+    :param buffer_size: The number of bytes accumulated before writing
+    :type compression: str
+    :type buffer_size: int
+    """
+    def __init__(self, compression=None, buffer_size=DEFAULT_BUFFER_SIZE):
+        super(MemorySink, self).__init__(io.BytesIO(), compression, buffer_size, close_stream=False)
+
+    def getvalue(self):
+        """
+        Get the data written so far. Compressed data is only complete once the sink has been closed
+
+        :returns: bytes containing the data
+        """
+        self._flush_buffer()
+        return self._raw.getvalue()
+
+class TCPSink(StreamSink):
+    """
+    Writes to a TCP connection
+
+    :param host: The host to connect to
+    :param port: The port to connect to
+    :param compression: The compression applied to the data. Either None, 'gzip', 'bz2', 'lzma' or 'zstd'
+    :param buffer_size: The number of bytes accumulated before writing
+    :param timeout: The seconds to wait for the connection and for every write, or None to wait forever
+    :type host: str
+    :type port: int
+    :type compression: str
+    :type buffer_size: int
+    :type timeout: float
+    """
+    def __init__(self, host, port, compression=None, buffer_size=DEFAULT_BUFFER_SIZE, timeout=None):
+        self.socket = socket.create_connection((host, port), timeout)
+        super(TCPSink, self).__init__(self.socket.makefile('wb'), compression, buffer_size)
+
+    def close(self):
+        """
+        Write all the accumulated data and close the connection
+        """
+        try:
+            super(TCPSink, self).close()
+        finally:
+            self.socket.close()
+
+class UDPSink(BaseSink):
+    """
+    Sends the data as UDP datagrams. Every write is kept whole: writes are packed into datagrams of at most
+    buffer_size bytes, so a receiver gets complete records as long as each one is written at once.
+
+    :param host: The host to send the datagrams to
+    :param port: The port to send the datagrams to
+    :param buffer_size: The maximum size of a datagram
+    :type host: str
+    :type port: int
+    :type buffer_size: int
+    """
+    def __init__(self, host, port, buffer_size=1400):
+        super(UDPSink, self).__init__(buffer_size)
+        self.address = (host, port)
+        self.socket = socket.socket(socket.AF_INET6 if ':' in host else socket.AF_INET, socket.SOCK_DGRAM)
+
+    def _write_chunk(self, data):
+        self.socket.sendto(data, self.address)
+
+    def write(self, data):
+        """
+        Write data to the sink. Strings are encoded as UTF-8
+
+        :param data: The data to write
+        :type data: bytes or str
+        :raises: ValueError
+        """
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+
+        if len(data) > self.buffer_size:
+            raise ValueError('{} bytes do not fit in a datagram of {} bytes'.format(len(data), self.buffer_size))
+
+        if self._buffered + len(data) > self.buffer_size:
+            self._flush_buffer()
+
+        super(UDPSink, self).write(data)
+
+    def close(self):
+        """
+        Send all the accumulated data and close the socket
+        """
+        try:
+            self.flush()
+        finally:
+            self.socket.close()
+
+class HTTPSink(BaseSink):
+    """
+    Sends the data to an HTTP endpoint, one POST request every buffer_size bytes
+
+    :param url: The URL of the endpoint
+    :param headers: The headers of the requests
+    :param buffer_size: The number of bytes accumulated before sending a request
+    :param timeout: The seconds to wait for every request
+    :type url: str
+    :type headers: dict
+    :type buffer_size: int
+    :type timeout: float
+    """
+    def __init__(self, url, headers=None, buffer_size=DEFAULT_BUFFER_SIZE, timeout=30.0):
+        super(HTTPSink, self).__init__(buffer_size)
+        self.url = url
+        self.headers = headers or {'Content-Type': 'application/octet-stream'}
+        self.timeout = timeout
+
+    def _write_chunk(self, data):
+        request = urllib.request.Request(self.url, data=data, headers=self.headers, method='POST')
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+class ThreadedSink(BaseSink):
+    """
+    Wraps another sink so the data is written by a background thread. Chunks of buffer_size bytes are
+    handed to the thread through a bounded queue, so generation only waits when the destination cannot
+    keep up. Errors raised by the thread are raised again on the next flush or close.
+
+    :param sink: The sink where the data will be written
+    :param queue_size: The maximum number of chunks waiting to be written
+    :param buffer_size: The number of bytes accumulated before handing a chunk to the thread
+    :type sink: :class:`BaseSink`
+    :type queue_size: int
+    :type buffer_size: int
+    """
+    def __init__(self, sink, queue_size=16, buffer_size=DEFAULT_BUFFER_SIZE):
+        super(ThreadedSink, self).__init__(buffer_size)
+        self.sink = sink
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name='dammy-writer', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        """
+        Write the chunks in the queue until the end marker (None) is received
+        """
+        while True:
+            chunk = self._queue.get()
+            try:
+                if chunk is None:
+                    return
+                if self._error is None:
+                    self.sink.write(chunk)
+            except BaseException as e:
+                self._error = e
+            finally:
+                self._queue.task_done()
+
+    def _raise_error(self):
+        """
+        Raise the error raised by the background thread, if any
+        """
+        if self._error is not None:
+            error = self._error
+            self._error = None
+            raise error
+
+    def _write_chunk(self, data):
+        self._raise_error()
+        self._queue.put(data)
+
+    def flush(self):
+        """
+        Wait until all the data has been written to the wrapped sink and flush it
+        """
+        self._flush_buffer()
+        self._queue.join()
+        self._raise_error()
+        self.sink.flush()
+
+    def sync(self):
+        """
+        Wait until all the data has been written to the wrapped sink and sync it
+
+        :returns: The size of the output in bytes
+        """
+        self._flush_buffer()
+        self._queue.join()
+        self._raise_error()
+        return self.sink.sync()
+
+    def close(self):
+        """
+        Write all the data, stop the background thread and close the wrapped sink, which is closed even if
+        writing the data failed
+        """
+        try:
+            self._flush_buffer()
+        finally:
+            self._queue.put(None)
+            self._thread.join()
+            try:
+                self._raise_error()
+            finally:
+                self.sink.close()
+
+def open_sink(target, compression=None, threaded=False, offset=None):
+    """
+    Get a sink writing to the given target. Sinks are returned unchanged.
+
+    :param target: A path or a sink
+    :param compression: The compression used when target is a path
+    :param threaded: If set to True and target is a path, the file is written by a background thread
+    :param offset: If given and target is a path, the file is truncated at this offset and the data is written after it
+    :type target: str or :class:`BaseSink`
+    :type compression: str
+    :type threaded: bool
+    :type offset: int
+    :returns: :class:`BaseSink`
+    :raises: ValueError
+    """
+    if isinstance(target, BaseSink):
+        if offset is not None:
+            raise ValueError('Only files given by their path can be truncated')
+        return target
+
+    sink = FileSink(target, compression, offset=offset)
+    if threaded:
+        sink = ThreadedSink(sink)
+
+    return sink
+
+@contextlib.contextmanager
+def sink_for(target, compression=None, threaded=False, offset=None):
+    """
+    Context manager giving a sink writing to the given target. Sinks opened from a path are closed on exit,
+    while the sinks given are only flushed, so they can still be used. If the block raises an exception, errors
+    raised while flushing or closing the sink are ignored so they do not replace it.
+
+    Example::
+
+        with sink_for('people.csv') as sink:
+            sink.write('name,age\\n')
+
+    :param target: A path or a sink
+    :param compression: The compression used when target is a path
+    :param threaded: If set to True and target is a path, the file is written by a background thread
+    :param offset: If given and target is a path, the file is truncated at this offset and the data is written after it
+    :type target: str or :class:`BaseSink`
+    :type compression: str
+    :type threaded: bool
+    :type offset: int
+    """
+    sink = open_sink(target, compression, threaded, offset)
+    try:
+        yield sink
+    except BaseException:
+        try:
+            if sink is target:
+                sink.flush()
+            else:
+                sink.close()
+        except Exception:
+            pass
+        raise
+
+    if sink is target:
+        sink.flush()
+    else:
+        sink.close()
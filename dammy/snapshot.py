@@ -0,0 +1,352 @@
+"""
+This module caches generated datasets on disk, so test suites generating the same dataset on every run only generate it
+once. A dataset generated from a seed is always the same, so it is stored in a snapshot identified by a fingerprint of
+the definition of its entities, the number of rows of each table, the localization and the seed. The tables are stored
+column by column in a compact binary format (see :func:`dammy.shared.layout_columns`), and a snapshot is loaded by
+mapping its file into memory, without decoding any row until it is read.
+"""
+import hashlib
+import inspect
+import json
+import mmap
+import os
+import random
+import struct
+import tempfile
+
+from .core import BaseGenerator, GenerationSession
+from .shared import BufferColumns, layout_columns, write_columns
+
+# Written at the start of every snapshot, changed whenever the format changes
+MAGIC = b'DAMMY-SNAPSHOT-1'
+
+# The magic, followed by the offset and the size of the manifest
+HEADER_SIZE = len(MAGIC) + 16
+
+# Attributes of the generators which are caches and not part of their definition
+CACHE_ATTRIBUTES = ('_row_plan', '_sequences', '_sampler', '_sample', '_limits')
+
+def _source_hash(obj):
+    """
+    Get a hash of the source code of a class or a function defined outside dammy, so changing it changes the fingerprint
+
+    :returns: str containing the hash, empty if the source is not available
+    """
+    if (getattr(obj, '__module__', None) or '').split('.')[0] == 'dammy':
+        return ''
+    try:
+        return hashlib.blake2b(inspect.getsource(obj).encode('utf-8'), digest_size=8).hexdigest()
+    except (OSError, TypeError):
+        return ''
+
+def _describe(obj, seen):
+    """
+    Describe the definition of a value, recursively describing the generators, the containers and the functions it contains
+
+    :param obj: The value
+    :param seen: The position of every generator already described, so shared generators are described once
+    :type seen: dict
+    :returns: str containing the description
+    """
+    if obj is None or isinstance(obj, (str, bytes, int, float, bool)):
+        return repr(obj)
+
+    if isinstance(obj, (list, tuple)):
+        return '[{}]'.format(','.join(_describe(x, seen) for x in obj))
+
+    if isinstance(obj, dict):
+        return '{{{}}}'.format(','.join('{}:{}'.format(_describe(k, seen), _describe(v, seen)) for k, v in obj.items()))
+
+    if isinstance(obj, type) or callable(obj) and not isinstance(obj, BaseGenerator):
+        return '{}.{}#{}'.format(getattr(obj, '__module__', ''), getattr(obj, '__qualname__', type(obj).__name__), _source_hash(obj))
+
+    if isinstance(obj, BaseGenerator):
+        if id(obj) in seen:
+            return '@{}'.format(seen[id(obj)])
+        seen[id(obj)] = len(seen)
+
+        attributes = ','.join(
+            '{}={}'.format(k, _describe(v, seen)) for k, v in sorted(vars(obj).items()) if k not in CACHE_ATTRIBUTES
+        )
+
+        # Generators reading files also describe their content
+        content = obj._fingerprint()
+        if content is not None:
+            return '{}({})#{}'.format(_describe(type(obj), seen), attributes, content)
+        return '{}({})'.format(_describe(type(obj), seen), attributes)
+
+    return '<{}.{}>'.format(type(obj).__module__, type(obj).__qualname__)
+
+def fingerprint(dataset, seed, localization=None):
+    """
+    Get the fingerprint of a dataset generated from a seed. It changes whenever the definition of an entity, the number of
+    rows of a table, the amplified tables, the localization or the seed change, including the source code of entities, generators and functions
+    defined outside dammy and the content of the files read by generators, such as vocabulary packs and key indexes.
+
+    :param dataset: The dataset
+    :param seed: The seed
+    :param localization: The localization used to generate the rows
+    :type dataset: :class:`dammy.db.DatasetGenerator`
+    :type seed: int
+    :type localization: str
+    :returns: str containing the fingerprint in hexadecimal
+    """
+    seen = {}
+    parts = [MAGIC.decode('ascii'), repr(seed), repr(localization), _describe(dataset._amplified, seen)]
+    for c, n in dataset._args:
+        entity = c()
+        parts.append('{}:{}:{}'.format(c.__name__, n, _describe(c, seen)))
+        parts.extend('{}={}'.format(attr, _describe(getattr(entity, attr), seen)) for attr in entity.attrs)
+
+    return hashlib.blake2b('\n'.join(parts).encode('utf-8'), digest_size=16).hexdigest()
+
+class Snapshot:
+    """
+    The tables of a dataset stored in a snapshot file, mapped into memory. Each table behaves like a read-only list of
+    rows (see :class:`dammy.shared.BufferColumns`), and the snapshot can be given as the dataset of other generators.
+
+    The file stays mapped until :meth:`close` is called, which is done when leaving a with statement.
+
+    :param path: The path of the snapshot file
+    :type path: str
+    :raises: ValueError
+    """
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError('{} is not a snapshot'.format(path))
+
+        if self._map[:len(MAGIC)] != MAGIC:
+            self._map.close()
+            self._file.close()
+            raise ValueError('{} is not a snapshot'.format(path))
+
+        start, manifest_size = struct.unpack_from('<QQ', self._map, len(MAGIC))
+        manifest = json.loads(self._map[start:start + manifest_size].decode('utf-8'))
+
+        self.fingerprint = manifest['fingerprint']
+        self._data = memoryview(self._map)[HEADER_SIZE:start]
+        self.tables = dict((name, BufferColumns(self._data, handle)) for name, handle in manifest['tables'].items())
+
+    def __getitem__(self, table):
+        """
+        Get the rows of a table
+
+        :param table: The name of the table
+        :type table: str
+        :returns: :class:`dammy.shared.BufferColumns`
+        """
+        return self.tables[table]
+
+    def __len__(self):
+        """
+        Counts the number of tables
+
+        :returns: The number of tables
+        """
+        return len(self.tables)
+
+    def to_dict(self):
+        """
+        Read every row, as returned by :attr:`dammy.db.DatasetGenerator.data`
+
+        :returns: dict containing the list of rows of each table
+        """
+        return dict((name, list(rows)) for name, rows in self.tables.items())
+
+    def close(self):
+        """
+        Unmap the file. The rows cannot be read afterwards
+        """
+        for rows in self.tables.values():
+            rows.close()
+        self._data.release()
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+class SnapshotCache:
+    """
+    Stores the datasets generated from a seed in a directory, one snapshot file per fingerprint (see :func:`fingerprint`),
+    and loads them instead of generating them again. The data is the one obtained calling :func:`dammy.seed` with the seed
+    and then :meth:`dammy.db.DatasetGenerator.generate`, but datasets are generated in a separate
+    :class:`dammy.GenerationSession` and the state of the random module is left untouched.
+
+    :param directory: The directory of the snapshots. By default, the DAMMY_CACHE_DIR environment variable, or .dammy_cache
+    :type directory: str
+
+    Example::
+
+        cache = SnapshotCache()
+        with cache.get(dataset, seed=42) as snapshot:
+            person = snapshot['Person'][0]
+    """
+    def __init__(self, directory=None):
+        self.directory = directory or os.environ.get('DAMMY_CACHE_DIR', '.dammy_cache')
+
+    def path(self, dataset, seed, localization=None):
+        """
+        Get the path of the snapshot of a dataset
+
+        :returns: str containing the path
+        """
+        return os.path.join(self.directory, '{}.snapshot'.format(fingerprint(dataset, seed, localization)))
+
+    def load(self, dataset, seed, localization=None):
+        """
+        Load the snapshot of a dataset if it has been stored
+
+        :param dataset: The dataset
+        :param seed: The seed
+        :param localization: The localization used to generate the rows
+        :type dataset: :class:`dammy.db.DatasetGenerator`
+        :type seed: int
+        :type localization: str
+        :returns: :class:`Snapshot`, or None if it has not been stored
+        """
+        path = self.path(dataset, seed, localization)
+        if not os.path.exists(path):
+            return None
+        return Snapshot(path)
+
+    def store(self, dataset, seed, localization=None):
+        """
+        Generate a dataset and store its snapshot, replacing the stored one if any
+
+        :param dataset: The dataset
+        :param seed: The seed
+        :param localization: The localization used to generate the rows
+        :type dataset: :class:`dammy.db.DatasetGenerator`
+        :type seed: int
+        :type localization: str
+        :returns: :class:`Snapshot`
+        """
+        path = self.path(dataset, seed, localization)
+
+        random_state = random.getstate()
+        try:
+            with GenerationSession():
+                random.seed(seed)
+                dataset.generate(None, localization)
+
+                # Lay out every table one after another
+                layouts = {}
+                size = 0
+                for c, _ in dataset._args:
+                    name = c.__name__
+                    rows = dataset[name]
+                    columns = dict((field, [row[field] for row in rows]) for field in c()._get_column_names())
+                    layouts[name], size = layout_columns(columns, size)
+        finally:
+            random.setstate(random_state)
+
+        os.makedirs(self.directory, exist_ok=True)
+        descriptor, temporary = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'w+b') as f:
+                # The tables are written right after the header, and the manifest describing them after the tables
+                f.truncate(HEADER_SIZE + size)
+                handles = {}
+                if size > 0:
+                    mapped = mmap.mmap(f.fileno(), 0)
+                    buffer = memoryview(mapped)[HEADER_SIZE:]
+                    try:
+                        for name, layout in layouts.items():
+                            handles[name] = write_columns(buffer, layout)
+                    finally:
+                        buffer.release()
+                        mapped.flush()
+                        mapped.close()
+                else:
+                    for name, layout in layouts.items():
+                        handles[name] = write_columns(memoryview(b''), layout)
+
+                manifest = json.dumps({'fingerprint': os.path.basename(path).split('.')[0], 'tables': handles}).encode('utf-8')
+                f.seek(0)
+                f.write(MAGIC)
+                f.write(struct.pack('<QQ', HEADER_SIZE + size, len(manifest)))
+                f.seek(HEADER_SIZE + size)
+                f.write(manifest)
+
+            os.replace(temporary, path)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+
+        return Snapshot(path)
+
+    def get(self, dataset, seed, localization=None):
+        """
+        Load the snapshot of a dataset, generating and storing it first if it has not been stored
+
+        :param dataset: The dataset
+        :param seed: The seed
+        :param localization: The localization used to generate the rows
+        :type dataset: :class:`dammy.db.DatasetGenerator`
+        :type seed: int
+        :type localization: str
+        :returns: :class:`Snapshot`
+        """
+        snapshot = self.load(dataset, seed, localization)
+        if snapshot is None:
+            snapshot = self.store(dataset, seed, localization)
+        return snapshot
+
+    def clear(self):
+        """
+        Remove every stored snapshot
+        """
+        if os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                if name.endswith('.snapshot'):
+                    os.remove(os.path.join(self.directory, name))
+
+def snapshot_fixture(dataset, seed, localization=None, directory=None, scope='session'):
+    """
+    Create a pytest fixture providing the snapshot of a dataset, loaded from the cache or generated the first time
+
+    :param dataset: The dataset
+    :param seed: The seed
+    :param localization: The localization used to generate the rows
+    :param directory: The directory of the snapshots. See :class:`SnapshotCache`
+    :param scope: The scope of the fixture
+    :type dataset: :class:`dammy.db.DatasetGenerator`
+    :type seed: int
+    :type localization: str
+    :type directory: str
+    :type scope: str
+    :returns: The pytest fixture, to be assigned to a name in a test module or a conftest.py
+    :raises: ImportError
+
+    Example::
+
+        # conftest.py
+        from dammy.snapshot import snapshot_fixture
+
+        people = snapshot_fixture(DatasetGenerator((Person, 100000)), seed=42)
+
+        # test_people.py
+        def test_people(people):
+            assert len(people['Person']) == 100000
+    """
+    import pytest
+
+    @pytest.fixture(scope=scope)
+    def fixture():
+        snapshot = SnapshotCache(directory).get(dataset, seed, localization)
+        try:
+            yield snapshot
+        finally:
+            snapshot.close()
+
+    return fixture
\ No newline at end of file
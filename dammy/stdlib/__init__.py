@@ -11,4 +11,10 @@ from . randomdatetime import RandomDateTime
 from . randominteger import RandomInteger
 from . randomname import RandomName
 from . randomstring import RandomString
-from . randomfloat import RandomFloat
\ No newline at end of file
+from . randomfloat import RandomFloat
+from . distributions import Distribution, Normal, LogNormal, Exponential, Pareto, Poisson, Zipf, Truncated, Discretized
+from . pool import Pool
+from . pattern import Pattern
+from . conditional import Conditional
+from . vocabulary import Vocabulary
+from . ascending import Ascending
\ No newline at end of file
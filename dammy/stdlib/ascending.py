@@ -0,0 +1,144 @@
+import copy
+import datetime
+
+from dammy.core import BaseGenerator, _random_source, _current_session
+from dammy.sampling import SequentialSample, SortedUniforms
+from .randominteger import RandomInteger
+from .randomfloat import RandomFloat
+from .randomdatetime import RandomDateTime
+
+class Ascending(BaseGenerator):
+    """
+    Generates a random sample of the values of a :class:`dammy.stdlib.RandomInteger`, :class:`dammy.stdlib.RandomFloat`
+    or :class:`dammy.stdlib.RandomDateTime` in ascending order, such as monotonic event timestamps or ascending keys,
+    so tables can be bulk loaded into clustered indexes or time partitions without sorting them. The values are generated
+    one at a time with O(1) memory (see :class:`dammy.sampling.SortedUniforms` and :class:`dammy.sampling.SequentialSample`),
+    and are distributed as the n values of the generator once sorted.
+
+    Integers can be chosen without repetition, in which case every subset of n integers is equally likely and
+    :class:`dammy.db.Unique` does not keep the generated values. Floats and datetimes are different almost surely.
+
+    The sample is only sorted when generated in order, so it cannot be generated by index
+    (see :meth:`dammy.EntityGenerator.generate_range`).
+
+    :param generator: The generator whose interval is sampled
+    :param n: The number of values of the sample, usually the number of rows of the table
+    :param unique: If set to True, integers are not repeated
+    :type generator: :class:`dammy.stdlib.RandomInteger`, :class:`dammy.stdlib.RandomFloat` or :class:`dammy.stdlib.RandomDateTime`
+    :type n: int
+    :type unique: bool
+    :raises: ValueError
+
+    Example::
+        class Event(EntityGenerator):
+            key = PrimaryKey(event_id=Ascending(RandomInteger(1, 10 ** 12), 10 ** 8, unique=True))
+            timestamp = Ascending(RandomDateTime(datetime(2024, 1, 1), datetime(2025, 1, 1)), 10 ** 8)
+    """
+
+    def __init__(self, generator, n, unique=False):
+        if not isinstance(generator, (RandomInteger, RandomFloat, RandomDateTime)):
+            raise ValueError('Only RandomInteger, RandomFloat and RandomDateTime values can be generated in ascending order')
+        if unique and not isinstance(generator, RandomInteger):
+            raise ValueError('Only integers can be chosen without repetition')
+        if unique and n > generator._cardinality():
+            raise ValueError('Cannot choose {} different integers out of {}'.format(n, generator._cardinality()))
+        if n < 0:
+            raise ValueError('The number of values must not be negative')
+
+        super(Ascending, self).__init__(generator._sql_equivalent)
+        self._generator = generator
+        self._n = n
+        self._unique = unique
+
+        if isinstance(generator, RandomDateTime):
+            # Naive datetimes are offset without converting them to timestamps, which would depend on the local time zone
+            self._lb = generator._start
+            self._ub = generator._end
+        else:
+            self._lb = generator._lb
+            self._ub = generator._ub
+
+    def _new_state(self):
+        """
+        Get the initial state of the sample, before its first value
+
+        :returns: dict containing the initial state
+        """
+        sampler = SequentialSample(self._n, self._ub - self._lb + 1) if self._unique else SortedUniforms(self._n)
+        return {'last_generated': None, 'sampler': sampler}
+
+    def _get_state(self):
+        """
+        Get the state of the sample, so it can be restored later
+
+        :returns: dict containing the state
+        """
+        state = super(Ascending, self)._get_state()
+        state['sampler'] = copy.copy(state['sampler'])
+        return state
+
+    def generate_raw(self, dataset=None, localization=None):
+        """
+        Generates the next value of the sample
+
+        Implementation of the generate_raw() method from BaseGenerator.
+
+        :param dataset: The dataset from which all referenced fields will be retrieved. It will be ignored
+        :type dataset: :class:`dammy.db.DatasetGenerator` or dict
+        :returns: The next value, not smaller than the previous one
+        :raises: ValueError
+        """
+        with _current_session()._lock:
+            sampler = self._state()['sampler']
+            if self._unique:
+                return self._generate(self._lb + sampler.next_index(_random_source.rng))
+
+            u = sampler.next_value(_random_source.rng)
+            if isinstance(self._generator, RandomInteger):
+                value = self._lb + int(u * (self._ub - self._lb + 1))
+            elif isinstance(self._generator, RandomDateTime):
+                value = self._lb + datetime.timedelta(seconds=u * (self._ub - self._lb).total_seconds())
+            else:
+                value = self._lb + u * (self._ub - self._lb)
+
+            return self._generate(value)
+
+    def generate(self, dataset=None, localization=None):
+        """
+        Generates the next value of the sample, formatting datetimes if the generator has a format string
+
+        Implementation of the generate() method from BaseGenerator.
+
+        :param dataset: The dataset from which all referenced fields will be retrieved. It will be ignored
+        :type dataset: :class:`dammy.db.DatasetGenerator` or dict
+        :returns: The next value, not smaller than the previous one
+        :raises: ValueError
+        """
+        value = self.generate_raw(dataset, localization)
+        if isinstance(self._generator, RandomDateTime) and self._generator._format is not None:
+            return self._generate(value.strftime(self._generator._format))
+        return value
+
+    def _is_unique(self):
+        """
+        Check wether every generated value is different from the previous ones
+
+        :returns: True if integers are chosen without repetition
+        """
+        return self._unique
+
+    def _seek(self, index, seed=None, source=None):
+        """
+        Generation by index is not supported, because each value depends on the previous one
+
+        :raises: ValueError
+        """
+        raise ValueError('Ascending values cannot be generated by index')
+
+    def _cardinality(self):
+        """
+        Get the number of different values of the sample
+
+        :returns: The number of values of the sample if they are unique, the number of values of the generator otherwise
+        """
+        return self._n if self._unique else self._generator._cardinality()
\ No newline at end of file
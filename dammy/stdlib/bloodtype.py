@@ -1,6 +1,4 @@
-import random
-
-from dammy.core import BaseGenerator
+from dammy.core import BaseGenerator, _random_source
 
 class BloodType(BaseGenerator):
     """
@@ -24,4 +22,5 @@ class BloodType(BaseGenerator):
         letters = ['A', 'B', '0', 'AB']
         symbols = ['+', '-']
 
-        return self._generate(random.choice(letters) + random.choice(symbols))
\ No newline at end of file
+        rng = _random_source.rng
+        return self._generate(rng.choice(letters) + rng.choice(symbols))
\ No newline at end of file
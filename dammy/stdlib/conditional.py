@@ -0,0 +1,97 @@
+from dammy.core import BaseGenerator, _row_state, _evaluate, _random_source
+from dammy.db import ForeignKey
+
+class Conditional(BaseGenerator):
+    """
+    The base class of the generators whose value depends on the value of another generator, such as the model of a car
+    depending on its brand. The possible values for each parent value are stored in a
+    :class:`dammy.sampling.ConditionalTable`, built once, so a value is chosen in O(1) time.
+
+    The parent can be a generator, whose value for the row being generated is used, a :class:`dammy.db.ForeignKey`
+    referencing a single field, whose last reference is used, or a constant. Outside an entity, the last value of the
+    parent generator is used, and a new one is generated if it has none. If it is missing, the parent is chosen at
+    random among the ones with at least one value.
+
+    :param parent: The parent
+    :param table: The values of each parent
+    :param sql_equivalent: The SQL type of the generated values
+    :type parent: :class:`dammy.BaseGenerator`, :class:`dammy.db.ForeignKey` or any other value
+    :type table: :class:`dammy.sampling.ConditionalTable`
+    :type sql_equivalent: str
+
+    Example::
+        table = ConditionalTable({'ES': ['Madrid', 'Sevilla'], 'FR': ['Paris']})
+
+        class City(Conditional):
+            def __init__(self, country=None):
+                super(City, self).__init__(country, table, 'VARCHAR(20)')
+    """
+
+    def __init__(self, parent, table, sql_equivalent):
+        super(Conditional, self).__init__(sql_equivalent)
+        self._parent = parent
+        self._table = table
+
+    def _parent_value(self, dataset=None, localization=None):
+        """
+        Get the value of the parent for the row being generated
+
+        :returns: The value of the parent
+        """
+        parent = self._parent
+        if isinstance(parent, ForeignKey):
+            return list(parent._last_generated.values())[0]
+
+        if isinstance(parent, BaseGenerator):
+            # Inside an entity the parent is evaluated once per row, otherwise its last value is used
+            if getattr(_row_state, 'values', None) is None and parent._last_generated is not None:
+                return parent._last_generated
+            return _evaluate(parent, dataset, localization)
+
+        return parent
+
+    def generate_raw(self, dataset=None, localization=None):
+        """
+        Chooses a value of the parent
+
+        Implementation of the generate_raw() method from BaseGenerator.
+
+        :param dataset: The dataset from which all referenced fields will be retrieved
+        :type dataset: :class:`dammy.db.DatasetGenerator` or dict
+        :returns: A value of the parent
+        :raises: ValueError
+        """
+        if self._parent is None:
+            rng = _random_source.rng
+            return self._generate(self._table.sample(self._table.sample_parent(rng), rng))
+
+        return self._generate(self._table.sample(self._parent_value(dataset, localization), _random_source.rng))
+
+    def generate_batch(self, n, dataset=None, localization=None):
+        """
+        Generates n values. Without a parent, the parents and their values are chosen together
+
+        :param n: The number of values to generate
+        :param dataset: The dataset from which all referenced fields will be retrieved
+        :type n: int
+        :type dataset: :class:`dammy.db.DatasetGenerator` or dict
+        :returns: list containing the generated values
+        """
+        if self._parent is not None:
+            return super(Conditional, self).generate_batch(n, dataset, localization)
+
+        values = [child for _, child in self._table.sample_pairs(n, _random_source.rng)]
+        if n > 0:
+            self._generate(values[-1])
+
+        return values
+
+    def generate_pairs(self, n):
+        """
+        Chooses n parents along with one of their values, without retrying parents with no values
+
+        :param n: The number of pairs
+        :type n: int
+        :returns: list containing a (parent, value) tuple per pair
+        """
+        return self._table.sample_pairs(n, _random_source.rng)
\ No newline at end of file
@@ -1,8 +1,7 @@
 import json
-import random
 import pkg_resources
 
-from dammy.core import BaseGenerator
+from dammy.core import BaseGenerator, _random_source
 
 class CountryName(BaseGenerator):
     """
@@ -31,6 +30,6 @@ class CountryName(BaseGenerator):
         if localization is None or localization.lower() == 'default':
             localization = 'en'
 
-        c = random.choice(list(CountryName._countries[localization].keys()))
+        c = _random_source.rng.choice(list(CountryName._countries[localization].keys()))
 
         return self._generate(CountryName._countries[localization][c])
\ No newline at end of file
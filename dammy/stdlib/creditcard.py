@@ -1,6 +1,4 @@
-import random
-
-from dammy.core import BaseGenerator
+from dammy.core import BaseGenerator, _random_source
 
 class CreditCard(BaseGenerator):
     """
@@ -35,7 +33,8 @@ class CreditCard(BaseGenerator):
 
         :returns: A synthetic credit card number
         """
-        return ' '.join(['{:04d}'.format(random.randint(0, 9999)) for i in range(4)])
+        rng = _random_source.rng
+        return ' '.join(['{:04d}'.format(rng.randint(0, 9999)) for i in range(4)])
 
     @staticmethod
     def __validate(number):
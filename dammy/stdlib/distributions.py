@@ -0,0 +1,464 @@
+import math
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from dammy.core import BaseGenerator, _random_source
+from dammy.exceptions import MaximumRetriesExceededException
+
+class Distribution(BaseGenerator):
+    """
+    The base class of the generators sampling a statistical distribution. Values are generated one by one
+    using :func:`dammy.get_random`, so they are affected by :func:`dammy.seed`. Batches generated using
+    :meth:`generate_batch` are sampled by NumPy when it is installed, seeded from the same generator.
+
+    Distributions must implement _sample(), drawing from :func:`dammy.get_random`, and can implement _sample_numpy()
+    to support fast batches.
+
+    :param sql_equivalent: The SQL type of the generated values
+    :type sql_equivalent: str
+    """
+
+    def _sample(self):
+        """
+        Sample a single value. All distributions must implement this method.
+
+        :returns: The sampled value
+        :raises: NotImplementedError
+        """
+        raise NotImplementedError('The _sample() method must be overridden')
+
+    def _sample_numpy(self, rng, n):
+        """
+        Sample n values using NumPy. Distributions not implementing this method are sampled one by one.
+
+        :param rng: The NumPy random number generator
+        :param n: The number of values to sample
+        :type rng: numpy.random.Generator
+        :type n: int
+        :returns: numpy.ndarray containing the sampled values, or None if not supported
+        """
+        return None
+
+    def _bounds(self):
+        """
+        Get the interval containing every value of the distribution
+
+        :returns: tuple containing the lower and the upper bound, or None if the distribution is unbounded
+        """
+        return None
+
+    def generate_raw(self, dataset=None, localization=None):
+        """
+        Samples a new value from the distribution
+
+        Implementation of the generate_raw() method from BaseGenerator.
+
+        :param dataset: The dataset from which all referenced fields will be retrieved. It will be ignored
+        :type dataset: :class:`dammy.db.DatasetGenerator` or dict
+        :returns: The sampled value
+        """
+        return self._generate(self._sample())
+
+    def generate_batch(self, n, dataset=None, localization=None):
+        """
+        Samples n values from the distribution, using NumPy if it is installed
+
+        :param n: The number of values to generate
+        :param dataset: The dataset from which all referenced fields will be retrieved. It will be ignored
+        :type n: int
+        :type dataset: :class:`dammy.db.DatasetGenerator` or dict
+        :returns: list containing the sampled values
+        """
+        values = None
+        if numpy is not None and n > 0:
+            values = self._sample_numpy(numpy.random.default_rng(_random_source.rng.getrandbits(64)), n)
+
+        if values is None:
+            values = [self._sample() for _ in range(n)]
+        else:
+            values = values.tolist()
+
+        if n > 0:
+            self._generate(values[-1])
+
+        return values
+
+class Normal(Distribution):
+    """
+    Generates floating point numbers following a normal (gaussian) distribution
+
+    :param mu: The mean
+    :param sigma: The standard deviation
+    :type mu: float
+    :type sigma: float
+
+    Example::
+        Normal(170, 10) # Heights in centimeters
+    """
+
+    def __init__(self, mu=0.0, sigma=1.0):
+        super(Normal, self).__init__('DECIMAL')
+        self._mu = mu
+        self._sigma = sigma
+
+    def _sample(self):
+        return _random_source.rng.gauss(self._mu, self._sigma)
+
+    def _sample_numpy(self, rng, n):
+        return rng.normal(self._mu, self._sigma, n)
+
+class LogNormal(Distribution):
+    """
+    Generates floating point numbers following a log-normal distribution, whose logarithm is normally distributed
+
+    :param mu: The mean of the logarithm
+    :param sigma: The standard deviation of the logarithm
+    :type mu: float
+    :type sigma: float
+
+    Example::
+        LogNormal(3, 1) # Order amounts, most of them small with a long tail of big orders
+    """
+
+    def __init__(self, mu=0.0, sigma=1.0):
+        super(LogNormal, self).__init__('DECIMAL')
+        self._mu = mu
+        self._sigma = sigma
+
+    def _sample(self):
+        return _random_source.rng.lognormvariate(self._mu, self._sigma)
+
+    def _sample_numpy(self, rng, n):
+        return rng.lognormal(self._mu, self._sigma, n)
+
+    def _bounds(self):
+        return (0, math.inf)
+
+class Exponential(Distribution):
+    """
+    Generates floating point numbers following an exponential distribution
+
+    :param rate: The rate of the distribution, the inverse of its mean
+    :type rate: float
+
+    Example::
+        Exponential(1 / 30) # Seconds between two events, 30 on average
+    """
+
+    def __init__(self, rate=1.0):
+        super(Exponential, self).__init__('DECIMAL')
+        self._rate = rate
+
+    def _sample(self):
+        return _random_source.rng.expovariate(self._rate)
+
+    def _sample_numpy(self, rng, n):
+        return rng.exponential(1 / self._rate, n)
+
+    def _bounds(self):
+        return (0, math.inf)
+
+class Pareto(Distribution):
+    """
+    Generates floating point numbers following a Pareto distribution, greater than or equal to the scale
+
+    :param alpha: The shape of the distribution. The smaller, the longer the tail
+    :param scale: The minimum value
+    :type alpha: float
+    :type scale: float
+
+    Example::
+        Pareto(1.16, 1000) # Incomes following the 80-20 rule
+    """
+
+    def __init__(self, alpha, scale=1.0):
+        super(Pareto, self).__init__('DECIMAL')
+        self._alpha = alpha
+        self._scale = scale
+
+    def _sample(self):
+        return _random_source.rng.paretovariate(self._alpha) * self._scale
+
+    def _sample_numpy(self, rng, n):
+        # NumPy samples the Lomax distribution, which is a Pareto distribution shifted to 0
+        return (rng.pareto(self._alpha, n) + 1) * self._scale
+
+    def _bounds(self):
+        return (self._scale, math.inf)
+
+class Poisson(Distribution):
+    """
+    Generates integers following a Poisson distribution, the number of events happening in an interval
+
+    :param lam: The mean number of events
+    :type lam: float
+
+    Example::
+        Poisson(3) # Number of items in an order
+    """
+
+    def __init__(self, lam):
+        super(Poisson, self).__init__('INTEGER')
+        self._lam = lam
+
+    def _sample(self):
+        lam = self._lam
+        rng = _random_source.rng
+
+        if lam < 10:
+            # Multiply uniform numbers until the product falls below exp(-lam) (Knuth)
+            limit = math.exp(-lam)
+            k = 0
+            p = rng.random()
+            while p > limit:
+                k += 1
+                p *= rng.random()
+            return k
+
+        # Transformed rejection with squeeze (Hormann, 1993), as done by NumPy
+        slam = math.sqrt(lam)
+        loglam = math.log(lam)
+        b = 0.931 + 2.53 * slam
+        a = -0.059 + 0.02483 * b
+        invalpha = 1.1239 + 1.1328 / (b - 3.4)
+        vr = 0.9277 - 3.6224 / (b - 2)
+
+        while True:
+            u = rng.random() - 0.5
+            v = rng.random()
+            us = 0.5 - abs(u)
+            k = math.floor((2 * a / us + b) * u + lam + 0.43)
+
+            if us >= 0.07 and v <= vr:
+                return k
+
+            if k < 0 or (us < 0.013 and v > us):
+                continue
+
+            if math.log(v) + math.log(invalpha) - math.log(a / (us * us) + b) <= -lam + k * loglam - math.lgamma(k + 1):
+                return k
+
+    def _sample_numpy(self, rng, n):
+        return rng.poisson(self._lam, n)
+
+    def _bounds(self):
+        return (0, math.inf)
+
+class Zipf(Distribution):
+    """
+    Generates integers from 1 to n following a Zipf distribution, where the probability of k is
+    proportional to 1 / k^s. Useful to generate values where a few of them are much more common than the rest,
+    such as the popularity of products or words. Sampling takes constant time and memory for any n.
+
+    :param s: The exponent. The bigger, the more skewed
+    :param n: The number of different values
+    :type s: float
+    :type n: int
+
+    Example::
+        Zipf(1.1, 100000) # Id of the product bought, product 1 being the most popular
+    """
+
+    def __init__(self, s, n):
+        super(Zipf, self).__init__('INTEGER')
+        if s <= 0 or n < 1:
+            raise ValueError('Zipf requires s > 0 and n >= 1')
+
+        self._s = s
+        self._n = n
+
+        # Rejection-inversion sampling (Hormann and Derflinger, 1996)
+        self._h_integral_x1 = self._h_integral(1.5) - 1
+        self._h_integral_n = self._h_integral(n + 0.5)
+        self._threshold = 2 - self._h_integral_inverse(self._h_integral(2.5) - self._h(2))
+
+    @staticmethod
+    def _helper1(x):
+        """
+        log(1 + x) / x, accurate near 0
+        """
+        if abs(x) > 1e-8:
+            return math.log1p(x) / x
+        return 1 - x * (0.5 - x * (1 / 3 - 0.25 * x))
+
+    @staticmethod
+    def _helper2(x):
+        """
+        (exp(x) - 1) / x, accurate near 0
+        """
+        if abs(x) > 1e-8:
+            return math.expm1(x) / x
+        return 1 + x * 0.5 * (1 + x / 3 * (1 + 0.25 * x))
+
+    def _h(self, x):
+        return math.exp(-self._s * math.log(x))
+
+    def _h_integral(self, x):
+        log_x = math.log(x)
+        return self._helper2((1 - self._s) * log_x) * log_x
+
+    def _h_integral_inverse(self, x):
+        t = max(-1, x * (1 - self._s))
+        return math.exp(self._helper1(t) * x)
+
+    def _sample(self):
+        while True:
+            u = self._h_integral_n + _random_source.rng.random() * (self._h_integral_x1 - self._h_integral_n)
+            x = self._h_integral_inverse(u)
+            k = min(max(int(x + 0.5), 1), self._n)
+
+            if k - x <= self._threshold or u >= self._h_integral(k + 0.5) - self._h(k):
+                return k
+
+    def _sample_numpy(self, rng, n):
+        s = self._s
+        result = numpy.empty(n, dtype=numpy.int64)
+        pending = numpy.arange(n)
+
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            while len(pending) > 0:
+                u = self._h_integral_n + rng.random(len(pending)) * (self._h_integral_x1 - self._h_integral_n)
+
+                t = numpy.maximum(-1, u * (1 - s))
+                helper1 = numpy.where(numpy.abs(t) > 1e-8, numpy.log1p(t) / t, 1 - t * (0.5 - t * (1 / 3 - 0.25 * t)))
+                x = numpy.exp(helper1 * u)
+                k = numpy.clip((x + 0.5).astype(numpy.int64), 1, self._n)
+
+                log_k = numpy.log(k + 0.5)
+                y = (1 - s) * log_k
+                helper2 = numpy.where(numpy.abs(y) > 1e-8, numpy.expm1(y) / y, 1 + y * 0.5 * (1 + y / 3 * (1 + 0.25 * y)))
+                accepted = (k - x <= self._threshold) | (u >= helper2 * log_k - numpy.exp(-s * numpy.log(k)))
+
+                result[pending[accepted]] = k[accepted]
+                pending = pending[~accepted]
+
+        return result
+
+    def _bounds(self):
+        return (1, self._n)
+
+    def _cardinality(self):
+        return self._n
+
+class Truncated(Distribution):
+    """
+    Restricts the values of a generator to an interval, discarding the values outside it
+
+    :param generator: The generator whose values will be restricted
+    :param lb: The lower bound of the interval
+    :param ub: The upper bound of the interval
+    :param max_retries: The maximum number of consecutive values outside the interval before giving up
+    :type generator: :class:`dammy.BaseGenerator`
+    :type lb: float
+    :type ub: float
+    :type max_retries: int
+
+    Example::
+        Truncated(Normal(35, 12), 18, 90) # Ages of adults
+    """
+
+    def __init__(self, generator, lb=-math.inf, ub=math.inf, max_retries=1000):
+        super(Truncated, self).__init__(generator._sql_equivalent)
+        self._generator = generator
+        self._lb = lb
+        self._ub = ub
+        self._max_retries = max_retries
+
+    def _sample(self):
+        for _ in range(self._max_retries):
+            value = self._generator.generate()
+            if self._lb <= value <= self._ub:
+                return value
+
+        raise MaximumRetriesExceededException('No value in [{}, {}] generated after {} retries'.format(self._lb, self._ub, self._max_retries))
+
+    def generate_batch(self, n, dataset=None, localization=None):
+        """
+        Generates n values in the interval, generating batches from the restricted generator
+
+        :param n: The number of values to generate
+        :param dataset: The dataset from which all referenced fields will be retrieved. It will be ignored
+        :type n: int
+        :type dataset: :class:`dammy.db.DatasetGenerator` or dict
+        :returns: list containing the generated values
+        """
+        values = []
+        retries = 0
+        while len(values) < n:
+            if retries >= self._max_retries:
+                raise MaximumRetriesExceededException('Not enough values in [{}, {}] generated after {} retries'.format(self._lb, self._ub, self._max_retries))
+
+            missing = n - len(values)
+            values.extend(v for v in self._generator.generate_batch(missing + missing // 2 + 1) if self._lb <= v <= self._ub)
+            retries += 1
+
+        values = values[:n]
+        if n > 0:
+            self._generate(values[-1])
+
+        return values
+
+    def _bounds(self):
+        return (self._lb, self._ub)
+
+    def _cardinality(self):
+        if self._sql_equivalent == 'INTEGER' and math.isfinite(self._lb) and math.isfinite(self._ub):
+            return max(0, math.floor(self._ub) - math.ceil(self._lb) + 1)
+        return self._generator._cardinality()
+
+class Discretized(Distribution):
+    """
+    Rounds the values of a generator to the nearest multiple of a step. Integers are generated when the step is an integer
+
+    :param generator: The generator whose values will be rounded
+    :param step: The distance between two consecutive values
+    :type generator: :class:`dammy.BaseGenerator`
+    :type step: int or float
+
+    Example::
+        Discretized(LogNormal(3, 1), 0.01) # Prices in cents
+    """
+
+    def __init__(self, generator, step=1):
+        super(Discretized, self).__init__('INTEGER' if isinstance(step, int) else 'DECIMAL')
+        self._generator = generator
+        self._step = step
+
+    def _round(self, value):
+        if isinstance(self._step, int):
+            return int(round(value / self._step)) * self._step
+        return round(value / self._step) * self._step
+
+    def _sample(self):
+        return self._round(self._generator.generate())
+
+    def generate_batch(self, n, dataset=None, localization=None):
+        """
+        Generates n rounded values, generating a batch from the rounded generator
+
+        :param n: The number of values to generate
+        :param dataset: The dataset from which all referenced fields will be retrieved. It will be ignored
+        :type n: int
+        :type dataset: :class:`dammy.db.DatasetGenerator` or dict
+        :returns: list containing the generated values
+        """
+        values = [self._round(v) for v in self._generator.generate_batch(n)]
+        if n > 0:
+            self._generate(values[-1])
+
+        return values
+
+    def _bounds(self):
+        bounds = self._generator._bounds() if isinstance(self._generator, Distribution) else None
+        if bounds is None:
+            return None
+        return tuple(self._round(b) if math.isfinite(b) else b for b in bounds)
+
+    def _cardinality(self):
+        bounds = self._bounds()
+        if bounds is None or not (math.isfinite(bounds[0]) and math.isfinite(bounds[1])):
+            return self._generator._cardinality()
+        return int(round((bounds[1] - bounds[0]) / self._step)) + 1
\ No newline at end of file
@@ -1,6 +1,4 @@
-import random
-
-from dammy.core import BaseGenerator
+from dammy.core import BaseGenerator, _random_source
 
 class IPV4Address(BaseGenerator):
     """
@@ -35,4 +33,5 @@ class IPV4Address(BaseGenerator):
 
     @staticmethod
     def __generate_ip():
-        return '.'.join([str(random.randint(0, 254)) for i in range(4)])
\ No newline at end of file
+        rng = _random_source.rng
+        return '.'.join([str(rng.randint(0, 254)) for i in range(4)])
\ No newline at end of file
@@ -0,0 +1,338 @@
+import string
+
+from dammy.core import BaseGenerator, _random_source
+
+# Symbols matched by '.' and by negated character classes
+PRINTABLE = string.ascii_letters + string.digits + string.punctuation + ' '
+
+# Symbols of each escape sequence
+ESCAPES = {
+    'd': string.digits,
+    'w': string.ascii_letters + string.digits + '_',
+    's': ' '
+}
+
+# Symbols of each placeholder of a template
+PLACEHOLDERS = {
+    '#': string.digits,
+    '?': string.ascii_uppercase,
+    '@': string.ascii_lowercase,
+    '*': string.ascii_uppercase + string.digits
+}
+
+class _Parser:
+    """
+    Parses the supported subset of the regular expression syntax into a tree of nodes:
+
+    - ('literal', text)
+    - ('set', symbols, min, max): Between min and max symbols from a character class
+    - ('group', alternatives, min, max): Between min and max repetitions of one of the alternatives,
+      each of them being a list of nodes
+
+    :param pattern: The regular expression
+    :param max_repeat: The maximum number of repetitions of * and +
+    :type pattern: str
+    :type max_repeat: int
+    """
+    def __init__(self, pattern, max_repeat=None):
+        self.pattern = pattern
+        self.max_repeat = max_repeat
+        self.position = 0
+
+    def error(self, message):
+        return ValueError('{} at position {} of {}'.format(message, self.position, self.pattern))
+
+    def peek(self):
+        return self.pattern[self.position] if self.position < len(self.pattern) else None
+
+    def next(self):
+        c = self.peek()
+        if c is None:
+            raise self.error('Unexpected end of pattern')
+        self.position += 1
+        return c
+
+    def parse(self):
+        # Anchors are ignored, the whole string always matches
+        if self.peek() == '^':
+            self.position += 1
+        alternatives = self.alternatives()
+        if self.peek() is not None:
+            raise self.error('Unexpected {}'.format(self.peek()))
+        return [('group', alternatives, 1, 1)] if len(alternatives) > 1 else alternatives[0]
+
+    def alternatives(self):
+        alternatives = [self.sequence()]
+        while self.peek() == '|':
+            self.position += 1
+            alternatives.append(self.sequence())
+        return alternatives
+
+    def sequence(self):
+        nodes = []
+        while self.peek() not in (None, '|', ')'):
+            if self.peek() == '$' and self.position == len(self.pattern) - 1:
+                self.position += 1
+                break
+
+            node = self.atom()
+            lo, hi = self.quantifier()
+            if (lo, hi) != (1, 1):
+                node = ('set' if node[0] == 'literal' else node[0], node[1], lo, hi)
+            nodes.append(node)
+        return nodes
+
+    def atom(self):
+        c = self.next()
+        if c == '(':
+            if self.pattern.startswith('?:', self.position):
+                self.position += 2
+            alternatives = self.alternatives()
+            if self.next() != ')':
+                raise self.error('Missing )')
+            return ('group', alternatives, 1, 1)
+        elif c == '[':
+            return ('set', self.character_class(), 1, 1)
+        elif c == '.':
+            return ('set', PRINTABLE, 1, 1)
+        elif c == '\\':
+            c = self.next()
+            return ('set', ESCAPES[c], 1, 1) if c in ESCAPES else ('literal', c)
+        elif c in '*+?{})]':
+            raise self.error('Unexpected {}'.format(c))
+        return ('literal', c)
+
+    def character_class(self):
+        negated = self.peek() == '^'
+        if negated:
+            self.position += 1
+
+        symbols = []
+        first = True
+        while first or self.peek() != ']':
+            first = False
+            c = self.next()
+            if c == '\\':
+                c = self.next()
+                if c in ESCAPES:
+                    symbols.extend(ESCAPES[c])
+                    continue
+
+            if self.peek() == '-' and self.position + 1 < len(self.pattern) and self.pattern[self.position + 1] != ']':
+                self.position += 1
+                end = self.next()
+                if end == '\\':
+                    end = self.next()
+                if ord(end) < ord(c):
+                    raise self.error('Invalid range {}-{}'.format(c, end))
+                symbols.extend(chr(x) for x in range(ord(c), ord(end) + 1))
+            else:
+                symbols.append(c)
+        self.position += 1
+
+        # Keep the order of the symbols, without duplicates
+        symbols = ''.join(dict.fromkeys(symbols))
+        if negated:
+            symbols = ''.join(c for c in PRINTABLE if c not in symbols)
+        if not symbols:
+            raise self.error('Empty character class')
+        return symbols
+
+    def quantifier(self):
+        c = self.peek()
+        if c == '?':
+            self.position += 1
+            return 0, 1
+        elif c in ('*', '+'):
+            if self.max_repeat is None:
+                raise self.error('Unbounded repetition requires max_repeat')
+            self.position += 1
+            return (0 if c == '*' else 1), self.max_repeat
+        elif c == '{':
+            end = self.pattern.find('}', self.position)
+            if end < 0:
+                raise self.error('Missing }')
+            bounds = self.pattern[self.position + 1:end].split(',')
+            try:
+                lo = int(bounds[0])
+                hi = lo if len(bounds) == 1 else (int(bounds[1]) if bounds[1] else self.max_repeat)
+            except ValueError:
+                raise self.error('Invalid repetition')
+            if hi is None:
+                raise self.error('Unbounded repetition requires max_repeat')
+            if len(bounds) > 2 or hi < lo:
+                raise self.error('Invalid repetition')
+            self.position = end + 1
+            return lo, hi
+        return 1, 1
+
+def _compile(nodes):
+    """
+    Compile a list of nodes into a function generating a string
+
+    :param nodes: The nodes, as returned by _Parser
+    :type nodes: list
+    :returns: A function taking the random number generator and returning a random string matching the nodes
+    """
+
+    # Consecutive literals are joined, everything else becomes a function
+    parts = []
+    for node in nodes:
+        if node[0] == 'literal':
+            if parts and type(parts[-1]) is str:
+                parts[-1] += node[1]
+            else:
+                parts.append(node[1])
+
+        elif node[0] == 'set':
+            _, symbols, lo, hi = node
+            if lo == hi == 1:
+                parts.append(lambda rng, symbols=symbols: rng.choice(symbols))
+            elif lo == hi:
+                parts.append(lambda rng, symbols=symbols, k=lo: ''.join(rng.choices(symbols, k=k)))
+            else:
+                parts.append(lambda rng, symbols=symbols, lo=lo, hi=hi: ''.join(rng.choices(symbols, k=rng.randint(lo, hi))))
+
+        else:
+            _, alternatives, lo, hi = node
+            compiled = [_compile(a) for a in alternatives]
+            if len(compiled) == 1:
+                f = compiled[0]
+                parts.append(lambda rng, f=f, lo=lo, hi=hi: ''.join([f(rng) for _ in range(rng.randint(lo, hi))]))
+            else:
+                parts.append(lambda rng, compiled=compiled, lo=lo, hi=hi: ''.join([rng.choice(compiled)(rng) for _ in range(rng.randint(lo, hi))]))
+
+    if not parts:
+        return lambda rng: ''
+    if len(parts) == 1:
+        part = parts[0]
+        return (lambda rng: part) if type(part) is str else part
+
+    return lambda rng: ''.join([p if type(p) is str else p(rng) for p in parts])
+
+def _measure(nodes):
+    """
+    Get the number of strings and the maximum length of a list of nodes
+
+    :param nodes: The nodes, as returned by _Parser
+    :type nodes: list
+    :returns: tuple containing the number of strings and the maximum length
+    """
+    count = 1
+    length = 0
+    for node in nodes:
+        if node[0] == 'literal':
+            length += len(node[1])
+            continue
+
+        if node[0] == 'set':
+            choices = len(node[1])
+            choice_length = 1
+        else:
+            measures = [_measure(a) for a in node[1]]
+            choices = sum(c for c, _ in measures)
+            choice_length = max(l for _, l in measures)
+
+        _, _, lo, hi = node
+        count *= sum(choices ** k for k in range(lo, hi + 1))
+        length += hi * choice_length
+
+    return count, length
+
+class Pattern(BaseGenerator):
+    """
+    Generates strings matching a regular expression, such as formatted identifiers, phone numbers or license plates.
+    The expression is compiled once into a sampling function, so every string is generated with a few calls instead of
+    one generator per fragment. The supported syntax is:
+
+    - Literal characters and escaped special characters
+    - Character classes such as [A-Z0-9_] or [^aeiou], and the escapes \\\\d, \\\\w and \\\\s
+    - '.', any printable ASCII character
+    - Groups (...) and alternatives a|b
+    - The repetitions ?, {n}, {n,m}, and \\*, + and {n,} up to max_repeat
+
+    The number of different strings is known, so :class:`dammy.db.Unique` fails as soon as the pattern is exhausted.
+    It is exact unless the same string can be generated in two ways, as in a?a. The SQL type is derived from the maximum length.
+
+    :param pattern: The regular expression
+    :param max_repeat: The maximum number of repetitions of \\*, + and {n,}
+    :type pattern: str
+    :type max_repeat: int
+    :raises: ValueError
+
+    Example::
+        Pattern('ORD-[0-9]{8}-[A-Z]{3}')
+        Pattern('\\\\+34 [67]\\\\d{2}( \\\\d{3}){2}')
+    """
+
+    def __init__(self, pattern, max_repeat=None):
+        self._nodes = _Parser(pattern, max_repeat).parse()
+        self._count, length = _measure(self._nodes)
+        super(Pattern, self).__init__('VARCHAR({})'.format(length))
+        self.pattern = pattern
+        self._sample = _compile(self._nodes)
+
+    @classmethod
+    def from_template(cls, template):
+        """
+        Create a pattern from a template, where # is a digit, ? an uppercase letter, @ a lowercase letter,
+        \\* an uppercase letter or a digit, and any other character is kept. Placeholders are escaped with \\\\.
+
+        :param template: The template
+        :type template: str
+        :returns: :class:`Pattern`
+
+        Example::
+            Pattern.from_template('???-####') # License plates
+        """
+        parts = []
+        escaped = False
+        for c in template:
+            if escaped or c not in PLACEHOLDERS and c != '\\':
+                parts.append('\\' + c if not c.isalnum() else c)
+                escaped = False
+            elif c == '\\':
+                escaped = True
+            else:
+                parts.append('[{}]'.format(PLACEHOLDERS[c]))
+
+        return cls(''.join(parts))
+
+    def generate_raw(self, dataset=None, localization=None):
+        """
+        Generates a string matching the pattern
+
+        Implementation of the generate_raw() method from BaseGenerator.
+
+        :param dataset: The dataset from which all referenced fields will be retrieved. It will be ignored
+        :type dataset: :class:`dammy.db.DatasetGenerator` or dict
+        :returns: A random string matching the pattern
+        """
+        return self._generate(self._sample(_random_source.rng))
+
+    def generate_batch(self, n, dataset=None, localization=None):
+        """
+        Generates n strings matching the pattern
+
+        :param n: The number of values to generate
+        :param dataset: The dataset from which all referenced fields will be retrieved. It will be ignored
+        :type n: int
+        :type dataset: :class:`dammy.db.DatasetGenerator` or dict
+        :returns: list containing the generated strings
+        """
+        sample = self._sample
+        rng = _random_source.rng
+        values = [sample(rng) for _ in range(n)]
+
+        if n > 0:
+            self._generate(values[-1])
+
+        return values
+
+    def _cardinality(self):
+        """
+        Get the number of strings matching the pattern
+
+        :returns: The number of different values that can be generated
+        """
+        return self._count
\ No newline at end of file
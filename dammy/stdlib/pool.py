@@ -0,0 +1,228 @@
+import random
+
+from dammy.core import BaseGenerator, _hash_seed, _random_source, _current_session
+
+class Pool(BaseGenerator):
+    """
+    Generates values by sampling a pool of values generated beforehand by another generator, so expensive generators
+    such as :class:`dammy.stdlib.CreditCard` or long :class:`dammy.stdlib.RandomString` are evaluated once per pooled
+    value instead of once per row. The pool is filled in batches using generate_batch() the first time a value is needed,
+    and each value is then drawn in O(1) time.
+
+    The pool can be split into segments of the same size, and one segment is generated again every refresh_every draws,
+    so the values change over time. The refreshed segment is chosen by the eviction policy:
+
+    - lru: The segment whose values were drawn least recently
+    - fifo: The segment refreshed least recently, one after another
+
+    When generating rows by index (see :meth:`dammy.EntityGenerator.generate_range`), the content of the pool only depends
+    on the seed and the index of the row, and segments are always refreshed one after another.
+
+    :param generator: The generator whose values are pooled
+    :param size: The number of values in the pool
+    :param refresh_every: The number of draws between two refreshes. By default, the pool is never refreshed
+    :param segments: The number of segments of the pool. The size must be a multiple of it
+    :param eviction: Either 'lru' or 'fifo'
+    :type generator: :class:`dammy.BaseGenerator`
+    :type size: int
+    :type refresh_every: int
+    :type segments: int
+    :type eviction: str
+    :raises: ValueError
+
+    Example::
+        Pool(CreditCard(), 10000, refresh_every=100000, segments=10) # A tenth of the cards change every 100000 rows
+    """
+
+    def __init__(self, generator, size, refresh_every=None, segments=1, eviction='lru'):
+        super(Pool, self).__init__(generator._sql_equivalent)
+
+        if size < 1 or segments < 1 or size % segments != 0:
+            raise ValueError('The size of the pool must be a positive multiple of the number of segments')
+        if refresh_every is not None and refresh_every < 1:
+            raise ValueError('The number of draws between two refreshes must be positive')
+        if eviction not in ('lru', 'fifo'):
+            raise ValueError('Unknown eviction policy {}'.format(eviction))
+
+        self._generator = generator
+        self._size = size
+        self._refresh_every = refresh_every
+        self._segments = segments
+        self._segment_size = size // segments
+        self._eviction = eviction
+
+    def _new_state(self):
+        """
+        Get the initial state of the pool: empty, with no draws
+
+        :returns: dict containing the initial state
+        """
+        return {
+            'last_generated': None,
+            'values': None,
+            'draws': 0,
+            'generated': 0,
+            'refreshes': 0,
+            'last_used': [0] * self._segments,
+            'refreshed': [0] * self._segments,
+            'filled': [None] * self._segments,
+            'seek': None
+        }
+
+    @property
+    def stats(self):
+        """
+        The statistics of the pool in the active session, as a dict containing:
+
+        - draws: The number of values drawn from the pool
+        - generated: The number of values generated by the pooled generator
+        - refreshes: The number of segments generated again
+        - reuse: The average number of times each generated value has been drawn
+        """
+        state = self._state()
+        return {
+            'draws': state['draws'],
+            'generated': state['generated'],
+            'refreshes': state['refreshes'],
+            'reuse': state['draws'] / state['generated'] if state['generated'] > 0 else 0.0
+        }
+
+    def _fill(self, state, segment, dataset=None, localization=None):
+        """
+        Generate the values of a segment of the pool
+
+        :param state: The state of the pool
+        :param segment: The index of the segment
+        :type state: dict
+        :type segment: int
+        """
+        start = segment * self._segment_size
+        state['values'][start:start + self._segment_size] = self._generator.generate_batch(self._segment_size, dataset, localization)
+        state['generated'] += self._segment_size
+
+    def _refresh(self, state, dataset=None, localization=None):
+        """
+        Generate again the segment chosen by the eviction policy
+
+        :param state: The state of the pool
+        :type state: dict
+        """
+        if self._eviction == 'lru':
+            last_used = state['last_used']
+            segment = last_used.index(min(last_used))
+        else:
+            refreshed = state['refreshed']
+            segment = refreshed.index(min(refreshed))
+
+        state['refreshes'] += 1
+        state['refreshed'][segment] = state['refreshes']
+        self._fill(state, segment, dataset, localization)
+
+    def _fill_at(self, state, index, seed, source, dataset=None, localization=None):
+        """
+        Make the pool contain the values it has at the row with the given index, when generating rows by index.
+        Segments are refreshed one after another, so the last refresh of each segment is known without the previous draws.
+
+        :param state: The state of the pool
+        :param index: The index of the row
+        :param seed: The seed from which the randomness of every value is derived
+        :param source: Values identifying the pool inside the entity
+        :type state: dict
+        :type index: int
+        :type seed: int
+        :type source: tuple
+        """
+        refreshes = index // self._refresh_every if self._refresh_every is not None else 0
+        if state['values'] is None:
+            state['values'] = [None] * self._size
+
+        for segment in range(self._segments):
+
+            # The last refresh of the segment, or 0 if it still has its first values
+            refreshed = refreshes - (refreshes - 1 - segment) % self._segments if refreshes > segment else 0
+            key = (seed, refreshed)
+            if state['filled'][segment] != key:
+                previous = _random_source.rng
+                _random_source.rng = random.Random(_hash_seed(seed, 'pool', *(source or ()), segment, refreshed))
+                try:
+                    self._fill(state, segment, dataset, localization)
+                finally:
+                    _random_source.rng = previous
+                state['filled'][segment] = key
+
+    def _draw(self, state, dataset=None, localization=None):
+        """
+        Draw a value from the pool, filling or refreshing it first if needed
+
+        :param state: The state of the pool
+        :type state: dict
+        :returns: The drawn value
+        """
+        if state['seek'] is not None:
+            self._fill_at(state, *state['seek'], dataset=dataset, localization=localization)
+            state['seek'] = None
+
+        elif state['values'] is None:
+            state['values'] = [None] * self._size
+            for segment in range(self._segments):
+                self._fill(state, segment, dataset, localization)
+
+        elif self._refresh_every is not None and state['draws'] > 0 and state['draws'] % self._refresh_every == 0:
+            self._refresh(state, dataset, localization)
+
+        position = _random_source.rng.randrange(self._size)
+        state['draws'] += 1
+        state['last_used'][position // self._segment_size] = state['draws']
+        return state['values'][position]
+
+    def generate_raw(self, dataset=None, localization=None):
+        """
+        Draws a value from the pool
+
+        Implementation of the generate_raw() method from BaseGenerator.
+
+        :param dataset: The dataset from which all referenced fields will be retrieved
+        :type dataset: :class:`dammy.db.DatasetGenerator` or dict
+        :returns: A value of the pool
+        """
+        with _current_session()._lock:
+            return self._generate(self._draw(self._state(), dataset, localization))
+
+    def generate_batch(self, n, dataset=None, localization=None):
+        """
+        Draws n values from the pool
+
+        :param n: The number of values to generate
+        :param dataset: The dataset from which all referenced fields will be retrieved
+        :type n: int
+        :type dataset: :class:`dammy.db.DatasetGenerator` or dict
+        :returns: list containing the drawn values
+        """
+        with _current_session()._lock:
+            state = self._state()
+            values = [self._draw(state, dataset, localization) for _ in range(n)]
+
+            if n > 0:
+                self._generate(values[-1])
+
+            return values
+
+    def _seek(self, index, seed=None, source=None):
+        """
+        Make the next draw use the values the pool has at the row with the given index
+
+        :param index: The index of the row, starting at 0
+        :type index: int
+        """
+        self._state()['seek'] = (index, seed, source)
+
+    def _cardinality(self):
+        """
+        Get the number of different values the pool can contain
+
+        :returns: The size of the pool if it is never refreshed, the number of values of the pooled generator otherwise
+        """
+        cardinality = self._generator._cardinality()
+        if self._refresh_every is None:
+            return self._size if cardinality is None else min(self._size, cardinality)
+        return cardinality
\ No newline at end of file
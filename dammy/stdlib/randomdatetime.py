@@ -1,8 +1,7 @@
 import time
 import datetime
-import random
 
-from dammy.core import BaseGenerator
+from dammy.core import BaseGenerator, _random_source
 
 class RandomDateTime(BaseGenerator):
     """
@@ -45,7 +44,7 @@ class RandomDateTime(BaseGenerator):
         """
         s = time.mktime(self._start.timetuple())
         e = time.mktime(self._end.timetuple())
-        t = random.uniform(s, e)
+        t = _random_source.rng.uniform(s, e)
 
         return self._generate(datetime.datetime.fromtimestamp(t))
 
@@ -1,6 +1,4 @@
-import random
-
-from dammy.core import BaseGenerator
+from dammy.core import BaseGenerator, _random_source
 
 class RandomFloat(BaseGenerator):
     """
@@ -30,4 +28,4 @@ class RandomFloat(BaseGenerator):
         :type dataset: :class:`dammy.db.DatasetGenerator` or dict
         :returns: A random integer
         """
-        return self._generate(self._lb + random.random() * (self._ub - self._lb))
\ No newline at end of file
+        return self._generate(self._lb + _random_source.rng.random() * (self._ub - self._lb))
\ No newline at end of file
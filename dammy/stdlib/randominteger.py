@@ -1,6 +1,4 @@
-import random
-
-from dammy.core import BaseGenerator
+from dammy.core import BaseGenerator, _random_source
 
 class RandomInteger(BaseGenerator):
     """
@@ -30,4 +28,12 @@ class RandomInteger(BaseGenerator):
         :type dataset: :class:`dammy.db.DatasetGenerator` or dict
         :returns: A random integer
         """
-        return self._generate(random.randint(self._lb, self._ub))
\ No newline at end of file
+        return self._generate(_random_source.rng.randint(self._lb, self._ub))
+
+    def _cardinality(self):
+        """
+        Get the number of integers in the interval
+
+        :returns: The number of different values that can be generated
+        """
+        return max(0, self._ub - self._lb + 1)
\ No newline at end of file
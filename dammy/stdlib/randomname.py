@@ -1,8 +1,7 @@
 import json
-import random
 import pkg_resources
 
-from dammy.core import BaseGenerator
+from dammy.core import BaseGenerator, _random_source
 
 class RandomName(BaseGenerator):
     """
@@ -35,11 +34,11 @@ class RandomName(BaseGenerator):
         """
         gender = self._gender
         if gender is None:
-            gender = random.choice(['male', 'female'])
+            gender = _random_source.rng.choice(['male', 'female'])
 
         if localization is None or localization.lower() == 'default':
-            localization = random.choice(list(RandomName._names.keys()))
+            localization = _random_source.rng.choice(list(RandomName._names.keys()))
         elif localization not in RandomName._names.keys():
             localization = 'default'
         
-        return self._generate(random.choice(RandomName._names[localization][gender]))
\ No newline at end of file
+        return self._generate(_random_source.rng.choice(RandomName._names[localization][gender]))
\ No newline at end of file
@@ -1,6 +1,4 @@
-import random
-
-from dammy.core import BaseGenerator
+from dammy.core import BaseGenerator, _random_source
 
 class RandomString(BaseGenerator):
     """
@@ -28,4 +26,5 @@ class RandomString(BaseGenerator):
         :type dataset: :class:`dammy.db.DatasetGenerator` or dict
         :returns: A randomly generated string
         """
-        return self._generate(''.join(random.choice(self._symbols) for i in range(self._length)))
\ No newline at end of file
+        rng = _random_source.rng
+        return self._generate(''.join(rng.choice(self._symbols) for i in range(self._length)))
\ No newline at end of file
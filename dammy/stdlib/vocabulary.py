@@ -0,0 +1,239 @@
+import array
+import csv
+import mmap
+import shutil
+import struct
+import tempfile
+
+from dammy.core import BaseGenerator, _file_fingerprint, _random_source
+
+# Written at the start of every pack, changed whenever the format changes
+MAGIC = b'DAMMYVOC'
+
+# The magic, followed by the number of strings and the length of the longest one
+HEADER = struct.Struct('<QQ')
+HEADER_SIZE = len(MAGIC) + HEADER.size
+
+class Vocabulary(BaseGenerator):
+    """
+    The base class of the generators choosing strings from a large vocabulary, such as surnames, street names or product
+    names, stored in a pack file which is memory mapped instead of loaded. A pack contains the UTF-8 encoded strings one
+    after another, preceded by the array of their offsets, so a string is chosen in O(1) time and only the chosen strings
+    are decoded. Packs are built from a text file or a CSV file with :meth:`from_text` and :meth:`from_csv`, or with the
+    ``dammy pack`` command.
+
+    :param path: The path of the pack file
+    :param sql_equivalent: The SQL type of the strings. By default, a VARCHAR fitting the longest string
+    :type path: str
+    :type sql_equivalent: str
+    :raises: ValueError
+
+    Example::
+
+        class Surname(Vocabulary):
+            def __init__(self):
+                super(Surname, self).__init__('surnames.pack')
+
+        Vocabulary.from_text('surnames.txt', 'surnames.pack')
+    """
+
+    def __init__(self, path, sql_equivalent=None):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError('{} is not a vocabulary pack'.format(path))
+
+        if self._map[:len(MAGIC)] != MAGIC:
+            self._map.close()
+            self._file.close()
+            raise ValueError('{} is not a vocabulary pack'.format(path))
+
+        self._length, self.max_length = HEADER.unpack_from(self._map, len(MAGIC))
+        data = HEADER_SIZE + 8 * (self._length + 1)
+        self._offsets = memoryview(self._map)[HEADER_SIZE:data].cast('q')
+        self._data = memoryview(self._map)[data:]
+
+        super(Vocabulary, self).__init__(sql_equivalent or 'VARCHAR({})'.format(max(self.max_length, 1)))
+
+    @classmethod
+    def _write(cls, strings, path, sql_equivalent=None):
+        """
+        Write strings to a pack file and open it. The strings are read as a stream, so only their offsets are kept in memory
+
+        :param strings: Iterable of strings
+        :returns: :class:`Vocabulary`
+        """
+        offsets = array.array('q', [0])
+        max_length = 0
+
+        with tempfile.TemporaryFile() as data:
+            buffer = []
+            size = 0
+            for s in strings:
+                encoded = s.encode('utf-8')
+                buffer.append(encoded)
+                size += len(encoded)
+                offsets.append(size)
+                max_length = max(max_length, len(s))
+                if len(buffer) >= 10000:
+                    data.write(b''.join(buffer))
+                    buffer = []
+            data.write(b''.join(buffer))
+
+            data.seek(0)
+            with open(path, 'wb') as f:
+                f.write(MAGIC)
+                f.write(HEADER.pack(len(offsets) - 1, max_length))
+                offsets.tofile(f)
+                shutil.copyfileobj(data, f)
+
+        return cls(path, sql_equivalent)
+
+    @classmethod
+    def from_text(cls, text_path, path, encoding='utf-8', sql_equivalent=None):
+        """
+        Build a pack from a text file with one string per line. Blank lines are skipped and the strings are stripped.
+
+        :param text_path: The path of the text file
+        :param path: The path where the pack will be saved
+        :param encoding: The encoding of the text file
+        :param sql_equivalent: The SQL type of the strings
+        :type text_path: str
+        :type path: str
+        :type encoding: str
+        :type sql_equivalent: str
+        :returns: :class:`Vocabulary`
+        """
+        def strings():
+            with open(text_path, encoding=encoding) as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        yield line
+
+        return cls._write(strings(), path, sql_equivalent)
+
+    @classmethod
+    def from_csv(cls, csv_path, column, path, delimiter=',', encoding='utf-8', sql_equivalent=None):
+        """
+        Build a pack from a column of a CSV file with a header. Empty values are skipped.
+
+        :param csv_path: The path of the CSV file
+        :param column: The name of the column containing the strings
+        :param path: The path where the pack will be saved
+        :param delimiter: The delimiter of the CSV file
+        :param encoding: The encoding of the CSV file
+        :param sql_equivalent: The SQL type of the strings
+        :type csv_path: str
+        :type column: str
+        :type path: str
+        :type delimiter: str
+        :type encoding: str
+        :type sql_equivalent: str
+        :returns: :class:`Vocabulary`
+        :raises: ValueError
+        """
+        with open(csv_path, newline='', encoding=encoding) as f:
+            reader = csv.reader(f, delimiter=delimiter)
+            header = next(reader, [])
+            if column not in header:
+                raise ValueError('{} has no column {}'.format(csv_path, column))
+            i = header.index(column)
+
+            return cls._write((row[i] for row in reader if len(row) > i and row[i]), path, sql_equivalent)
+
+    def __len__(self):
+        """
+        Counts the number of strings
+
+        :returns: The number of strings
+        """
+        return self._length
+
+    def __getitem__(self, index):
+        """
+        Get a string
+
+        :param index: The position of the string
+        :type index: int
+        :returns: str containing the string
+        """
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError('Vocabulary index out of range')
+
+        return str(self._data[self._offsets[index]:self._offsets[index + 1]], 'utf-8')
+
+    def generate_raw(self, dataset=None, localization=None):
+        """
+        Chooses a string at random
+
+        Implementation of the generate_raw() method from BaseGenerator.
+
+        :param dataset: The dataset from which all referenced fields will be retrieved. It will be ignored
+        :type dataset: :class:`dammy.db.DatasetGenerator` or dict
+        :returns: A string of the vocabulary, chosen at random
+        :raises: IndexError
+        """
+        if self._length == 0:
+            raise IndexError('The vocabulary {} is empty'.format(self.path))
+
+        return self._generate(self[_random_source.rng.randrange(self._length)])
+
+    def generate_batch(self, n, dataset=None, localization=None):
+        """
+        Chooses n strings at random
+
+        :param n: The number of values to generate
+        :param dataset: The dataset from which all referenced fields will be retrieved. It will be ignored
+        :type n: int
+        :type dataset: :class:`dammy.db.DatasetGenerator` or dict
+        :returns: list containing the chosen strings
+        :raises: IndexError
+        """
+        if n > 0 and self._length == 0:
+            raise IndexError('The vocabulary {} is empty'.format(self.path))
+
+        offsets = self._offsets
+        data = self._data
+        randrange = _random_source.rng.randrange
+        length = self._length
+
+        values = []
+        for _ in range(n):
+            i = randrange(length)
+            values.append(str(data[offsets[i]:offsets[i + 1]], 'utf-8'))
+
+        if n > 0:
+            self._generate(values[-1])
+
+        return values
+
+    def _cardinality(self):
+        """
+        Get the number of strings of the vocabulary
+
+        :returns: The number of strings, assuming they are all different
+        """
+        return self._length
+
+    def _fingerprint(self):
+        """
+        Describe the content of the pack file
+
+        :returns: str containing the description
+        """
+        return _file_fingerprint(self.path)
+
+    def close(self):
+        """
+        Unmap and close the pack file. No string can be chosen afterwards
+        """
+        self._offsets.release()
+        self._data.release()
+        self._map.close()
+        self._file.close()
\ No newline at end of file
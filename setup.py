@@ -1,4 +1,4 @@
-from setuptools import setup
+from setuptools import setup, find_packages
 
 with open('README.md') as readme_file:
     README = readme_file.read()
@@ -10,9 +10,11 @@ setup_args = dict(
     long_description_content_type="text/markdown",
     long_description=README,
     license='GPL-3.0',
-    packages=['dammy'],
-    package_dir={'dammy': 'dammy'},
+    packages=find_packages(include=['dammy', 'dammy.*']),
     package_data={'dammy': ['data/*.json']},
+    entry_points={
+        'console_scripts': ['dammy = dammy.cli:main']
+    },
     author='Ibon',
     author_email='ibonescartin@gmail.com',
     keywords=['dummy-data', 'fake', 'mock', 'database', 'sql', 'dummy', 'test', 'data', 'population'],
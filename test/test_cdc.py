@@ -0,0 +1,99 @@
+import pytest
+
+# Libraries used to perform the tests
+import json
+import sqlite3
+
+# Import everything we need to test
+import dammy
+from dammy.db import *
+from dammy.stdlib import RandomInteger
+
+class Customer(dammy.EntityGenerator):
+    key = PrimaryKey(customer_id=AutoIncrement())
+    score = RandomInteger(0, 100)
+
+class Purchase(dammy.EntityGenerator):
+    key = PrimaryKey(purchase_id=AutoIncrement())
+    customer = ForeignKey(Customer, 'key')
+    amount = RandomInteger(1, 500)
+
+def _check_integrity(stream):
+    customers = set(row['customer_id'] for row in stream._rows['Customer'])
+    assert all(row['customer_id'] in customers for row in stream._rows['Purchase'])
+
+def test_changes_restrict():
+    dataset = DatasetGenerator((Customer, 20), (Purchase, 100)).generate()
+    stream = dataset.changes(mix={'insert': 1, 'update': 1, 'delete': 1}, update_columns={'Purchase': ['customer', 'amount']})
+
+    changes = list(stream.generate(2000))
+    assert len(changes) == 2000
+    assert set(c['op'] for c in changes) == {'insert', 'update', 'delete'}
+    _check_integrity(stream)
+
+    for c in changes:
+        if c['op'] == 'update':
+            assert set(c['columns']) <= {'customer_id', 'amount', 'score'}
+            assert c['before']['purchase_id' if c['table'] == 'Purchase' else 'customer_id'] == list(c['key'].values())[0]
+
+def test_changes_cascade():
+    dataset = DatasetGenerator((Customer, 20), (Purchase, 100)).generate()
+    stream = dataset.changes(mix={'delete': 1}, weights={'Customer': 1}, on_delete='cascade')
+
+    changes = list(stream.generate(5))
+    assert len(stream._rows['Customer']) == 15
+    assert [c['table'] for c in changes].count('Customer') == 5
+    _check_integrity(stream)
+
+    with pytest.raises(ValueError):
+        dataset.changes(update_columns={'Purchase': ['key']})
+
+def test_changes_output(tmp_path):
+    dataset = DatasetGenerator((Customer, 20), (Purchase, 100)).generate()
+
+    stream = dataset.changes()
+    stream.export(str(tmp_path / 'changes.jsonl'), 50, 'jsonl')
+    with open(str(tmp_path / 'changes.jsonl')) as f:
+        assert all(json.loads(line)['op'] in ('insert', 'update', 'delete') for line in f)
+
+    stream.export(str(tmp_path / 'changes.sql'), 50)
+    with open(str(tmp_path / 'changes.sql')) as f:
+        assert all(line.split()[0] in ('INSERT', 'UPDATE', 'DELETE') for line in f)
+
+    connection = sqlite3.connect(':memory:')
+    stream = dataset.changes(on_delete='cascade')
+    connection.executescript(dataset.to_sql())
+    stream.apply(connection, 500, batch_size=100)
+
+    assert connection.execute('SELECT COUNT(*) FROM Customer').fetchone()[0] == len(stream._rows['Customer'])
+    assert connection.execute('SELECT COUNT(*) FROM Purchase').fetchone()[0] == len(stream._rows['Purchase'])
+
+def test_changes_foreign_key_columns():
+    class Account(dammy.EntityGenerator):
+        key = PrimaryKey(id=AutoIncrement())
+
+    class Transfer(dammy.EntityGenerator):
+        key = PrimaryKey(id=AutoIncrement())
+        sender = ForeignKey(Account, 'key')
+        receiver = ForeignKey(Account, 'key')
+
+    dataset = DatasetGenerator((Account, 50), (Transfer, 100)).generate()
+    connection = sqlite3.connect(':memory:')
+    connection.executescript(dataset.to_sql())
+    stream = dataset.changes(mix={'insert': 1, 'update': 1, 'delete': 1}, on_delete='cascade')
+    stream.apply(connection, 200, batch_size=50)
+
+    accounts = set(row['id'] for row in stream._rows['Account'])
+    assert all(row['sender_id'] in accounts and row['receiver_id'] in accounts for row in stream._rows['Transfer'])
+    assert sorted(connection.execute('SELECT id, sender_id, receiver_id FROM Transfer').fetchall()) == sorted(
+        (row['id'], row['sender_id'], row['receiver_id']) for row in stream._rows['Transfer']
+    )
+
+def test_changes_cascade_keep_referenced():
+    # Deletes never empty a referenced table, so inserts and updates can still reference its rows
+    for counts, mix in (((50, 100), {'insert': 0.2, 'update': 0.4, 'delete': 0.4}), ((5, 10), {'delete': 1})):
+        dataset = DatasetGenerator((Customer, counts[0]), (Purchase, counts[1])).generate()
+        stream = dataset.changes(mix=mix, update_columns={'Purchase': ['customer', 'amount']}, on_delete='cascade')
+        assert len(list(stream.generate(5000))) >= 5000
+        assert len(stream._rows['Customer']) >= 1
+        _check_integrity(stream)
@@ -0,0 +1,108 @@
+import pytest
+
+# Libraries used to perform the tests
+import json
+import os
+
+# Import everything we need to test
+from dammy.cli import main
+from dammy.stdlib import Vocabulary
+
+ENTITIES = '''
+from dammy import EntityGenerator
+from dammy.db import AutoIncrement, PrimaryKey, ForeignKey
+from dammy.stdlib import RandomInteger
+
+class Parent(EntityGenerator):
+    key = PrimaryKey(parent_id=AutoIncrement())
+    value = RandomInteger(0, 1000)
+
+class Child(EntityGenerator):
+    key = PrimaryKey(child_id=AutoIncrement())
+    parent = ForeignKey(Parent, 'key')
+'''
+
+UNIQUE_ENTITIES = '''
+from dammy import EntityGenerator
+from dammy.db import Unique
+from dammy.stdlib import RandomInteger
+
+class Parent(EntityGenerator):
+    value = Unique(number=RandomInteger(0, 3))
+
+class Child(EntityGenerator):
+    value = RandomInteger(0, 1000)
+'''
+
+def _generate(tmp_path, output, *args, entities=ENTITIES):
+    module = tmp_path / 'entities.py'
+    module.write_text(entities)
+    directory = str(tmp_path / output)
+    assert main(['generate', str(module), '-r', 'Parent=10', '-r', 'Child=25', '-o', directory, '-b', '10', '-s', '7', '-q'] + list(args)) == 0
+    with open(os.path.join(directory, 'manifest.json')) as f:
+        return directory, json.load(f)
+
+def _read_shards(directory, manifest):
+    return dict((t, [open(os.path.join(directory, s['path'])).read() for s in table['shards']]) for t, table in manifest['tables'].items())
+
+def test_generate(tmp_path):
+    directory, manifest = _generate(tmp_path, 'out')
+    assert list(manifest['tables']) == ['Parent', 'Child']
+    assert manifest['tables']['Child']['rows'] == 25
+    assert [s['rows'] for s in manifest['tables']['Child']['shards']] == [10, 10, 5]
+
+def test_generate_workers(tmp_path):
+    first, parallel = _generate(tmp_path, 'parallel', '-w', '2')
+    second, _ = _generate(tmp_path, 'parallel_again', '-w', '3')
+    assert [s['rows'] for s in parallel['tables']['Child']['shards']] == [10, 10, 5]
+    assert _read_shards(first, parallel) == _read_shards(second, parallel)
+
+    rows = ''.join(s.split('\n', 1)[1] for s in _read_shards(first, parallel)['Child']).splitlines()
+    assert [int(r.split(',')[0]) for r in rows] == list(range(1, 26))
+    assert all(1 <= int(r.split(',')[1]) <= 10 for r in rows)
+
+def test_generate_unknown_entity(tmp_path):
+    with pytest.raises(SystemExit):
+        _generate(tmp_path, 'out', '-r', 'Unknown=1')
+
+def test_generate_dammy_exception(tmp_path, capsys):
+    # Parent cannot have 10 different values
+    with pytest.raises(SystemExit):
+        _generate(tmp_path, 'out', entities=UNIQUE_ENTITIES)
+    assert 'Traceback' not in capsys.readouterr().err
+
+def test_generate_workers_unique(tmp_path, capsys):
+    with pytest.raises(SystemExit):
+        _generate(tmp_path, 'parallel', '-w', '2', entities=UNIQUE_ENTITIES)
+    assert 'Parent.value' in capsys.readouterr().err
+    assert not os.path.exists(str(tmp_path / 'parallel'))
+
+def test_pack(tmp_path):
+    text = tmp_path / 'streets.txt'
+    text.write_text('Gran Vía\n\n  Calle de Alcalá \nPaseo del Prado\n', encoding='utf-8')
+    output = str(tmp_path / 'streets.pack')
+    assert main(['pack', str(text), output, '-q']) == 0
+
+    streets = Vocabulary(output)
+    assert len(streets) == 3
+    assert list(streets[i] for i in range(3)) == ['Gran Vía', 'Calle de Alcalá', 'Paseo del Prado']
+    assert streets[-1] == 'Paseo del Prado'
+    assert streets._sql_equivalent == 'VARCHAR(15)'
+    assert set(streets.generate_batch(50)) <= set(['Gran Vía', 'Calle de Alcalá', 'Paseo del Prado'])
+    assert streets.generate() in ['Gran Vía', 'Calle de Alcalá', 'Paseo del Prado']
+    with pytest.raises(IndexError):
+        streets[3]
+    streets.close()
+
+    table = tmp_path / 'products.csv'
+    table.write_text('id;name\n1;Chair\n2;\n3;Table\n', encoding='utf-8')
+    output = str(tmp_path / 'products.pack')
+    assert main(['pack', str(table), output, '--column', 'name', '--delimiter', ';', '-q']) == 0
+    products = Vocabulary(output)
+    assert [products[0], products[1]] == ['Chair', 'Table'] and len(products) == 2
+    products.close()
+
+    with pytest.raises(SystemExit):
+        main(['pack', str(table), output, '--column', 'price', '-q'])
+    with pytest.raises(ValueError):
+        Vocabulary(str(table))
@@ -1,6 +1,7 @@
 import pytest
 
 # Libraries used to perform the tests
+import os
 import random
 
 # Import everything we need to test
@@ -29,4 +30,656 @@ def test_unique():
 
     with pytest.raises(dammy.exceptions.MaximumRetriesExceededException):
         for _ in range(0, 50):
-            print(x)            # Exception after generating 10 values
\ No newline at end of file
+            print(x)            # Exception after generating 10 values
+
+def _checkpointed_dataset(fail_at=None):
+    generated = []
+
+    def fail(x):
+        generated.append(x)
+        if len(generated) == fail_at:
+            raise RuntimeError('Simulated crash')
+        return x
+
+    class Parent(dammy.EntityGenerator):
+        key = PrimaryKey(id=AutoIncrement())
+        value = Unique(number=RandomInteger(0, 1000000))
+
+    class Child(dammy.EntityGenerator):
+        key = PrimaryKey(id=AutoIncrement())
+        parent = ForeignKey(Parent, 'key')
+        value = dammy.functions.call_function(RandomInteger(0, 100), fail)
+
+    return DatasetGenerator((Child, 50), (Parent, 10))
+
+def test_export_resume(tmp_path):
+    from dammy.checkpoint import Checkpoint
+
+    dammy.seed(42)
+    _checkpointed_dataset().export(str(tmp_path / 'expected.sql'))
+
+    checkpoint = Checkpoint(str(tmp_path / 'run.ckpt'))
+    dammy.seed(42)
+    with pytest.raises(RuntimeError):
+        _checkpointed_dataset(fail_at=37).export(str(tmp_path / 'run.sql'), checkpoint=checkpoint, checkpoint_every=5)
+    assert checkpoint.exists()
+
+    random.seed(0)      # The random state must be restored from the checkpoint
+    dataset = _checkpointed_dataset()
+    dataset.export(str(tmp_path / 'run.sql'), checkpoint=checkpoint, checkpoint_every=5, resume=True)
+
+    assert not checkpoint.exists()
+    assert (tmp_path / 'run.sql').read_text() == (tmp_path / 'expected.sql').read_text()
+    assert len(dataset['Child']) == 50
+
+def test_checkpoint_journal(tmp_path):
+    from dammy.checkpoint import Checkpoint
+
+    class Parent(dammy.EntityGenerator):
+        key = PrimaryKey(parent_id=AutoIncrement())
+        value = Unique(number=RandomInteger(0, 10 ** 9))
+
+    class Child(dammy.EntityGenerator):
+        key = PrimaryKey(child_id=AutoIncrement())
+        parent = ForeignKey(Parent, 'key', fan_out=2)
+
+    sizes = []
+
+    class MeasuredCheckpoint(Checkpoint):
+        def save(self, state):
+            super(MeasuredCheckpoint, self).save(state)
+            sizes.append((os.path.getsize(self.path), os.path.getsize(self.journal_path)))
+
+    checkpoint = MeasuredCheckpoint(str(tmp_path / 'run.ckpt'))
+    DatasetGenerator((Parent, 1000), (Child, 2000)).export(str(tmp_path / 'run.sql'), checkpoint=checkpoint, checkpoint_every=100)
+
+    # The rows and the unique values are appended to the journal, so the checkpoints do not grow
+    assert len(sizes) == 30
+    assert max(s for s, _ in sizes) - min(s for s, _ in sizes) < 200
+    assert all(a[1] < b[1] for a, b in zip(sizes, sizes[1:]))
+
+    # Records appended after the last save are discarded when loading
+    checkpoint = Checkpoint(str(tmp_path / 'journal.ckpt'))
+    checkpoint.append(('a',), 1)
+    checkpoint.save({'n': 1})
+    checkpoint.append(('a',), 2)
+    checkpoint.close()
+    assert checkpoint.load() == {'n': 1}
+    assert checkpoint.records() == {('a',): [1]}
+    checkpoint.remove()
+    assert not os.path.exists(checkpoint.journal_path)
+
+def test_export_partitioned(tmp_path):
+    import gzip
+    import hashlib
+
+    manifest = _checkpointed_dataset().export_partitioned(str(tmp_path), 'csv', rows_per_shard=20, compression='gzip')
+
+    assert list(manifest['tables'].keys()) == ['Parent', 'Child']
+    assert [s['rows'] for s in manifest['tables']['Child']['shards']] == [20, 20, 10]
+    assert manifest['tables']['Parent']['rows'] == 10
+
+    for shard in manifest['tables']['Child']['shards']:
+        content = (tmp_path / shard['path']).read_bytes()
+        assert hashlib.sha256(content).hexdigest() == shard['sha256']
+        lines = gzip.decompress(content).decode('utf-8').splitlines()
+        assert lines[0] == 'id,parent_id,value'
+        assert len(lines) == shard['rows'] + 1
+        assert all(len(line.split(',')) == 3 for line in lines)
+
+def test_foreign_key_columns():
+    import sqlite3
+
+    class Account(dammy.EntityGenerator):
+        key = PrimaryKey(id=AutoIncrement())
+
+    class Transfer(dammy.EntityGenerator):
+        key = PrimaryKey(id=AutoIncrement())
+        sender = ForeignKey(Account, 'key')
+        receiver = ForeignKey(Account, 'key')
+        amount = RandomInteger(1, 100)
+
+    # Referenced fields colliding with other columns are named as in SQL
+    dataset = DatasetGenerator((Account, 10), (Transfer, 30)).generate()
+    assert list(dataset['Transfer'][0].keys()) == ['id', 'sender_id', 'receiver_id', 'amount']
+    assert [r['id'] for r in dataset['Transfer']] == list(range(1, 31))
+    assert dataset._get_sql_tables()[1]['Transfer']['columns'] == Transfer()._get_column_names()
+
+    connection = sqlite3.connect(':memory:')
+    connection.executescript(dataset.to_sql())
+    assert connection.execute('SELECT COUNT(*) FROM Transfer WHERE sender_id BETWEEN 1 AND 10').fetchone()[0] == 30
+
+    account = dataset['Account'][3]
+    assert dataset.children('Account', account, 'Transfer', 'receiver') == [r for r in dataset['Transfer'] if r['receiver_id'] == 4]
+
+def test_table_order():
+    class C(dammy.EntityGenerator):
+        key = PrimaryKey(c_id=AutoIncrement())
+
+    class B(dammy.EntityGenerator):
+        key = PrimaryKey(b_id=AutoIncrement())
+        ref_to_C = ForeignKey(C, 'key')
+
+    class A(dammy.EntityGenerator):
+        ref_to_B = ForeignKey(B, 'key')
+
+    dataset = DatasetGenerator((A, 10), (B, 5), (C, 3))
+    assert dataset._get_table_order() == ['C', 'B', 'A']
+
+    dataset.generate()
+    assert [len(dataset[t]) for t in ('A', 'B', 'C')] == [10, 5, 3]
+
+def test_circular_reference():
+    class A(dammy.EntityGenerator):
+        key = PrimaryKey(a_id=AutoIncrement())
+
+    class B(dammy.EntityGenerator):
+        key = PrimaryKey(b_id=AutoIncrement())
+        ref_to_A = ForeignKey(A, 'key')
+
+    A.ref_to_B = ForeignKey(B, 'key')
+
+    with pytest.raises(dammy.exceptions.CircularReferenceException):
+        DatasetGenerator((A, 10), (B, 10)).generate()
+
+def test_export_memory_limit(tmp_path):
+    from dammy.core import KeyColumns, SpilledSet
+
+    dammy.seed(7)
+    _checkpointed_dataset().export(str(tmp_path / 'expected.sql'))
+
+    dammy.seed(7)
+    dataset = _checkpointed_dataset().export(str(tmp_path / 'spilled.sql'), memory_limit=0)
+
+    assert (tmp_path / 'spilled.sql').read_text() == (tmp_path / 'expected.sql').read_text()
+    assert isinstance(dataset['Parent'], KeyColumns)
+    assert dataset['Parent'].fields == ['id']
+    assert list(dataset['Parent'])[:3] == [{'id': 1}, {'id': 2}, {'id': 3}]
+    assert dataset['Child'].fields == []
+    assert len(dataset['Child']) == 50
+
+    # The values of unique fields are moved to disk
+    generated = dataset._name_class_map['Parent'].value.generated
+    assert isinstance(generated, SpilledSet) and len(generated) == 10
+    assert all(0 <= number <= 1000000 for number, in generated)
+
+    spilled = SpilledSet([(1,), (2,)])
+    spilled.add((2,))
+    for i in range(3, SpilledSet.BATCH_SIZE + 10):
+        spilled.add((i,))
+    assert len(spilled) == SpilledSet.BATCH_SIZE + 9
+    assert (1,) in spilled and (SpilledSet.BATCH_SIZE + 9,) in spilled and (0,) not in spilled
+
+def test_memory_check_interval(monkeypatch):
+    import dammy.core
+    from dammy.sinks import MemorySink
+
+    # The memory is checked before each table and on a count of rows running across tables
+    checks = []
+    monkeypatch.setattr(dammy.core, 'MEMORY_CHECK_INTERVAL', 7)
+    monkeypatch.setattr(dammy.core, '_get_memory_usage', lambda: checks.append(1) or 0)
+    _checkpointed_dataset().export(MemorySink(), memory_limit=10 ** 12)
+    assert len(checks) == 2 + 60 // 7
+
+def test_generate_range():
+    dataset = _checkpointed_dataset()
+
+    state = random.getstate()
+    rows = dataset.generate_range('Child', 0, 50, seed=3)
+    assert random.getstate() == state
+
+    assert rows[20:30] == dataset.generate_range('Child', 20, 30, seed=3)
+    assert rows[17] == dataset._name_class_map['Child']().generate_at(17, 3, dataset)
+    assert rows != dataset.generate_range('Child', 0, 50, seed=4)
+    assert [r['id'] for r in rows] == list(range(1, 51))
+    assert all(1 <= r['parent_id'] <= 10 for r in rows)
+
+    Parent = dataset._name_class_map['Parent']
+
+    class Other(dammy.EntityGenerator):
+        ref = ForeignKey(Parent, 'value')
+
+    dataset = DatasetGenerator((Other, 20), (Parent, 10))
+    numbers = [r['number'] for r in dataset.generate_range('Parent', 0, 10, seed=3)]
+    assert all(r['number'] in numbers for r in dataset.generate_range('Other', 0, 20, seed=3))
+
+    # Values are drawn from a generator of their own, so the random module is not used while generating by index
+    states = []
+
+    class Dice(dammy.BaseGenerator):
+        def __init__(self):
+            super(Dice, self).__init__('INTEGER')
+
+        def generate_raw(self, dataset=None, localization=None):
+            states.append(random.getstate())
+            return self._generate(dammy.get_random().randint(1, 6))
+
+    class Roll(dammy.EntityGenerator):
+        first = Dice()
+        second = Dice()
+
+    state = random.getstate()
+    rolls = Roll().generate_range(0, 100, seed=5)
+    assert all(s == state for s in states)
+    assert rolls == Roll().generate_range(0, 100, seed=5)
+    assert rolls[40:60] == Roll().generate_range(40, 60, seed=5)
+    assert dammy.get_random() is random
+
+def test_export_resume_compressed(tmp_path):
+    import gzip
+    from dammy.checkpoint import Checkpoint
+
+    dammy.seed(42)
+    _checkpointed_dataset().export(str(tmp_path / 'expected.sql.gz'), compression='gzip')
+
+    checkpoint = Checkpoint(str(tmp_path / 'run.ckpt'))
+    dammy.seed(42)
+    with pytest.raises(RuntimeError):
+        _checkpointed_dataset(fail_at=37).export(str(tmp_path / 'run.sql.gz'), checkpoint=checkpoint, checkpoint_every=5, compression='gzip')
+
+    _checkpointed_dataset().export(str(tmp_path / 'run.sql.gz'), checkpoint=checkpoint, checkpoint_every=5, resume=True, compression='gzip')
+
+    expected = gzip.decompress((tmp_path / 'expected.sql.gz').read_bytes())
+    assert gzip.decompress((tmp_path / 'run.sql.gz').read_bytes()) == expected
+
+def test_skewed_foreign_key():
+    import collections
+
+    class Parent(dammy.EntityGenerator):
+        key = PrimaryKey(parent_id=AutoIncrement())
+
+    class Hot(dammy.EntityGenerator):
+        key = PrimaryKey(hot_id=AutoIncrement())
+        parent = ForeignKey(Parent, 'key', zipf=1.2)
+
+    class Weighted(dammy.EntityGenerator):
+        key = PrimaryKey(weighted_id=AutoIncrement())
+        parent = ForeignKey(Parent, 'key', weights=[0, 1] + [0] * 8)
+
+    dammy.seed(1)
+    dataset = DatasetGenerator((Hot, 2000), (Weighted, 10), (Parent, 10)).generate()
+    counts = collections.Counter(r['parent_id'] for r in dataset['Hot'])
+    assert counts[1] > counts[2] > counts[5] > counts[10] > 0
+    assert all(r['parent_id'] == 2 for r in dataset['Weighted'])
+
+    with pytest.raises(ValueError):
+        ForeignKey(Parent, 'key', zipf=1.0, fan_out=2)
+
+def test_fan_out_foreign_key():
+    import collections
+
+    class Parent(dammy.EntityGenerator):
+        key = PrimaryKey(parent_id=AutoIncrement())
+
+    class Child(dammy.EntityGenerator):
+        key = PrimaryKey(child_id=AutoIncrement())
+        parent = ForeignKey(Parent, 'key', fan_out=3)
+
+    dataset = DatasetGenerator((Child, 30), (Parent, 10))
+    for rows in (dataset.generate()['Child'], dataset.generate()['Child'], dataset.generate_range('Child', 0, 30, seed=5)):
+        assert sorted(collections.Counter(r['parent_id'] for r in rows).values()) == [3] * 10
+
+    with pytest.raises(dammy.exceptions.IntegrityException):
+        DatasetGenerator((Child, 31), (Parent, 10)).generate()
+
+def test_metrics(tmp_path):
+    from dammy.metrics import Metrics
+    from dammy.sinks import MemorySink
+
+    reports = []
+    prometheus_file = str(tmp_path / 'dammy.prom')
+    metrics = Metrics(reports.append, interval=0, prometheus_file=prometheus_file)
+
+    dammy.seed(9)
+    sink = MemorySink()
+    _checkpointed_dataset().export(sink, metrics=metrics)
+
+    assert len(reports) == 61
+    assert reports[0]['rows'] == {'Child': 0, 'Parent': 1}
+    last = reports[-1]
+    assert last['rows'] == last['total_rows'] == {'Child': 50, 'Parent': 10}
+    assert last['progress'] == 1.0
+    assert last['bytes_written'] == {'output': len(sink.getvalue())}
+    assert last['foreign_keys'] == {'Child.parent': 50}
+    assert last['unique']['Parent.value']['generated'] == 10
+    assert last['memory'] > 0
+
+    with open(prometheus_file) as f:
+        text = f.read()
+    assert 'dammy_rows_generated_total{table="Child"} 50' in text
+    assert 'dammy_foreign_key_resolutions_total{field="Child.parent"} 50' in text
+
+def test_row_context():
+    from dammy.functions import call_function
+    from dammy.stdlib import RandomString
+
+    calls = []
+
+    def track(x):
+        calls.append(x)
+        return x
+
+    class Entity(dammy.EntityGenerator):
+        key = PrimaryKey(entity_id=AutoIncrement())
+        tracked = call_function(RandomInteger(0, 1000), track)
+        total = tracked + tracked * 2
+        text = RandomString(8)
+        upper = text.upper()
+        length = call_function(text, len)
+        double_id = key.fields['entity_id'] * 2
+
+    rows = [Entity().generate() for _ in range(20)]
+    assert len(calls) == 20
+    for row in rows:
+        assert row['total'] == row['tracked'] * 3
+        assert row['upper'] == row['text'].upper()
+        assert row['length'] == 8
+        assert row['double_id'] == row['entity_id'] * 2
+
+def test_generation_session():
+    import threading
+
+    class Session(dammy.EntityGenerator):
+        key = PrimaryKey(session_id=AutoIncrement())
+        value = Unique(value=RandomInteger(1, 5))
+
+    # Each session starts from the initial state of every generator
+    for _ in range(2):
+        with dammy.GenerationSession():
+            rows = [Session().generate() for _ in range(5)]
+        assert [row['session_id'] for row in rows] == [1, 2, 3, 4, 5]
+        assert sorted(row['value'] for row in rows) == [1, 2, 3, 4, 5]
+
+    # Every run of a dataset starts again, so unique values are not exhausted
+    dataset = DatasetGenerator((Session, 5))
+    dataset.generate()
+    assert [row['session_id'] for row in dataset.generate()['Session']] == [1, 2, 3, 4, 5]
+
+    # Threads generating the same dataset in their own sessions do not share their state
+    def generate():
+        with dammy.GenerationSession():
+            results.append(list(dataset.generate()['Session']))
+
+    results = []
+    threads = [threading.Thread(target=generate) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(results) == 4
+    for rows in results:
+        assert [row['session_id'] for row in rows] == [1, 2, 3, 4, 5]
+        assert sorted(row['value'] for row in rows) == [1, 2, 3, 4, 5]
+
+def test_default_session_across_threads():
+    import threading
+
+    class Shared(dammy.EntityGenerator):
+        key = PrimaryKey(shared_id=AutoIncrement())
+
+    # The default session is shared by every thread, so the data is read and the sequence continued from another thread
+    dataset = DatasetGenerator((Shared, 5))
+    dataset.generate()
+    entity = Shared()
+    entity.generate()
+
+    seen = []
+    def other():
+        seen.append(len(dataset['Shared']))
+        seen.append(entity.generate()['shared_id'])
+
+    thread = threading.Thread(target=other)
+    thread.start()
+    thread.join()
+
+    assert seen == [5, 7]
+    assert entity.generate()['shared_id'] == 8
+
+    # A session entered on a thread is not active on the others
+    with dammy.GenerationSession():
+        thread = threading.Thread(target=other)
+        thread.start()
+        thread.join()
+        assert dataset.data == {}
+
+    assert seen[2:] == [5, 9]
+
+def test_default_session_concurrent():
+    import itertools
+    import threading
+    import time
+
+    codes = itertools.count()
+    active = []
+    overlaps = []
+
+    class Probe(dammy.BaseGenerator):
+        def __init__(self):
+            super(Probe, self).__init__('INTEGER')
+
+        def generate_raw(self, dataset=None, localization=None):
+            active.append(1)
+            overlaps.append(len(active))
+            time.sleep(0.0001)
+            active.pop()
+            return self._generate(next(codes))
+
+    class Ticket(dammy.EntityGenerator):
+        key = PrimaryKey(ticket_id=AutoIncrement())
+        code = Unique(code=Probe())
+
+    # Threads generating without their own session take turns on the default one
+    def generate():
+        rows.extend(Ticket().generate() for _ in range(200))
+
+    rows = []
+    threads = [threading.Thread(target=generate) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert max(overlaps) == 1
+    assert sorted(row['ticket_id'] for row in rows) == list(range(1, 401))
+    assert len(set(row['code'] for row in rows)) == 400
+
+def test_key_index(tmp_path):
+    import sqlite3
+
+    with open(str(tmp_path / 'customers.csv'), 'w') as f:
+        f.write('id,name\n')
+        for i in range(100):
+            f.write('{},customer{}\n'.format(i * 7, i))
+
+    customers = KeyIndex.from_csv(str(tmp_path / 'customers.csv'), 'id', str(tmp_path / 'customers.idx'), 'Customer')
+    names = KeyIndex.from_csv(str(tmp_path / 'customers.csv'), 'name', str(tmp_path / 'names.idx'), 'Customer', key_type='str')
+    assert len(customers) == 100
+    assert customers[3] == 21 and customers[-1] == 693
+    assert names.width == 10 and names[5] == 'customer5'
+
+    # Raw files of keys are used directly
+    opened = KeyIndex(str(tmp_path / 'customers.idx'), 'Customer', 'id')
+    assert [opened[i] for i in range(len(opened))] == [i * 7 for i in range(100)]
+    opened.close()
+
+    connection = sqlite3.connect(str(tmp_path / 'shop.db'))
+    connection.execute('CREATE TABLE product (code TEXT)')
+    connection.executemany('INSERT INTO product VALUES (?)', [('P{}'.format(i),) for i in range(50)])
+    connection.commit()
+    connection.close()
+    products = KeyIndex.from_sqlite(str(tmp_path / 'shop.db'), 'product', 'code', str(tmp_path / 'products.idx'), key_type='str')
+    assert products.table == 'product' and products.field == 'code' and len(products) == 50
+
+    with pytest.raises(dammy.exceptions.InvalidReferenceException):
+        ForeignKey(customers, 'name')
+
+    class Sale(dammy.EntityGenerator):
+        key = PrimaryKey(sale_id=AutoIncrement())
+        customer = ForeignKey(customers, zipf=1.2)
+        product = ForeignKey(products, 'code')
+
+    class Refund(dammy.EntityGenerator):
+        sale = ForeignKey(Sale, 'key')
+        customer = ForeignKey(customers, fan_out=1)
+
+    # Only references to an index can omit the referenced field
+    with pytest.raises(dammy.exceptions.InvalidReferenceException):
+        ForeignKey(Sale)
+
+    # External tables are not part of the dataset
+    data = DatasetGenerator((Sale, 200), (Refund, 100)).generate()
+    customer_ids = set(i * 7 for i in range(100))
+    for row in data['Sale']:
+        assert row['id'] in customer_ids
+        assert row['code'] in set('P{}'.format(i) for i in range(50))
+    assert sorted(row['id'] for row in data['Refund']) == sorted(customer_ids)
+
+    with pytest.raises(dammy.exceptions.IntegrityException):
+        Refund.customer.generate()
+
+    # Rows generated by index choose the same keys every time
+    dataset = DatasetGenerator((Sale, 200), (Refund, 100))
+    assert list(dataset.generate_range('Sale', 0, 50, seed=3)) == list(dataset.generate_range('Sale', 0, 50, seed=3))
+    assert 'REFERENCES Customer(id)' in dataset._sql_create_tables()
+
+def test_estimate():
+
+    class Person(dammy.EntityGenerator):
+        key = PrimaryKey(person_id=AutoIncrement())
+        age = RandomInteger(18, 90)
+        code = Unique(code=RandomInteger(1, 50))
+
+    class Car(dammy.EntityGenerator):
+        owner = ForeignKey(Person, 'key')
+        doors = 4
+
+    dataset = DatasetGenerator((Person, 100000), (Car, 200000))
+    random_state = random.getstate()
+    estimate = dataset.estimate(sample_size=40, output_format='csv')
+    assert random.getstate() == random_state
+
+    assert estimate.tables['Person']['sample_rows'] == 40 and estimate.tables['Car']['rows'] == 200000
+    assert estimate.seconds == float('inf')
+    assert estimate.output_bytes > 200000 * len('1,4\n')
+    assert estimate.memory_bytes > 0
+
+    strategies = dict((c['name'], c['strategy']) for c in estimate.tables['Car']['columns'])
+    assert strategies['doors'] == 'constant' and strategies['owner'].startswith('foreign key to Person')
+    assert any('Person.code can only take 50 different values' in w for w in estimate.warnings)
+    assert any('Person has no parallel path' in w for w in estimate.warnings)
+    assert 'Car (200000 rows, 40 sampled)' in estimate.explain()
+
+    # Generating the sample does not change the dataset
+    assert len(DatasetGenerator((Person, 30), (Car, 5)).generate()['Person']) == 30
+
+    # Values which never repeat are neither kept nor retried, even if every possible value is used
+    from dammy.stdlib import Ascending
+
+    class Event(dammy.EntityGenerator):
+        key = PrimaryKey(event_id=Ascending(RandomInteger(1, 1000), 1000, unique=True))
+
+    estimate = DatasetGenerator((Event, 1000)).estimate(sample_size=40)
+    assert not any('Event.event_id' in w for w in estimate.warnings)
+    assert estimate.seconds < float('inf')
+    assert estimate.tables['Event']['columns'][0]['strategy'] == 'primary key (unique by construction)'
+
+def test_indexes():
+
+    class Person(dammy.EntityGenerator):
+        key = PrimaryKey(person_id=AutoIncrement())
+        code = Unique(code=RandomInteger(1, 1000))
+
+    class Car(dammy.EntityGenerator):
+        key = PrimaryKey(car_id=AutoIncrement())
+        owner = ForeignKey(Person, 'key')
+
+    dataset = DatasetGenerator((Person, 50), (Car, 200))
+    dataset.generate()
+
+    person = dataset.get('Person', person_id=17)
+    assert person is dataset['Person'][16]
+    assert dataset.get('Person', code=person['code']) is person
+    assert dataset.get('Person', person_id=51) is None
+    with pytest.raises(ValueError):
+        dataset.get('Person', age=3)
+
+    cars = dataset.children('Person', person, 'Car')
+    assert cars == [car for car in dataset['Car'] if car['person_id'] == 17]
+    assert sum(len(dataset.children('Person', p, 'Car', 'owner')) for p in dataset['Person']) == 200
+
+    # Indexes are discarded when the dataset is generated again
+    dataset.generate()
+    assert dataset.get('Person', person_id=17) is dataset['Person'][16]
+    assert dataset.children('Person', {'person_id': 17}, 'Car') == [car for car in dataset['Car'] if car['person_id'] == 17]
+
+def test_amplify(tmp_path):
+    import json
+
+    from dammy.stdlib import RandomName
+
+    class Customer(dammy.EntityGenerator):
+        key = PrimaryKey(customer_id=AutoIncrement())
+        name = RandomName()
+
+    class Order(dammy.EntityGenerator):
+        key = PrimaryKey(order_id=AutoIncrement())
+        customer = ForeignKey(Customer, 'key')
+        label = RandomName()
+        code = RandomInteger(0, 10 ** 9)
+        amount = RandomInteger(1, 10 ** 9)
+        quoted = 'a, "b"'
+
+    dataset = DatasetGenerator((Customer, 10), (Order, 100)).amplify('Order', 4, jitter=['amount'])
+    dataset.generate()
+
+    orders = dataset['Order']
+    assert [o['order_id'] for o in orders] == list(range(1, 101))
+    assert list(orders[0].keys()) == ['order_id', 'customer_id', 'label', 'code', 'amount', 'quoted']
+    assert len(set((o['customer_id'], o['label'], o['code']) for o in orders)) <= 4
+    assert orders[5]['code'] == orders[1]['code'] and orders[5]['label'] == orders[1]['label']
+    assert len(set(o['amount'] for o in orders)) > 4
+
+    # The cached encoding of the templates gives the same output as encoding every row
+    for output_format in ('sql', 'csv', 'jsonl'):
+        manifest = dataset.export_partitioned(str(tmp_path / output_format), output_format, shards=1)
+        lines = (tmp_path / output_format / manifest['tables']['Order']['shards'][0]['path']).read_text().splitlines()
+        encode = dataset._get_partition_encoder(output_format, dataset._get_sql_tables()[1])
+        assert lines[-100:] == [encode('Order', o) for o in dataset['Order']]
+
+    dataset.export(str(tmp_path / 'dataset.jsonl'), 'jsonl')
+    lines = (tmp_path / 'dataset.jsonl').read_text().splitlines()
+    assert [json.loads(line)['Order'] for line in lines[10:]] == dataset['Order']
+
+    sampled = DatasetGenerator((Customer, 10), (Order, 100)).amplify('Order', 3, sampling='sample')
+    sampled.generate()
+    assert len(set((o['customer_id'], o['label'], o['code'], o['amount']) for o in sampled['Order'])) <= 3
+
+    with pytest.raises(ValueError):
+        dataset.amplify('Order', 4, jitter=['price'])
+    with pytest.raises(ValueError):
+        dataset.amplify('Invoice', 4)
+
+def test_amplify_derived():
+    class Line(dammy.EntityGenerator):
+        key = PrimaryKey(line_id=AutoIncrement())
+        price = RandomInteger(1, 1000)
+        qty = RandomInteger(1, 1000)
+        total = price * qty
+
+    # Jitter attributes derived from copied columns use the values of the template
+    dataset = DatasetGenerator((Line, 200)).amplify('Line', 3, jitter=['qty', 'total'])
+    dataset.generate()
+    lines = dataset['Line']
+    assert all(line['total'] == line['price'] * line['qty'] for line in lines)
+    assert len(set(line['price'] for line in lines)) <= 3
+    assert len(set(line['qty'] for line in lines)) > 3
+
+    dataset = DatasetGenerator((Line, 200)).amplify('Line', 3, jitter=['price', 'total'])
+    dataset.generate()
+    assert all(line['total'] == line['price'] * line['qty'] for line in dataset['Line'])
+    assert len(set(line['qty'] for line in dataset['Line'])) <= 3
+
+    # Copied columns cannot be derived from jitter attributes
+    with pytest.raises(ValueError):
+        DatasetGenerator((Line, 200)).amplify('Line', 3, jitter=['qty'])
@@ -0,0 +1,56 @@
+import pytest
+
+# Libraries used to perform the tests
+import collections
+import statistics
+
+# Import everything we need to test
+import dammy
+from dammy.db import Unique
+from dammy.stdlib import *
+
+@pytest.mark.parametrize('generator, mean', [
+    (Normal(10, 2), 10),
+    (LogNormal(0, 0.5), 1.133),
+    (Exponential(0.5), 2),
+    (Pareto(3, 2), 3),
+    (Poisson(3), 3),
+    (Poisson(200), 200),
+    (Zipf(1.0, 5), 2.19),
+])
+def test_distribution_mean(generator, mean):
+    dammy.seed(1)
+    values = [generator.generate() for _ in range(20000)]
+    assert statistics.mean(values) == pytest.approx(mean, rel=0.05)
+
+    batch = generator.generate_batch(20000)
+    assert len(batch) == 20000
+    assert statistics.mean(batch) == pytest.approx(mean, rel=0.05)
+    assert generator._last_generated == batch[-1]
+
+def test_distribution_batch_seed():
+    dammy.seed(3)
+    first = LogNormal(1, 2).generate_batch(100)
+    dammy.seed(3)
+    assert LogNormal(1, 2).generate_batch(100) == first
+
+def test_zipf():
+    dammy.seed(2)
+    counts = collections.Counter(Zipf(1.2, 50).generate_batch(10000))
+    assert min(counts) >= 1 and max(counts) <= 50
+    assert counts[1] > counts[2] > counts[5] > counts[20]
+
+def test_truncated_discretized():
+    dammy.seed(4)
+    generator = Discretized(Truncated(Normal(0, 3), -2.2, 2.2))
+    values = generator.generate_batch(1000) + [generator.generate() for _ in range(100)]
+    assert set(values) == {-2, -1, 0, 1, 2}
+    assert generator._sql_equivalent == 'INTEGER'
+    assert generator._cardinality() == 5
+
+def test_unique_finite_domain():
+    dammy.seed(5)
+    unique = Unique(value=Zipf(1.5, 5))
+    assert sorted(unique.generate()['value'] for _ in range(5)) == [1, 2, 3, 4, 5]
+    with pytest.raises(dammy.exceptions.MaximumRetriesExceededException):
+        unique.generate()
@@ -0,0 +1,122 @@
+import pytest
+
+# Libraries used to perform the tests
+import json
+import socket
+import threading
+import time
+
+# Import everything we need to test
+import dammy
+from dammy.db import *
+from dammy.emitter import RateEmitter, diurnal
+from dammy.sinks import TCPSink, UDPSink, MemorySink
+from dammy.stdlib import RandomInteger
+
+class Reading(dammy.EntityGenerator):
+    key = PrimaryKey(reading_id=AutoIncrement())
+    value = RandomInteger(0, 100)
+
+class SlowValue(dammy.BaseGenerator):
+    def __init__(self):
+        super(SlowValue, self).__init__('INTEGER')
+
+    def generate_raw(self, dataset=None, localization=None):
+        time.sleep(0.002)
+        return 1
+
+def _receive_tcp(server, received):
+    connection, _ = server.accept()
+    with connection:
+        while True:
+            data = connection.recv(65536)
+            if not data:
+                break
+            received.append(data)
+
+def test_emit_tcp():
+    server = socket.socket()
+    server.bind(('127.0.0.1', 0))
+    server.listen(1)
+    received = []
+    receiver = threading.Thread(target=_receive_tcp, args=(server, received))
+    receiver.start()
+
+    reports = []
+    sink = TCPSink('127.0.0.1', server.getsockname()[1])
+    start = time.monotonic()
+    stats = RateEmitter(Reading(), 2000, sink, batch_size=100, callback=reports.append, report_interval=0.05).run(rows=500)
+    elapsed = time.monotonic() - start
+    sink.close()
+    receiver.join()
+    server.close()
+
+    rows = [json.loads(line) for line in b''.join(received).decode().splitlines()]
+    assert [r['reading_id'] for r in rows] == list(range(1, 501))
+    assert stats['emitted'] == 500
+    assert 0.2 <= elapsed < 2
+    assert len(reports) > 1
+
+def test_emit_udp():
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(('127.0.0.1', 0))
+    receiver.settimeout(5)
+
+    sink = UDPSink('127.0.0.1', receiver.getsockname()[1])
+    RateEmitter(Reading(), 5000, sink, output_format='csv').run(rows=200)
+    sink.close()
+
+    lines = []
+    while len(lines) < 200:
+        datagram = receiver.recv(65536).decode()
+        assert datagram.endswith('\n')
+        lines.extend(datagram.splitlines())
+    receiver.close()
+
+    assert len(lines) == 200
+
+    with pytest.raises(ValueError):
+        UDPSink('127.0.0.1', 9, buffer_size=4).write('too long')
+
+def test_emit_lag():
+    # Generating a row takes 2 ms, so 5000 rows per second cannot be kept up with
+    sink = MemorySink()
+    stats = RateEmitter(SlowValue(), 5000, sink, batch_size=10, prefetch=1).run(duration=0.3)
+    assert 0 < stats['emitted'] < 1500
+    assert stats['lag_rows'] > 0
+    assert stats['underruns'] > 0
+
+    with pytest.raises(ValueError):
+        RateEmitter(SlowValue(), 10, sink).run()
+
+def test_diurnal():
+    rate = diurnal(100, 10, period=10, peak_at=0.5)
+    assert rate(5) == pytest.approx(100)
+    assert rate(0) == pytest.approx(10)
+    assert rate(10) == pytest.approx(10)
+
+def test_emit_repeated_runs():
+    # The rows are generated in the session of the caller, so the sequences continue from one run to the next
+    emitter = RateEmitter(Reading(), 10000, MemorySink())
+    with dammy.GenerationSession():
+        emitter.run(rows=5)
+        emitter.run(rows=5)
+    ids = [json.loads(line)['reading_id'] for line in emitter.sink.getvalue().decode().splitlines()]
+    assert ids == list(range(1, 11))
+
+def test_emit_foreign_key():
+    class Meter(dammy.EntityGenerator):
+        key = PrimaryKey(meter_id=AutoIncrement())
+
+    class MeterReading(dammy.EntityGenerator):
+        meter = ForeignKey(Meter, 'key')
+        value = RandomInteger(0, 100)
+
+    sink = MemorySink()
+    with dammy.GenerationSession():
+        dataset = DatasetGenerator((Meter, 3))
+        dataset.generate()
+        stats = RateEmitter(MeterReading(), 10000, sink, dataset=dataset).run(rows=20)
+    rows = [json.loads(line) for line in sink.getvalue().decode().splitlines()]
+    assert stats['emitted'] == 20
+    assert all(r['meter_id'] in (1, 2, 3) for r in rows)
@@ -65,8 +65,6 @@ def test_operators():
     assert not g['le']              # 34 <= 11 -> FALSE
     assert g['ge']                  # 34 >= 11 -> TRUE
 
-@pytest.mark.xfail
-# BUG call_function() generates a new random integer instead of using the one in a
 def test_functions():
     """
     Tests funtion calls
@@ -0,0 +1,72 @@
+import pytest
+
+# Libraries used to perform the tests
+import pickle
+
+# Import everything we need to test
+from dammy import shared
+from dammy.db import DatasetGenerator
+
+pytestmark = pytest.mark.skipif(shared.shared_memory is None, reason='Shared memory requires Python 3.8 or later')
+
+ENTITIES = '''
+from dammy import EntityGenerator
+from dammy.db import AutoIncrement, PrimaryKey, ForeignKey
+from dammy.stdlib import RandomInteger, RandomName
+
+class Parent(EntityGenerator):
+    key = PrimaryKey(parent_id=AutoIncrement())
+    name = RandomName()
+
+class Child(EntityGenerator):
+    key = PrimaryKey(child_id=AutoIncrement())
+    parent = ForeignKey(Parent, 'key')
+    value = RandomInteger(0, 1000)
+'''
+
+def test_share_columns():
+    columns = {
+        'id': [1, 2, 3],
+        'score': [0.5, 1.5, -2.0],
+        'active': [True, False, True],
+        'code': ['AAA', 'BBB', 'CCC'],
+        'name': ['Ann', 'Bob', 'Ñandú'],
+        'extra': [None, {'a': 1}, 2 ** 70]
+    }
+    handle = shared.share_columns(columns)
+
+    # The handle is sent from the worker processes to the parent
+    with shared.SharedColumns(pickle.loads(pickle.dumps(handle))) as table:
+        assert len(table) == 3
+        assert list(table) == [dict((k, v[i]) for k, v in columns.items()) for i in range(3)]
+        assert table[-1]['name'] == 'Ñandú'
+        assert isinstance(table.column('id'), memoryview)
+        assert list(table.column('score')) == [0.5, 1.5, -2.0]
+
+        with pytest.raises(IndexError):
+            table[3]
+
+    with pytest.raises(ValueError):
+        shared.share_columns({'a': [1], 'b': [1, 2]})
+
+def test_generate_shared(tmp_path):
+    module = tmp_path / 'shared_entities.py'
+    module.write_text(ENTITIES)
+    rows = [('Parent', 10), ('Child', 25)]
+
+    with shared.generate_shared(str(module), rows, 'Child', seed=3, workers=2, batch_size=10) as children:
+        assert [len(b) for b in children.batches] == [10, 10, 5]
+
+        # The rows are the ones generated by index in a single process
+        dataset = DatasetGenerator(*[(c, n) for c, n in zip(_load(module), (10, 25))])
+        assert list(children) == dataset.generate_range('Child', 0, 25, seed=3)
+
+        # Batches are seen as a single table, so foreign keys can reference it
+        with shared.generate_shared(str(module), rows, 'Parent', seed=3, workers=2, batch_size=4) as parents:
+            assert len(parents) == 10
+            assert [parents[i]['parent_id'] for i in (0, 4, -1)] == [1, 5, 10]
+
+def _load(module):
+    from dammy.cli import load_entities
+    entities = load_entities(str(module))
+    return entities['Parent'], entities['Child']
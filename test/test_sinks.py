@@ -0,0 +1,77 @@
+import pytest
+
+# Libraries used to perform the tests
+import bz2
+import gzip
+import lzma
+
+# Import everything we need to test
+from dammy.sinks import *
+
+def test_memory_sink():
+    sink = MemorySink(buffer_size=8)
+    sink.write('abc')
+    assert sink.getvalue() == b'abc'
+    sink.write(b'defghijkl')
+    sink.close()
+    assert sink.getvalue() == b'abcdefghijkl'
+    assert sink.bytes_written == 12
+
+@pytest.mark.parametrize('compression, decompress', [('gzip', gzip.decompress), ('bz2', bz2.decompress), ('lzma', lzma.decompress)])
+def test_compression(compression, decompress):
+    sink = MemorySink(compression=compression)
+    sink.write('first line\n')
+    sink.sync()
+    sink.write('second line\n')
+    sink.close()
+    assert decompress(sink.getvalue()) == b'first line\nsecond line\n'
+
+def test_threaded_sink(tmp_path):
+    with ThreadedSink(FileSink(str(tmp_path / 'out.txt')), queue_size=2, buffer_size=10) as sink:
+        for i in range(0, 1000):
+            sink.write('{}\n'.format(i))
+
+    assert (tmp_path / 'out.txt').read_text().split() == [str(i) for i in range(0, 1000)]
+
+def test_threaded_sink_error():
+    class FailingSink(BaseSink):
+        def _write_chunk(self, data):
+            raise IOError('Disk full')
+
+    sink = ThreadedSink(FailingSink(buffer_size=1), buffer_size=1)
+    sink.write('data')
+    with pytest.raises(IOError):
+        sink.close()
+
+def test_threaded_sink_close():
+    class ClosingSink(MemorySink):
+        closed = False
+
+        def _write_chunk(self, data):
+            raise IOError('Disk full')
+
+        def close(self):
+            self.closed = True
+
+    # The wrapped sink is closed even if writing fails
+    inner = ClosingSink(buffer_size=1)
+    sink = ThreadedSink(inner, buffer_size=1)
+    sink.write('data')
+    with pytest.raises(IOError):
+        sink.close()
+    assert inner.closed and not sink._thread.is_alive()
+
+    # Errors raised on exit do not replace the one being raised
+    with pytest.raises(KeyError):
+        with sink_for(ThreadedSink(ClosingSink(buffer_size=1), buffer_size=1)) as sink:
+            sink.write('data')
+            raise KeyError('generation failed')
+    with pytest.raises(IOError):
+        with sink_for(ThreadedSink(ClosingSink(buffer_size=1), buffer_size=1)) as sink:
+            sink.write('data')
+
+def test_pipe_sink(tmp_path):
+    with PipeSink(['sh', '-c', 'cat > {}'.format(tmp_path / 'out.txt')]) as sink:
+        sink.write('piped')
+
+    assert (tmp_path / 'out.txt').read_text() == 'piped'
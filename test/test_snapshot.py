@@ -0,0 +1,115 @@
+import pytest
+
+# Libraries used to perform the tests
+import os
+import random
+import shutil
+import tempfile
+
+# Import everything we need to test
+from dammy import EntityGenerator
+from dammy.db import AutoIncrement, PrimaryKey, ForeignKey, DatasetGenerator
+from dammy.stdlib import RandomInteger, RandomName
+from dammy.snapshot import Snapshot, SnapshotCache, fingerprint, snapshot_fixture
+
+class Author(EntityGenerator):
+    key = PrimaryKey(author_id=AutoIncrement())
+    name = RandomName()
+
+class Book(EntityGenerator):
+    key = PrimaryKey(book_id=AutoIncrement())
+    author = ForeignKey(Author, 'key')
+    pages = RandomInteger(50, 900)
+
+class Empty(EntityGenerator):
+    value = RandomInteger(0, 10)
+
+def _dataset(books=200):
+    return DatasetGenerator((Author, 20), (Book, books), (Empty, 0))
+
+# The snapshots of the fixture go to a directory of this test run, removed when the module finishes
+_cache_directory = tempfile.mkdtemp(prefix='dammy-test-cache-')
+
+library = snapshot_fixture(_dataset(), seed=7, directory=_cache_directory, scope='module')
+
+@pytest.fixture(scope='module', autouse=True)
+def _remove_cache_directory():
+    yield
+    shutil.rmtree(_cache_directory, ignore_errors=True)
+
+def test_snapshot_cache(tmp_path):
+    cache = SnapshotCache(str(tmp_path))
+    dataset = _dataset()
+
+    # The cache does not change the state of the random module
+    state = random.getstate()
+    assert cache.load(dataset, 42) is None
+    with cache.get(dataset, 42) as snapshot:
+        assert random.getstate() == state
+        stored = snapshot.to_dict()
+    assert random.getstate() == state
+
+    # The data is the same generated from the seed
+    random.seed(42)
+    dataset.generate()
+    random.setstate(state)
+    assert stored == dataset.data
+    assert len(stored['Book']) == 200 and stored['Empty'] == []
+
+    # Stored snapshots are loaded without generating the dataset again
+    with cache.load(_dataset(), 42) as snapshot:
+        assert len(snapshot) == 3
+        assert snapshot['Book'][5] == stored['Book'][5]
+        assert [row['author_id'] for row in snapshot['Author']] == list(range(1, 21))
+
+    cache.clear()
+    assert os.listdir(str(tmp_path)) == []
+
+def test_fingerprint():
+    dataset = _dataset()
+    assert fingerprint(dataset, 1) == fingerprint(_dataset(), 1)
+    assert fingerprint(dataset, 1) != fingerprint(dataset, 2)
+    assert fingerprint(dataset, 1) != fingerprint(dataset, 1, 'es_ES')
+    assert fingerprint(dataset, 1) != fingerprint(_dataset(201), 1)
+
+    class Other(EntityGenerator):
+        value = RandomInteger(0, 11)
+
+    assert fingerprint(DatasetGenerator((Empty, 5)), 1) != fingerprint(DatasetGenerator((Other, 5)), 1)
+
+def test_fingerprint_files(tmp_path):
+    from dammy.db import KeyIndex
+    from dammy.stdlib import Vocabulary
+
+    def describe(words, keys):
+        (tmp_path / 'words.txt').write_text('\n'.join(words))
+        (tmp_path / 'keys.csv').write_text('id\n' + '\n'.join(str(k) for k in keys))
+        vocabulary = Vocabulary.from_text(str(tmp_path / 'words.txt'), str(tmp_path / 'words.pack'))
+        index = KeyIndex.from_csv(str(tmp_path / 'keys.csv'), 'id', str(tmp_path / 'keys.idx'), 'Customer')
+
+        class Word(EntityGenerator):
+            word = vocabulary
+            customer = ForeignKey(index)
+
+        try:
+            dataset = DatasetGenerator((Word, 5))
+            assert fingerprint(dataset, 1) == fingerprint(dataset, 1)
+            return fingerprint(dataset, 1)
+        finally:
+            vocabulary.close()
+            index.close()
+
+    # Files with the same path, number of entries and length but a different content are told apart
+    original = describe(['alpha', 'bravo'], [1, 2])
+    assert describe(['alpha', 'delta'], [1, 2]) != original
+    assert describe(['alpha', 'bravo'], [1, 3]) != original
+
+def test_invalid_snapshot(tmp_path):
+    path = tmp_path / 'invalid.snapshot'
+    path.write_bytes(b'not a snapshot at all')
+    with pytest.raises(ValueError):
+        Snapshot(str(path))
+
+def test_snapshot_fixture(library):
+    assert len(library['Author']) == 20
+    assert all(1 <= row['author_id'] <= 20 for row in library['Book'])
\ No newline at end of file
@@ -2,6 +2,7 @@ import pytest
 
 # Libraries used to perform the tests
 import random
+import time
 
 # Import everything we need to test
 import dammy
@@ -9,16 +10,16 @@ from dammy.db import *
 from dammy.stdlib import *
 
 def test_bloodtype():
-    assert BloodType().generate() == '0+'
+    assert BloodType().generate() == 'AB-'
 
 def test_carbrand():
-    assert CarBrand().generate() == 'BMW'
+    assert CarBrand().generate() == 'Chevrolet'
 
 def test_carmodel():
-    assert CarModel().generate() == 'E-Class'
+    assert CarModel().generate() == 'Roadster'
 
 def test_countryname():
-    assert CountryName().generate() == 'Grenada'
+    assert CountryName().generate() == 'Holy See (Vatican City State)'
 
 def test_creditcard():
     assert CreditCard().generate() == '0978 4713 8106 3823'
@@ -41,4 +42,148 @@ def test_randomname():
     assert RandomName().generate() == 'Reizy'
 
 def test_randomstring():
-    assert RandomString(16).generate() == 'DcaiDmbqZwRr9BOA'
\ No newline at end of file
+    assert RandomString(16).generate() == 'DcaiDmbqZwRr9BOA'
+
+def test_pool():
+    calls = []
+
+    class Counted(dammy.BaseGenerator):
+        def __init__(self):
+            super(Counted, self).__init__('INTEGER')
+
+        def generate_raw(self, dataset=None, localization=None):
+            calls.append(1)
+            return self._generate(len(calls))
+
+    pool = Pool(Counted(), 10, refresh_every=100, segments=5)
+    values = pool.generate_batch(1000)
+    assert set(values) <= set(range(1, 101))
+    assert len(calls) == 10 + 2 * 9
+    assert pool.stats['draws'] == 1000 and pool.stats['refreshes'] == 9 and pool.stats['reuse'] == 1000 / 28
+
+    with pytest.raises(ValueError):
+        Pool(Counted(), 10, segments=3)
+
+    # Without refreshes, the pool limits the number of unique values
+    assert Unique(value=Pool(RandomInteger(0, 1000), 20))._cardinality() == 20
+
+    class Payment(dammy.EntityGenerator):
+        card = Pool(CreditCard(), 50, refresh_every=10, segments=5, eviction='fifo')
+
+    rows = list(Payment().generate_range(0, 100, seed=1))
+    assert len(set(row['card'] for row in rows)) <= 50 + 9 * 10
+    assert list(Payment().generate_range(35, 60, seed=1)) == rows[35:60]
+
+def test_pattern():
+    import re
+
+    for pattern in ('ORD-[0-9]{8}-[A-Z]{3}', '\\+34 [67]\\d{2}( \\d{3}){2}', '(ab|c){1,3}x?', '[^a-z]'):
+        assert all(re.fullmatch(pattern, value) for value in Pattern(pattern).generate_batch(50))
+
+    assert Pattern('ORD-[0-9]{8}-[A-Z]{3}')._sql_equivalent == 'VARCHAR(16)'
+    assert Pattern('[AB]{2}(x|yz)?')._cardinality() == 4 * 3
+    assert re.fullmatch('[A-Z]{3}-[0-9]{4}', Pattern.from_template('???-####').generate())
+
+    with pytest.raises(ValueError):
+        Pattern('[0-9]+')
+    assert all(1 <= len(v) <= 3 for v in Pattern('[0-9]+', max_repeat=3).generate_batch(20))
+
+    # The exact number of values lets Unique know when the pattern is exhausted
+    class Code(dammy.EntityGenerator):
+        code = PrimaryKey(code=Pattern('[AB][0-2]'))
+
+    assert len(DatasetGenerator((Code, 6)).generate()['Code']) == 6
+    with pytest.raises(dammy.exceptions.MaximumRetriesExceededException):
+        DatasetGenerator((Code, 7)).generate()
+
+def test_conditional():
+    from dammy.sampling import ConditionalTable
+
+    table = ConditionalTable({'ES': ['Madrid', 'Sevilla'], 'FR': ['Paris'], 'XX': []}, weights={'ES': [1, 0]})
+    assert table.parents == ['ES', 'FR'] and len(table) == 3
+    assert table.children('XX') == [] and table.sample('ES') == 'Madrid'
+    assert all(city in table.children(country) for country, city in table.sample_pairs(100))
+    with pytest.raises(ValueError):
+        table.sample('XX')
+
+    class Car(dammy.EntityGenerator):
+        model = CarModel(car_brand=CarBrand())
+        brand = model._parent
+
+    # The brand of every row is generated once and used by the model
+    for row in [Car().generate() for _ in range(50)]:
+        assert row['model'] in CarModel._table.children(row['brand'])
+
+    brands = set(CarModel._table.parents)
+    assert all(brand in brands for brand, _ in CarModel().generate_pairs(100))
+    models = set(m for brand in brands for m in CarModel._table.children(brand))
+    assert all(model in models for model in CarModel().generate_batch(100))
+
+def test_ascending():
+    import datetime
+    from dammy.sampling import SequentialSample, SortedUniforms
+    from dammy.stdlib import Ascending, RandomFloat
+
+    # Both methods choose every index with the same probability
+    for n, population in ((5, 100), (4, 8)):
+        counts = [0] * population
+        for _ in range(2000):
+            sample = SequentialSample(n, population)
+            indices = [sample.next_index() for _ in range(n)]
+            assert indices == sorted(set(indices)) and 0 <= indices[0] and indices[-1] < population
+            for i in indices:
+                counts[i] += 1
+        assert all(abs(c / 2000 - n / population) < 0.05 for c in counts)
+
+    values = SortedUniforms(1000)
+    values = [values.next_value() for _ in range(1000)]
+    assert values == sorted(values) and 0 <= values[0] and values[-1] < 1
+    with pytest.raises(ValueError):
+        SequentialSample(3, 2)
+
+    class Event(dammy.EntityGenerator):
+        key = PrimaryKey(event_id=Ascending(RandomInteger(1, 10 ** 12), 500, unique=True))
+        score = Ascending(RandomFloat(0, 1), 500)
+        bucket = Ascending(RandomInteger(1, 3), 500)
+        timestamp = Ascending(RandomDateTime(datetime.datetime(2024, 1, 1), datetime.datetime(2025, 1, 1), '%Y-%m-%d %H:%M:%S'), 500)
+
+    dataset = DatasetGenerator((Event, 500))
+    events = dataset.generate()['Event']
+    for column in ('event_id', 'score', 'bucket', 'timestamp'):
+        values = [e[column] for e in events]
+        assert values == sorted(values)
+    assert len(set(e['event_id'] for e in events)) == 500
+    assert set(e['bucket'] for e in events) == set([1, 2, 3])
+    assert events[0]['timestamp'] >= '2024-01-01' and events[-1]['timestamp'] <= '2025-01-01'
+
+    # Unique does not keep values that never repeat
+    assert len(Event.key.generated) == 0
+
+    with pytest.raises(ValueError):
+        DatasetGenerator((Event, 501)).generate()
+    with pytest.raises(ValueError):
+        dataset.generate_range('Event', 0, 10, 1)
+    with pytest.raises(ValueError):
+        Ascending(RandomFloat(0, 1), 5, unique=True)
+    with pytest.raises(ValueError):
+        Ascending(RandomInteger(1, 3), 5, unique=True)
+
+@pytest.mark.skipif(not hasattr(time, 'tzset'), reason='Time zones cannot be changed on this platform')
+def test_ascending_dst(monkeypatch):
+    import datetime
+    from dammy.stdlib import Ascending
+
+    # The clocks go back at 02:00, so local timestamps of the range are not in order
+    monkeypatch.setenv('TZ', 'America/New_York')
+    time.tzset()
+    try:
+        start = datetime.datetime(2024, 11, 3, 0, 0)
+        end = datetime.datetime(2024, 11, 3, 4, 0)
+        timestamp = Ascending(RandomDateTime(start, end), 1000)
+        values = [timestamp.generate() for _ in range(1000)]
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+
+    assert values == sorted(values)
+    assert start <= values[0] and values[-1] <= end